@@ -1,13 +1,20 @@
 import requests
+import argparse
+import hashlib
 import json
 import time
 import os
 # --- CONFIGURAÇÃO ---
-API_URL = "http://127.0.0.1:8000/test/pdf"
+API_BASE_URL = "http://127.0.0.1:8000"
 MODELS_TO_RUN = ["local_ocr", "openai_gpt4o"] #Adicionar mais modelos caso queira
+OUTPUT_FILENAME = "resultados_completos"
+# Formato do relatório salvo: "compact" (JSON colunar), "json" (aninhado) ou "parquet" (requer pyarrow na API)
+OUTPUT_FORMAT = "compact"
+POLL_INTERVAL_S = 5
 
 # # Adicione um dicionário para cada PDF que você quer testar.
 # Preencha o 'pdf_path' e as 'questions' para cada um.
+# (Para corpora grandes, use um arquivo de manifesto no mesmo formato: --manifest corpus.json)
 # -----------------------------------------------------------
 TEST_SUITE = [
     {
@@ -50,63 +57,166 @@ TEST_SUITE = [
 ]
 # -----------------------------------------------------------
 
-def run_single_test(pdf_path, questions, models):
-    """Função que chama a API para um único PDF."""
-    print(f"\n--- 🧪 Iniciando teste para: {pdf_path} ---")
-    
-    test_suite_payload = {"questions": questions}
-    
-    # --- MUDANÇA AQUI ---
-    # Agora 'data' é um dicionário simples, que é mais robusto para o 'requests'.
-    data_payload = {
-        'test_suite_json': json.dumps(test_suite_payload),
-        'models_to_run': ",".join(models)
-    }
-    
-    try:
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 do arquivo, calculado em blocos. É o id do documento na API."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ensure_document(session, pdf_path, api_base_url=API_BASE_URL):
+    """Envia o PDF para a API apenas se ele ainda não estiver armazenado lá. Retorna o id do documento."""
+    document_id = file_sha256(pdf_path)
+    response = session.head(f"{api_base_url}/documents/{document_id}", timeout=30)
+    if response.status_code == 404:
         with open(pdf_path, 'rb') as pdf_file:
-            # O arquivo é passado pelo parâmetro 'files', e os outros dados pelo parâmetro 'data'.
             files_payload = {'file': (os.path.basename(pdf_path), pdf_file, 'application/pdf')}
-            response = requests.post(API_URL, data=data_payload, files=files_payload, timeout=300)
+            response = session.post(f"{api_base_url}/documents", files=files_payload, timeout=300)
+        response.raise_for_status()
+        print(f"Documento enviado: {document_id[:12]}...")
+    else:
+        response.raise_for_status()
+        print(f"Documento já armazenado na API: {document_id[:12]}... (upload evitado)")
+    return document_id
+
+def build_manifest(session, test_suite, api_base_url=API_BASE_URL):
+    """Garante que todos os PDFs estejam na API e monta o manifesto do benchmark."""
+    documents = []
+    for test_case in test_suite:
+        pdf_path = test_case["pdf_path"]
+        try:
+            document_id = ensure_document(session, pdf_path, api_base_url)
+        except FileNotFoundError:
+            print(f"--- ❌ ERRO: Arquivo não encontrado em '{pdf_path}'. Pulando este documento. ---")
+            continue
+        documents.append({
+            "document_id": document_id,
+            "name": os.path.basename(pdf_path),
+            "questions": test_case["questions"],
+        })
+    return documents
+
+def submit_benchmark(session, documents, models, api_base_url=API_BASE_URL):
+    """Submete o benchmark de corpus, aguardando a vez se a fila de jobs da API estiver cheia."""
+    payload = {"models": models, "documents": documents}
+    while True:
+        response = session.post(f"{api_base_url}/benchmarks/corpus", json=payload, timeout=60)
+        if response.status_code != 429:
             response.raise_for_status()
-            print(f"--- ✅ Teste para {pdf_path} concluído com sucesso! ---")
-            return response.json()
-    except FileNotFoundError:
-        print(f"--- ❌ ERRO: Arquivo não encontrado em '{pdf_path}'. Pulando este teste. ---")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"--- ❌ ERRO ao chamar a API para {pdf_path}: {e} ---")
-        # Esta parte agora deve mostrar um erro mais detalhado do servidor, se houver.
-        if e.response:
-            print(f"Detalhes: {e.response.text}")
-        return None
+            return response.json()["job_id"]
+        retry_after = int(response.headers.get("Retry-After", POLL_INTERVAL_S))
+        print(f"Fila de testes da API cheia, tentando de novo em {retry_after}s...")
+        time.sleep(retry_after)
+
+def wait_for_report(session, job_id, api_base_url=API_BASE_URL):
+    """
+    Acompanha o benchmark até o fim. Ctrl+C cancela o job na API e retorna o relatório parcial.
+    O relatório vem no formato compacto: perguntas, gabaritos e respostas repetidos não são retransmitidos.
+    """
+    url = f"{api_base_url}/benchmarks/{job_id}"
+    params = {"response_format": "compact"}
+    try:
+        while True:
+            response = session.get(url, params=params, timeout=60)
+            response.raise_for_status()
+            report = response.json()
+            print(f"[{report['status']}] {report['completed_items']}/{report['total_items']} itens avaliados")
+            if report["status"] in ("completed", "failed", "cancelled"):
+                return report
+            time.sleep(POLL_INTERVAL_S)
+    except KeyboardInterrupt:
+        print("\nCancelando o benchmark na API...")
+        response = session.delete(url, params=params, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+def download_report(session, job_id, output_path, output_format, api_base_url=API_BASE_URL):
+    """Baixa o relatório final em outro formato (`json` aninhado ou `parquet`) direto para o arquivo."""
+    with session.get(f"{api_base_url}/benchmarks/{job_id}", params={"response_format": output_format},
+                     stream=True, timeout=300) as response:
+        response.raise_for_status()
+        with open(output_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+
+def print_results_table(report):
+    """Acertos por documento e modelo, lidos direto das colunas do relatório compacto."""
+    results = report.get("results")
+    if not results or not results["rows"]:
+        return
+    columns = results["columns"]
+    # No corpus, `document` aponta para `documents`; num teste de um único PDF, a coluna não existe
+    documents = columns.get("document") or [None] * results["rows"]
+    counts = {}
+    for document_index, model_index, is_correct in zip(documents, columns["model"], columns["is_correct"]):
+        key = (document_index, model_index)
+        correct, total = counts.get(key, (0, 0))
+        counts[key] = (correct + bool(is_correct), total + 1)
+    for (document_index, model_index), (correct, total) in sorted(counts.items(), key=lambda entry: entry[0]):
+        document_name = report["documents"][document_index]["filename"] if document_index is not None else report.get("filename")
+        print(f"  {document_name} · {results['models'][model_index]}: {correct}/{total} corretas")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Executa um benchmark de corpus (vários PDFs) na API de testes.")
+    parser.add_argument("--manifest", help="Arquivo JSON com uma lista de {'pdf_path', 'questions'} (padrão: TEST_SUITE).")
+    parser.add_argument("--models", default=",".join(MODELS_TO_RUN), help="Modelos separados por vírgula.")
+    parser.add_argument("--output", help=f"Arquivo onde o relatório combinado é salvo (padrão: {OUTPUT_FILENAME}.<formato>).")
+    parser.add_argument("--format", default=OUTPUT_FORMAT, choices=["compact", "json", "parquet"],
+                        help="Formato do relatório salvo: JSON colunar, JSON aninhado ou Parquet.")
+    parser.add_argument("--api-url", default=API_BASE_URL, help="Endereço da API.")
+    return parser.parse_args()
 
 def main():
-    """Função principal que executa todos os testes e salva o resultado."""
-    all_results = []
+    """Função principal: envia o corpus inteiro em um único benchmark e salva o relatório combinado."""
+    args = parse_args()
+    test_suite = TEST_SUITE
+    if args.manifest:
+        with open(args.manifest, 'r', encoding='utf-8') as f:
+            test_suite = json.load(f)
+    models = [name.strip() for name in args.models.split(",") if name.strip()]
+    output_path = args.output or f"{OUTPUT_FILENAME}.{'parquet' if args.format == 'parquet' else 'json'}"
     start_time = time.time()
-    
-    for test_case in TEST_SUITE:
-        result = run_single_test(
-            pdf_path=test_case["pdf_path"],
-            questions=test_case["questions"],
-            models=MODELS_TO_RUN
-        )
-        if result:
-            all_results.append(result)
 
-    end_time = time.time()
-    total_duration = end_time - start_time
+    # Uma única sessão reaproveita a conexão com a API entre as requisições
+    with requests.Session() as session:
+        try:
+            documents = build_manifest(session, test_suite, args.api_url)
+            if not documents:
+                print("--- ❌ Nenhum documento para testar. ---")
+                return
+            print(f"\n--- 🧪 Iniciando benchmark: {len(documents)} documentos x {len(models)} modelos ---")
+            job_id = submit_benchmark(session, documents, models, args.api_url)
+            report = wait_for_report(session, job_id, args.api_url)
+            if args.format != "compact":
+                download_report(session, job_id, output_path, args.format, args.api_url)
+        except requests.exceptions.RequestException as e:
+            print(f"--- ❌ ERRO ao chamar a API: {e} ---")
+            # Mostra o erro detalhado do servidor, se houver.
+            if e.response is not None:
+                print(f"Detalhes: {e.response.text}")
+            return
+
+    total_duration = time.time() - start_time
+
+    # Salva o relatório combinado (agregado por modelo + resultados de cada documento)
+    if args.format == "compact":
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False)
 
-    # Salva todos os resultados em um único arquivo JSON
-    output_filename = "resultados_completos.json"
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        json.dump(all_results, f, indent=2, ensure_ascii=False)
-        
     print("\n=======================================================")
-    print(f"🏁 Todos os testes foram concluídos em {total_duration:.2f} segundos.")
-    print(f"📄 Os resultados completos foram salvos em: {output_filename}")
+    print_results_table(report)
+    for model in report["models"]:
+        accuracy = f"{model['accuracy']:.1%}" if model["accuracy"] is not None else "-"
+        print(f"{model['model_name']}: acurácia {accuracy} ({model['completed_items']}/{model['total_items']} itens)")
+    if report.get("error"):
+        print(f"⚠️ O benchmark falhou: {report['error']}")
+    print(f"🏁 Benchmark '{report['status']}' em {total_duration:.2f} segundos.")
+    print(f"📄 O relatório combinado foi salvo em: {output_path}")
+    if report.get("run_id"):
+        # Compare com execuções anteriores sem reabrir JSONs: GET /results/compare?base=<id>&other=<id>
+        print(f"🗂️ Execução gravada no histórico da API: {report['run_id']}")
     print("=======================================================")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,15 @@
 import streamlit as st
 import pandas as pd
+import altair as alt
 import requests
+import hashlib
 import json
+import numpy as np
 import os
+import time
+from datetime import datetime
+
+from utils.pricing import estimate_cost_usd
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -26,44 +33,93 @@ def get_available_models():
         # O erro já será exibido na UI principal
         return []
 
-def run_test_on_api(file_bytes, filename, models_to_run_str, test_suite_json_str):
-    """Envia os dados para a API FastAPI e retorna a resposta."""
-    files_payload = {'file': (filename, file_bytes, 'application/pdf')}
+def ensure_document_on_api(file_bytes, filename):
+    """
+    Garante que o PDF esteja no armazenamento de documentos da API e retorna o seu id (SHA-256).
+    Se o mesmo arquivo já foi enviado antes, o upload é evitado.
+    """
+    document_id = hashlib.sha256(file_bytes).hexdigest()
+    response = requests.head(f"{API_URL}/documents/{document_id}", timeout=30)
+    if response.status_code == 404:
+        files_payload = {'file': (filename, file_bytes, 'application/pdf')}
+        response = requests.post(f"{API_URL}/documents", files=files_payload, timeout=300)
+    response.raise_for_status()
+    return document_id
+
+def stream_test_on_api(file_bytes, filename, models_to_run_str, test_suite_json_str, warmup_runs=0, repetitions=1):
+    """
+    Envia os dados para o endpoint de streaming da API e gera cada evento assim que chega:
+    um "result" por item avaliado e, ao final, um "summary" com a resposta completa.
+    """
     data_payload = {
         'test_suite_json': test_suite_json_str,
-        'models_to_run': models_to_run_str
+        'models_to_run': models_to_run_str,
+        'warmup_runs': warmup_runs,
+        'repetitions': repetitions,
+        # O resumo final vem no formato colunar (sem repetir perguntas e respostas)
+        'response_format': 'compact'
     }
     try:
-        response = requests.post(f"{API_URL}/test/pdf", data=data_payload, files=files_payload, timeout=300)
-        response.raise_for_status()
-        return response.json()
+        data_payload['document_id'] = ensure_document_on_api(file_bytes, filename)
+        # O timeout vale para cada leitura, não para o teste inteiro
+        with requests.post(f"{API_URL}/test/pdf/stream", data=data_payload,
+                           stream=True, timeout=(10, 300)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
     except requests.exceptions.RequestException as e:
         st.error(f"Erro ao chamar a API: {e}")
-        if e.response:
+        if e.response is not None:
             st.error(f"Detalhes do servidor: {e.response.text}")
-        return None
-
-def process_results(api_response):
-    """Transforma a resposta da API em um DataFrame Pandas e calcula métricas."""
-    flat_results = []
-    for model_summary in api_response.get('test_summary', []):
-        model_name = model_summary['model_name']
-        for result_item in model_summary['results']:
-            # Estimativa de Custo
-            cost = 0.00
-            # Adiciona o custo do modelo + um custo pequeno para a chamada do "juiz"
-            if "openai" in model_name.lower():
-                cost = 0.005 + 0.0001
-            
-            result_item['model_name'] = model_name
-            result_item['cost_usd_est'] = cost
-            flat_results.append(result_item)
-    
-    if not flat_results:
+
+def results_frame(api_response):
+    """
+    Um item por linha, a partir da resposta aninhada (`test_summary`, usada na visão parcial) ou da
+    compacta (`results`, colunar). Na compacta, as colunas são montadas por índice nas tabelas de
+    perguntas e respostas, sem repetir os textos.
+    """
+    results = api_response.get('results')
+    if results is None:
+        rows = [
+            {**result_item, 'model_name': model_summary['model_name']}
+            for model_summary in api_response.get('test_summary', [])
+            for result_item in model_summary['results']
+        ]
+        return pd.DataFrame(rows)
+    if not results['rows']:
+        return pd.DataFrame()
+
+    columns = results['columns']
+    questions = pd.DataFrame(results['questions'])
+    question_index = np.asarray(columns['question'])
+    df = pd.DataFrame({
+        'model_name': np.asarray(results['models'], dtype=object)[columns['model']],
+        'question': questions['question'].to_numpy()[question_index],
+        'expected_answer': questions['expected_answer'].to_numpy()[question_index],
+        'actual_answer': np.asarray(results['answers'], dtype=object)[columns['answer']],
+        'latency_ms': columns['latency_ms'],
+        'is_correct': columns['is_correct'],
+        'details': columns.get('details') or [None] * results['rows'],
+        'latency_samples_ms': columns.get('latency_samples_ms') or [None] * results['rows'],
+    })
+    stages = columns.get('stage_timings_ms')
+    if stages:
+        df['stage_timings_ms'] = pd.DataFrame(stages).to_dict(orient='records')
+    return df
+
+def process_results(results_df):
+    """Seleciona as colunas da tabela detalhada e calcula as métricas por modelo."""
+    if results_df.empty:
         return pd.DataFrame(), {}
 
-    df = pd.DataFrame(flat_results)
-    df = df[['model_name', 'question', 'is_correct', 'latency_ms', 'cost_usd_est', 'expected_answer', 'actual_answer']]
+    df = results_df.copy()
+    details = df['details'] if 'details' in df else pd.Series([None] * len(df), index=df.index)
+    # Estimativa de Custo: pelo uso de API que o modelo registrou (tokens da OpenAI, páginas do Document AI)
+    df['cost_usd_est'] = [estimate_cost_usd(item_details) for item_details in details]
+    # Páginas enviadas para a API (modelos que selecionam páginas relevantes)
+    df['pages_sent'] = [(item_details or {}).get('pages_sent') for item_details in details]
+    df = df[['model_name', 'question', 'is_correct', 'latency_ms', 'cost_usd_est', 'pages_sent', 'expected_answer', 'actual_answer']]
     
     # Calcular métricas de resumo
     summary = {
@@ -73,6 +129,145 @@ def process_results(api_response):
     }
     return df, summary
 
+def process_stage_timings(results_df):
+    """Tempo médio (ms) de cada etapa por modelo, a partir de `stage_timings_ms` de cada item."""
+    rows = []
+    if 'stage_timings_ms' in results_df:
+        for model_name, timings in zip(results_df['model_name'], results_df['stage_timings_ms']):
+            for stage, duration_ms in (timings or {}).items():
+                if duration_ms is not None and not pd.isna(duration_ms):
+                    rows.append({"model_name": model_name, "stage": stage, "duration_ms": duration_ms})
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    return df.groupby(['model_name', 'stage'])['duration_ms'].mean().unstack(fill_value=0.0)
+
+def process_latency_samples(results_df):
+    """Amostras de latência do modo benchmark (uma linha por repetição medida de cada item)."""
+    rows = []
+    if 'latency_samples_ms' in results_df:
+        for model_name, samples in zip(results_df['model_name'], results_df['latency_samples_ms']):
+            for latency in samples or []:
+                rows.append({"model_name": model_name, "latency_ms": latency})
+    return pd.DataFrame(rows)
+
+def render_benchmark(api_response, results_df):
+    """Distribuição da latência por modelo: percentis, desvio padrão, intervalo de confiança e boxplot."""
+    stats_df = pd.DataFrame(api_response['benchmark']).set_index('model_name')
+    st.subheader("Distribuição da Latência (Benchmark)")
+    st.caption(
+        f"{int(stats_df['warmup_runs'].max())} rodada(s) de aquecimento descartada(s), "
+        f"{int(stats_df['repetitions'].max())} repetição(ões) medida(s)."
+    )
+    columns = ['samples', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'std_ms', 'ci95_low_ms', 'ci95_high_ms', 'accuracy']
+    st.dataframe(
+        stats_df[columns].style.format({column: '{:.0f}' for column in columns[1:-1]} | {'accuracy': '{:.1%}'}, na_rep='-'),
+        use_container_width=True
+    )
+
+    samples_df = process_latency_samples(results_df)
+    if not samples_df.empty:
+        chart = alt.Chart(samples_df).mark_boxplot(extent='min-max').encode(
+            x=alt.X('latency_ms:Q', title='Latência (ms)'),
+            y=alt.Y('model_name:N', title=None),
+            color=alt.Color('model_name:N', legend=None),
+        )
+        st.altair_chart(chart, use_container_width=True)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_results_history(since):
+    """Agregados por execução e modelo, já calculados pela API (não recalcula nada a cada rerun)."""
+    response = requests.get(f"{API_URL}/results/history", params={"since": since} if since else None, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_result_runs(limit=100):
+    response = requests.get(f"{API_URL}/results/runs", params={"limit": limit}, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_run_comparison(base_run_id, other_run_id):
+    response = requests.get(f"{API_URL}/results/compare", params={"base": base_run_id, "other": other_run_id}, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def run_label(run):
+    """Rótulo de uma execução no seletor: data, tipo e documentos."""
+    documents = ", ".join(document.get("name") or "?" for document in run["metadata"].get("documents", []))
+    started = datetime.fromtimestamp(run["started_at"]).strftime("%d/%m/%Y %H:%M")
+    return f"{started} · {run['kind']} · {documents} ({run['run_id'][:8]})"
+
+def render_history():
+    """Evolução de acurácia, latência e custo por modelo e a comparação entre duas execuções."""
+    periods = {"Últimos 7 dias": 7, "Últimos 30 dias": 30, "Últimos 90 dias": 90, "Tudo": None}
+    period = st.selectbox("Período", list(periods), index=1)
+    since = time.time() - periods[period] * 86400 if periods[period] else None
+    try:
+        history = fetch_results_history(since)
+        runs = fetch_result_runs()
+    except requests.exceptions.RequestException as e:
+        st.info(f"Histórico indisponível: {e}")
+        return
+    if not history:
+        st.caption("Nenhuma execução gravada no período.")
+        return
+
+    history_df = pd.DataFrame(history)
+    history_df['data'] = pd.to_datetime(history_df['started_at'], unit='s')
+    chart_cols = st.columns(3)
+    for column, (field, title, fmt) in zip(chart_cols, [
+        ('accuracy', 'Precisão', '.0%'), ('p95_ms', 'Latência p95 (ms)', '.0f'), ('cost_usd', 'Custo (US$)', '.4f'),
+    ]):
+        with column:
+            chart = alt.Chart(history_df).mark_line(point=True).encode(
+                x=alt.X('data:T', title=None),
+                y=alt.Y(f'{field}:Q', title=title, axis=alt.Axis(format=fmt)),
+                color=alt.Color('model_name:N', title='Modelo'),
+                tooltip=['model_name', 'data:T', alt.Tooltip(f'{field}:Q', format=fmt), 'items'],
+            )
+            st.altair_chart(chart, use_container_width=True)
+
+    finished = [run for run in runs if run['status'] != 'running']
+    if len(finished) < 2:
+        return
+    st.subheader("Comparar Execuções")
+    labels = {run_label(run): run['run_id'] for run in finished}
+    compare_cols = st.columns(2)
+    with compare_cols[0]:
+        base_label = st.selectbox("Execução de referência", list(labels), index=1)
+    with compare_cols[1]:
+        other_label = st.selectbox("Execução comparada", list(labels), index=0)
+    if base_label == other_label:
+        return
+
+    comparison = fetch_run_comparison(labels[base_label], labels[other_label])
+    rows = []
+    for model in comparison['models']:
+        base, other, delta = model['base'] or {}, model['other'] or {}, model['delta']
+        rows.append({
+            'model_name': model['model_name'],
+            'precisão (ref.)': base.get('accuracy'), 'precisão': other.get('accuracy'), 'Δ precisão': delta.get('accuracy'),
+            'p95 (ref.)': base.get('p95_ms'), 'p95': other.get('p95_ms'), 'Δ p95': delta.get('p95_ms'),
+            'custo (ref.)': base.get('cost_usd'), 'custo': other.get('cost_usd'),
+        })
+    st.dataframe(
+        pd.DataFrame(rows).set_index('model_name').style.format({
+            'precisão (ref.)': '{:.1%}', 'precisão': '{:.1%}', 'Δ precisão': '{:+.1%}',
+            'p95 (ref.)': '{:.0f} ms', 'p95': '{:.0f} ms', 'Δ p95': '{:+.0f} ms',
+            'custo (ref.)': '$ {:.4f}', 'custo': '$ {:.4f}',
+        }, na_rep='-'),
+        use_container_width=True
+    )
+    changed = comparison['changed_questions']
+    if changed:
+        st.caption(f"{sum(c['status'] == 'regressed' for c in changed)} pergunta(s) passaram a errar, "
+                   f"{sum(c['status'] == 'fixed' for c in changed)} passaram a acertar.")
+        st.dataframe(pd.DataFrame(changed)[['status', 'model_name', 'document_name', 'question']], use_container_width=True)
+    else:
+        st.caption("Nenhuma pergunta mudou de veredicto entre as duas execuções.")
+
 def style_dataframe(df):
     """Aplica formatação condicional no DataFrame para melhor visualização."""
     return df.style.applymap(
@@ -120,6 +315,11 @@ with col1:
         }
     )
     
+    with st.expander("Modo Benchmark (opcional)"):
+        st.caption("Repete o teste para medir a distribuição da latência (p50/p95/p99) em vez de uma única amostra.")
+        warmup_runs = st.number_input("Rodadas de aquecimento (descartadas)", min_value=0, max_value=10, value=0)
+        repetitions = st.number_input("Repetições medidas", min_value=1, max_value=50, value=1)
+
     run_button = st.button("🚀 Executar Teste", width='stretch', type="primary")
 
 with col2:
@@ -127,6 +327,74 @@ with col2:
     results_container = st.container(border=True)
 
 # --- Lógica de Execução ---
+def render_results(api_response, show_raw_json=False):
+    """Desenha o scorecard e a tabela detalhada a partir de uma resposta (parcial ou completa)."""
+    results_df = results_frame(api_response)
+    df, summary = process_results(results_df)
+    if df.empty:
+        return
+
+    st.subheader(f"Resumo Comparativo para: `{api_response['filename']}`")
+    
+    # --- CORREÇÃO APLICADA AQUI ---
+    # Itera sobre os modelos PRESENTES no resultado, não nos selecionados.
+    model_names_in_results = summary.get("accuracy", {}).keys()
+    metric_cols = st.columns(len(model_names_in_results))
+    benchmark = {stats['model_name']: stats for stats in api_response.get('benchmark') or []}
+
+    for i, model_name in enumerate(model_names_in_results):
+        with metric_cols[i]:
+            st.metric(
+                label=f"🎯 Precisão - {model_name}",
+                value=f"{summary['accuracy'].get(model_name, 0):.1%}",
+            )
+            if model_name in benchmark and benchmark[model_name].get('p50_ms') is not None:
+                # No modo benchmark, a mediana e a cauda dizem mais do que a média
+                st.metric(
+                    label=f"⏱️ Latência p50 / p95 - {model_name}",
+                    value=f"{benchmark[model_name]['p50_ms']:.0f} / {benchmark[model_name]['p95_ms']:.0f} ms"
+                )
+            else:
+                st.metric(
+                    label=f"⏱️ Latência Média - {model_name}",
+                    value=f"{summary['avg_latency'].get(model_name, 0):.0f} ms"
+                )
+            st.metric(
+                label=f"💰 Custo Total - {model_name}",
+                value=f"$ {summary['total_cost'].get(model_name, 0):.5f}"
+            )
+    
+    if api_response.get('benchmark'):
+        render_benchmark(api_response, results_df)
+
+    resources = api_response.get('resources')
+    if resources:
+        ceiling = resources.get('memory_ceiling_mb')
+        st.caption(
+            f"🧠 Pico de memória (RSS): {resources['peak_rss_mb']:.0f} MB "
+            f"(+{resources['rss_growth_mb']:.0f} MB na execução"
+            + (f", teto +{ceiling:.0f} MB" if ceiling else "")
+            + ")"
+            + (" — teto ultrapassado" if resources.get('ceiling_exceeded') else "")
+        )
+
+    stage_df = process_stage_timings(results_df)
+    if not stage_df.empty:
+        st.subheader("Onde o Tempo é Gasto (média por item)")
+        # Etapas de primeiro nível; as demais (parse, ocr, render, api...) acontecem dentro delas
+        top_level = [stage for stage in ("queue_wait", "ingest", "query", "judge") if stage in stage_df.columns]
+        st.bar_chart(stage_df[top_level])
+        with st.expander("Ver todas as etapas (ms)"):
+            st.dataframe(stage_df.style.format('{:.1f}'), use_container_width=True)
+
+    st.divider()
+    st.subheader("Resultados Detalhados")
+    st.dataframe(style_dataframe(df), use_container_width=True)
+    
+    if show_raw_json:
+        with st.expander("Ver resposta completa da API (JSON)"):
+            st.json(api_response)
+
 if run_button:
     # 1. Validação dos inputs
     if not uploaded_file:
@@ -136,51 +404,55 @@ if run_button:
     elif gabarito_df.empty or gabarito_df['pergunta'].iloc[0] == "":
         st.warning("Por favor, adicione pelo menos uma pergunta ao gabarito.")
     else:
-        with st.spinner("Analisando o documento com os modelos selecionados... Isso pode levar alguns minutos."):
-            # 2. Preparação dos dados para a API
-            file_bytes = uploaded_file.getvalue()
-            models_str = ",".join(selected_models)
-            
-            # Converte o DataFrame para o formato JSON esperado pela API
-            gabarito_api_format = gabarito_df.rename(columns={
-                "pergunta": "question",
-                "resposta_esperada": "answer"
-            }).to_dict(orient='records')
-            gabarito_json_str = json.dumps({"questions": gabarito_api_format})
-
-            # 3. Chamada à API
-            api_response = run_test_on_api(file_bytes, uploaded_file.name, models_str, gabarito_json_str)
-
-            # 4. Processamento e Exibição dos Resultados
-            if api_response:
-                df, summary = process_results(api_response)
-                
-                with results_container:
-                    st.subheader(f"Resumo Comparativo para: `{api_response['filename']}`")
-                    
-                    # --- CORREÇÃO APLICADA AQUI ---
-                    # Itera sobre os modelos PRESENTES no resultado, não nos selecionados.
-                    model_names_in_results = summary.get("accuracy", {}).keys()
-                    metric_cols = st.columns(len(model_names_in_results))
-
-                    for i, model_name in enumerate(model_names_in_results):
-                        with metric_cols[i]:
-                            st.metric(
-                                label=f"🎯 Precisão - {model_name}",
-                                value=f"{summary['accuracy'].get(model_name, 0):.1%}",
-                            )
-                            st.metric(
-                                label=f"⏱️ Latência Média - {model_name}",
-                                value=f"{summary['avg_latency'].get(model_name, 0):.0f} ms"
-                            )
-                            st.metric(
-                                label=f"💰 Custo Total - {model_name}",
-                                value=f"$ {summary['total_cost'].get(model_name, 0):.5f}"
-                            )
-                    
-                    st.divider()
-                    st.subheader("Resultados Detalhados")
-                    st.dataframe(style_dataframe(df), use_container_width=True)
-                    
-                    with st.expander("Ver resposta completa da API (JSON)"):
-                        st.json(api_response)
\ No newline at end of file
+        # 2. Preparação dos dados para a API
+        file_bytes = uploaded_file.getvalue()
+        models_str = ",".join(selected_models)
+        
+        # Converte o DataFrame para o formato JSON esperado pela API
+        gabarito_api_format = gabarito_df.rename(columns={
+            "pergunta": "question",
+            "resposta_esperada": "answer"
+        }).to_dict(orient='records')
+        gabarito_json_str = json.dumps({"questions": gabarito_api_format})
+        total_items = len(selected_models) * len(gabarito_api_format) * repetitions
+
+        with results_container:
+            progress_bar = st.progress(0.0, text="Analisando o documento com os modelos selecionados...")
+            live_results = st.empty()
+
+        # 3. Chamada à API em streaming: o scorecard é atualizado a cada item avaliado.
+        # Para abortar um teste ruim, basta usar o botão "Stop" do Streamlit.
+        received = {}
+        done = 0
+        final_response = None
+        for event in stream_test_on_api(file_bytes, uploaded_file.name, models_str, gabarito_json_str,
+                                        warmup_runs, repetitions):
+            if event.get("type") == "result":
+                # No modo benchmark, cada repetição substitui a anterior na visão parcial
+                received.setdefault(event["model_name"], {})[event["question_index"]] = event
+                done += 1
+                partial_response = {
+                    "filename": uploaded_file.name,
+                    "test_summary": [
+                        {"model_name": model_name, "results": [items[i] for i in sorted(items)]}
+                        for model_name, items in received.items()
+                    ]
+                }
+                progress_bar.progress(min(done / total_items, 1.0), text=f"{done}/{total_items} itens avaliados...")
+                with live_results.container():
+                    render_results(partial_response)
+            elif event.get("type") == "summary":
+                final_response = event
+            elif event.get("type") == "error":
+                st.error(f"Erro no servidor durante o teste: {event.get('detail')}")
+
+        # 4. Exibição final dos resultados
+        progress_bar.empty()
+        if final_response:
+            with live_results.container():
+                render_results(final_response, show_raw_json=True)
+
+# --- Histórico de Execuções ---
+st.divider()
+st.header("3. Histórico de Execuções")
+render_history()
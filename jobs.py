@@ -0,0 +1,229 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class QueueFullError(Exception):
+    """A fila de jobs atingiu o limite configurado."""
+
+
+class Job:
+    """
+    Um teste submetido para execução em segundo plano.
+    Guarda os resultados parciais à medida que cada item é concluído.
+    """
+    def __init__(self, model_names: List[str], num_questions: int, metadata: Optional[Dict[str, Any]] = None):
+        self.job_id = uuid.uuid4().hex
+        self.status = JobStatus.QUEUED
+        self.model_names = model_names
+        self.num_questions = num_questions
+        self.metadata = metadata or {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self._results = [[None] * num_questions for _ in model_names]
+        self._lock = threading.Lock()
+        self._future = None
+        self._cleanup: Optional[Callable[[], None]] = None
+
+    def record_result(self, model_index: int, question_index: int, result: Dict[str, Any]) -> None:
+        """Callback de progresso passado ao orquestrador."""
+        with self._lock:
+            self._results[model_index][question_index] = result
+
+    def replace_results(self, test_summary: List[Dict[str, Any]]) -> None:
+        """Substitui os resultados parciais pelo resumo final (ex: agregado das repetições do benchmark)."""
+        with self._lock:
+            self._results = [list(model["results"]) for model in test_summary]
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            test_summary = [
+                {"model_name": name, "results": [r for r in results if r is not None]}
+                for name, results in zip(self.model_names, self._results)
+            ]
+        completed = sum(len(model["results"]) for model in test_summary)
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "completed_items": completed,
+            "total_items": self.num_questions * len(self.model_names),
+            "error": self.error,
+            "test_summary": test_summary,
+            **self.metadata,
+        }
+
+
+class CorpusJob(Job):
+    """
+    Um benchmark de corpus: vários documentos, cada um com as suas perguntas, em todos os modelos.
+    O snapshot é o relatório combinado (por documento e agregado por modelo).
+    """
+    def __init__(self, model_names: List[str], documents: List[Dict[str, Any]],
+                 metadata: Optional[Dict[str, Any]] = None):
+        super().__init__(model_names, num_questions=0, metadata=metadata)
+        # Cada documento: {"filename", "filesize_bytes", "document_id", "num_questions"}
+        self.documents = documents
+        self.num_questions = sum(document["num_questions"] for document in documents)
+        self._results = [
+            [[None] * document["num_questions"] for _ in model_names]
+            for document in documents
+        ]
+
+    def record_corpus_result(self, document_index: int, model_index: int, question_index: int,
+                             result: Dict[str, Any]) -> None:
+        """Callback de progresso passado ao orquestrador (`run_corpus`)."""
+        with self._lock:
+            self._results[document_index][model_index][question_index] = result
+
+    @staticmethod
+    def _model_stats(model_name: str, items: List[Dict[str, Any]], total: int) -> Dict[str, Any]:
+        latencies = [item["latency_ms"] for item in items]
+        correct = sum(1 for item in items if item["is_correct"])
+        return {
+            "model_name": model_name,
+            "total_items": total,
+            "completed_items": len(items),
+            "correct_items": correct,
+            "accuracy": correct / len(items) if items else None,
+            "avg_latency_ms": sum(latencies) / len(latencies) if latencies else None,
+            "total_latency_ms": sum(latencies),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            documents = [
+                {
+                    **{k: v for k, v in document.items() if k != "num_questions"},
+                    "test_summary": [
+                        {"model_name": name, "results": [r for r in results if r is not None]}
+                        for name, results in zip(self.model_names, document_results)
+                    ],
+                }
+                for document, document_results in zip(self.documents, self._results)
+            ]
+
+        models = []
+        for model_index, model_name in enumerate(self.model_names):
+            items = [item for document in documents for item in document["test_summary"][model_index]["results"]]
+            models.append(self._model_stats(model_name, items, self.num_questions))
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "completed_items": sum(model["completed_items"] for model in models),
+            "total_items": self.num_questions * len(self.model_names),
+            "error": self.error,
+            "models": models,
+            "documents": documents,
+            **self.metadata,
+        }
+
+
+class JobManager:
+    """
+    Executa jobs em um pool limitado de workers.
+    Quando a fila de espera atinge `max_queued`, novas submissões são recusadas (QueueFullError).
+    Os jobs concluídos mais antigos são descartados além de `max_finished`.
+    """
+    def __init__(self, max_workers: int = 2, max_queued: int = 8, max_finished: int = 100):
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job, work: Callable[[Job], Any], cleanup: Optional[Callable[[], None]] = None) -> Job:
+        """
+        Agenda `work(job)` no pool. `cleanup` sempre roda ao final, inclusive se o job
+        for cancelado antes de começar (ex: remover arquivos temporários).
+        """
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == JobStatus.QUEUED)
+            if queued >= self.max_queued:
+                raise QueueFullError(f"A fila de testes está cheia ({queued} jobs aguardando).")
+            job._cleanup = cleanup
+            self._jobs[job.job_id] = job
+            self._prune()
+            job._future = self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], Any]) -> None:
+        try:
+            if job.cancel_event.is_set():
+                job.status = JobStatus.CANCELLED
+                return
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            work(job)
+            job.status = JobStatus.CANCELLED if job.cancel_event.is_set() else JobStatus.COMPLETED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = job.finished_at or time.time()
+            self._finalize(job)
+
+    def _finalize(self, job: Job) -> None:
+        cleanup, job._cleanup = job._cleanup, None
+        if cleanup:
+            try:
+                cleanup()
+            except Exception as e:
+                print(f"Aviso: Erro ao limpar o job {job.job_id}: {e}")
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancela um job. Jobs na fila não chegam a rodar; jobs em execução
+        terminam os itens já iniciados e descartam o restante.
+        """
+        job = self.get(job_id)
+        if job is None or job.is_finished:
+            return job
+        job.cancel_event.set()
+        if job._future is not None and job._future.cancel():
+            # Não chegou a começar: _run nunca será chamado
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            self._finalize(job)
+        return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,248 @@
+"""
+Gerador de carga para a API: dispara `POST /test/pdf` com concorrência e taxa de chegada
+configuráveis e reporta vazão, taxas de erro e percentis de latência.
+
+Para medir só o custo do servidor (sem chave da OpenAI), suba a API com os modelos e o juiz simulados:
+
+    MOCK_MODELS=1 JUDGE_BACKEND=stub uvicorn main:app
+    python load_test.py --pdf tests/exemplo.pdf --models mock_remote,mock_local --concurrency 16 --rate 4 --requests 200
+
+Sem `--rate`, a carga é fechada: `--concurrency` clientes enviam uma requisição atrás da outra.
+Com `--rate`, a carga é aberta: as requisições chegam como um processo de Poisson, e a latência
+também é medida a partir da chegada programada (inclui a espera por um cliente livre).
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+
+import httpx
+
+# --- CONFIGURAÇÃO ---
+API_BASE_URL = "http://127.0.0.1:8000"
+DEFAULT_MODELS = ["mock_remote"]
+DEFAULT_QUESTIONS = [
+    {"question": "Qual o CNPJ da empresa?", "answer": "12.345.678/0001-99"},
+    {"question": "Qual o valor total?", "answer": "R$ 1.500,00"},
+    {"question": "Qual a garantia do produto?", "answer": "1 ano"},
+]
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 do arquivo, calculado em blocos. É o id do documento na API."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def percentile(sorted_values, q):
+    """Percentil com interpolação linear (valores já ordenados)."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def latency_summary(samples_s):
+    """Resumo (ms) de uma amostra de latências em segundos."""
+    values = sorted(sample * 1000 for sample in samples_s)
+    if not values:
+        return {"samples": 0}
+    return {
+        "samples": len(values),
+        "mean_ms": sum(values) / len(values),
+        "p50_ms": percentile(values, 50),
+        "p90_ms": percentile(values, 90),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1],
+    }
+
+
+async def ensure_document(client, pdf_path):
+    """Envia o PDF uma única vez (se a API ainda não o tiver) e retorna o id do documento."""
+    document_id = file_sha256(pdf_path)
+    response = await client.head(f"/documents/{document_id}")
+    if response.status_code == 404:
+        with open(pdf_path, 'rb') as pdf_file:
+            files_payload = {'file': (os.path.basename(pdf_path), pdf_file.read(), 'application/pdf')}
+        response = await client.post("/documents", files=files_payload)
+    response.raise_for_status()
+    return document_id
+
+
+async def send_request(client, args, form, pdf_bytes, arrived_at, results):
+    """Uma requisição de teste; o resultado (status, latências, itens) vai para `results`."""
+    started_at = time.perf_counter()
+    record = {}
+    try:
+        files = None
+        if pdf_bytes is not None:
+            files = {'file': (os.path.basename(args.pdf), pdf_bytes, 'application/pdf')}
+        response = await client.post("/test/pdf", data=form, files=files)
+        record["status"] = response.status_code
+        if response.status_code == 200:
+            items = [item for model in response.json()["test_summary"] for item in model["results"]]
+            record["items"] = len(items)
+            record["item_errors"] = sum(1 for item in items if str(item["actual_answer"]).startswith("ERRO"))
+            record["correct"] = sum(1 for item in items if item["is_correct"])
+    except httpx.HTTPError as e:
+        record["status"] = type(e).__name__
+    finished_at = time.perf_counter()
+    record["latency_s"] = finished_at - started_at
+    record["response_time_s"] = finished_at - arrived_at
+    results.append(record)
+
+
+async def run_load(args, questions):
+    """Gera a carga e retorna (registros de cada requisição, duração total em segundos)."""
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=timeout) as client:
+        form = {
+            'test_suite_json': json.dumps({"questions": questions}),
+            'models_to_run': args.models,
+        }
+        pdf_bytes = None
+        if args.upload_each:
+            with open(args.pdf, 'rb') as pdf_file:
+                pdf_bytes = pdf_file.read()
+        else:
+            form['document_id'] = await ensure_document(client, args.pdf)
+
+        results = []
+        start = time.perf_counter()
+        deadline = start + args.duration if args.duration else None
+
+        if args.rate <= 0:
+            # Carga fechada: cada cliente envia a próxima requisição assim que recebe a resposta
+            issued = itertools.count()
+
+            async def client_loop():
+                while next(issued) < args.requests and (deadline is None or time.perf_counter() < deadline):
+                    await send_request(client, args, form, pdf_bytes, time.perf_counter(), results)
+
+            await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+            return results, time.perf_counter() - start
+
+        # Carga aberta: chegadas de Poisson (intervalos exponenciais), independentes das respostas
+        semaphore = asyncio.Semaphore(args.concurrency)
+        rng = random.Random(args.seed)
+
+        async def arrival(arrived_at):
+            async with semaphore:
+                await send_request(client, args, form, pdf_bytes, arrived_at, results)
+
+        tasks = []
+        arrived_at = start
+        for _ in range(args.requests):
+            arrived_at += rng.expovariate(args.rate)
+            if deadline is not None and arrived_at >= deadline:
+                break
+            delay = arrived_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(arrival(arrived_at)))
+        await asyncio.gather(*tasks)
+        return results, time.perf_counter() - start
+
+
+def build_report(args, results, elapsed_s):
+    """Vazão, erros e percentis de latência da execução."""
+    ok = [record for record in results if record["status"] == 200]
+    statuses = Counter(str(record["status"]) for record in results if record["status"] != 200)
+    items = sum(record.get("items", 0) for record in ok)
+    item_errors = sum(record.get("item_errors", 0) for record in ok)
+    report = {
+        "config": {
+            "api_url": args.api_url, "models": args.models, "concurrency": args.concurrency,
+            "rate_rps": args.rate or None, "questions_per_request": args.questions_per_request,
+            "upload_each": args.upload_each,
+        },
+        "requests": len(results),
+        "succeeded": len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else None,
+        "errors": dict(statuses),
+        "duration_s": elapsed_s,
+        "throughput_rps": len(ok) / elapsed_s if elapsed_s else None,
+        "items_per_s": items / elapsed_s if elapsed_s else None,
+        "item_error_rate": item_errors / items if items else None,
+        "accuracy": sum(record.get("correct", 0) for record in ok) / items if items else None,
+        # Tempo de serviço: do envio até a resposta
+        "latency": latency_summary([record["latency_s"] for record in ok]),
+    }
+    if args.rate > 0:
+        # Carga aberta: a partir da chegada programada (inclui a espera por um cliente livre)
+        report["response_time"] = latency_summary([record["response_time_s"] for record in ok])
+    return report
+
+
+def print_report(report):
+    print("\n=======================================================")
+    print(f"📨 Requisições: {report['requests']} ({report['succeeded']} com sucesso) em {report['duration_s']:.1f}s")
+    if report["errors"]:
+        print(f"❌ Erros ({report['error_rate']:.1%}): " + ", ".join(f"{k}: {v}" for k, v in sorted(report["errors"].items())))
+    if report["throughput_rps"] is not None:
+        print(f"🚀 Vazão: {report['throughput_rps']:.2f} req/s, {report['items_per_s']:.1f} itens/s")
+    if report["item_error_rate"] is not None:
+        print(f"⚠️ Itens com erro do modelo: {report['item_error_rate']:.1%}")
+    for key, label in (("latency", "Latência (envio → resposta)"), ("response_time", "Tempo de resposta (chegada → resposta)")):
+        stats = report.get(key)
+        if stats and stats["samples"]:
+            print(f"⏱️ {label}: p50 {stats['p50_ms']:.0f} ms · p90 {stats['p90_ms']:.0f} ms · "
+                  f"p95 {stats['p95_ms']:.0f} ms · p99 {stats['p99_ms']:.0f} ms · máx {stats['max_ms']:.0f} ms")
+    print("=======================================================")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Teste de carga do endpoint /test/pdf.")
+    parser.add_argument("--pdf", required=True, help="PDF usado em todas as requisições.")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Modelos separados por vírgula.")
+    parser.add_argument("--questions", help="Suíte JSON {'questions': [...]} (padrão: perguntas de exemplo).")
+    parser.add_argument("--questions-per-request", type=int, default=len(DEFAULT_QUESTIONS),
+                        help="Perguntas enviadas em cada requisição (repete a suíte se preciso).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requisições simultâneas (máximo).")
+    parser.add_argument("--rate", type=float, default=0.0, help="Chegadas por segundo (0 = carga fechada).")
+    parser.add_argument("--requests", type=int, default=100, help="Total de requisições.")
+    parser.add_argument("--duration", type=float, default=None, help="Para de gerar carga após N segundos.")
+    parser.add_argument("--upload-each", action="store_true",
+                        help="Envia o PDF em toda requisição (padrão: envia uma vez e usa o document_id).")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout de cada requisição (s).")
+    parser.add_argument("--seed", type=int, default=0, help="Semente das chegadas aleatórias.")
+    parser.add_argument("--output", help="Salva o relatório em JSON.")
+    parser.add_argument("--api-url", default=API_BASE_URL, help="Endereço da API.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, 'r', encoding='utf-8') as f:
+            questions = json.load(f)["questions"]
+    questions = [questions[i % len(questions)] for i in range(max(args.questions_per_request, 1))]
+
+    mode = f"aberta, {args.rate:g} req/s" if args.rate > 0 else "fechada"
+    print(f"--- 🧪 Carga {mode}: até {args.requests} requisições, {args.concurrency} simultâneas, "
+          f"modelos {args.models} ---")
+    results, elapsed_s = asyncio.run(run_load(args, questions))
+    report = build_report(args, results, elapsed_s)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📄 Relatório salvo em: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
 import os
 import json
-import tempfile
-from typing import List
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import queue
+from typing import List, Literal, Optional
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import ValidationError
 
 from orchestrator import PDFTestOrchestrator
-from schemas import TestSummaryResponse
-from models.local_ocr_model import LocalOCRModel
-from models.openai_vision_model import OpenAIVisionModel
+from jobs import CorpusJob, Job, JobManager, QueueFullError
+from schemas import (
+    TestSummaryResponse, JobSubmitResponse, JobStatusResponse, TestResultEvent, TestSummaryEvent,
+    StoredDocumentResponse, CorpusBenchmarkRequest, CorpusBenchmarkReport,
+)
+from utils.compact_results import EXPORT_MEDIA_TYPES, compact_report, export_results
+from utils.document_store import StoredDocument, get_document_store
+from utils.judge import get_judge
+from utils.metrics import REGISTRY
+from utils.results_store import get_results_store
+from models.registry import ModelUnavailableError, get_model_registry
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -19,36 +29,51 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# --- Instância dos Modelos ---
-AVAILABLE_MODELS = {
-    "local_ocr": LocalOCRModel(),
-    "openai_gpt4o": OpenAIVisionModel(model_name="gpt-4o")
-}
+# --- Registro dos Modelos ---
+# Modelos embutidos, de entry points e do MODELS_CONFIG; cada um é importado e criado só no primeiro uso
+model_registry = get_model_registry()
 
-# --- Endpoint Principal ---
-@app.post("/test/pdf", response_model=TestSummaryResponse, tags=["PDF Testing"])
-async def run_pdf_test(
-    file: UploadFile = File(..., description="Arquivo PDF a ser testado."),
-    test_suite_json: str = Form(..., description='JSON string contendo uma lista de objetos com "question" e "answer".'),
-    models_to_run: str = Form(..., description="String com nomes dos modelos separados por vírgula. Ex: 'local_ocr,openai_gpt4o'")
-):
-    """
-    Recebe um PDF, um conjunto de perguntas/respostas e uma lista de modelos.
-    Executa os testes e retorna um resumo comparativo.
-    """
+# --- Pool de Jobs em Segundo Plano ---
+# JOB_WORKERS: testes executados ao mesmo tempo
+# JOB_QUEUE_DEPTH: testes aguardando na fila antes de recusar com HTTP 429
+job_manager = JobManager(
+    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_queued=int(os.getenv("JOB_QUEUE_DEPTH", "8")),
+)
+
+# --- Armazenamento de Documentos (endereçado pelo SHA-256 do conteúdo) ---
+document_store = get_document_store()
+
+# --- Histórico de Resultados (SQLite; None se RESULTS_DB_PATH estiver vazio) ---
+results_store = get_results_store()
+
+@app.on_event("shutdown")
+def shutdown_job_manager():
+    job_manager.shutdown()
+
+# --- Funções Auxiliares ---
+async def _select_models(models_to_run: str) -> List:
+    """Valida os nomes dos modelos solicitados e retorna as instâncias correspondentes."""
     model_name_list = [name.strip() for name in models_to_run.split(',')]
 
-    # Validação dos modelos solicitados
-    selected_models = []
     for model_name in model_name_list:
-        if model_name not in AVAILABLE_MODELS:
+        if model_name not in model_registry:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Modelo '{model_name}' não é válido. Modelos disponíveis: {list(AVAILABLE_MODELS.keys())}"
+                detail=f"Modelo '{model_name}' não é válido. Modelos disponíveis: {model_registry.keys()}"
             )
-        selected_models.append(AVAILABLE_MODELS[model_name])
 
-    # Validação do JSON da suíte de testes
+    selected_models = []
+    for model_name in model_name_list:
+        try:
+            # O primeiro uso importa as dependências do modelo: fora do event loop
+            selected_models.append(await run_in_threadpool(model_registry.get, model_name))
+        except ModelUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    return selected_models
+
+def _parse_questions(test_suite_json: str) -> List[dict]:
+    """Valida o JSON da suíte de testes e retorna a lista de perguntas."""
     try:
         test_suite = json.loads(test_suite_json)
         questions = test_suite.get("questions", [])
@@ -56,28 +81,416 @@ async def run_pdf_test(
             raise ValueError("A chave 'questions' não pode estar vazia no JSON.")
     except (json.JSONDecodeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"JSON da suíte de testes inválido: {e}")
+    return questions
 
-    # Salva o arquivo temporariamente
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_pdf_path = temp_file.name
+async def _resolve_document(file: Optional[UploadFile], document_id: Optional[str]) -> StoredDocument:
+    """
+    Retorna o documento do teste: o arquivo enviado (gravado no armazenamento em blocos)
+    ou um documento já armazenado, referenciado pelo id.
+    O documento volta protegido contra remoção; libere com `document_store.unpin`.
+    """
+    if file is not None:
+        document, _ = await document_store.save_upload(file, pin=True)
+        return document
+    if document_id:
+        document = document_store.get(document_id, pin=True)
+        if document is None:
+            raise HTTPException(status_code=404, detail=f"Documento '{document_id}' não encontrado. Envie-o em `/documents`.")
+        return document
+    raise HTTPException(status_code=400, detail="Envie um arquivo PDF em `file` ou informe um `document_id`.")
+
+# Formato das respostas com resultados: o relatório aninhado padrão, o compacto (colunar)
+# ou uma exportação binária (pacote opcional `pyarrow`)
+ResponseFormat = Literal["json", "compact", "arrow", "parquet"]
+RESPONSE_FORMAT_HELP = (
+    "`json` (padrão, aninhado), `compact` (colunar: perguntas, documentos e respostas sem repetição) "
+    "ou `arrow`/`parquet` (exportação binária, requer `pyarrow`)."
+)
 
+def _format_report(report: dict, response_format: str):
+    """Converte um relatório de resultados para o formato pedido (roda fora do event loop)."""
+    if response_format == "json":
+        return report
+    compact = compact_report(report)
+    if response_format == "compact":
+        # Serializa aqui mesmo, sem a validação do response_model
+        return JSONResponse(compact)
     try:
-        # Executa a orquestração
+        content = export_results(compact, response_format)
+    except ImportError:
+        raise HTTPException(status_code=503, detail="A exportação em Arrow/Parquet requer o pacote `pyarrow`.")
+    return Response(content, media_type=EXPORT_MEDIA_TYPES[response_format])
+
+def _run_suite(orchestrator: PDFTestOrchestrator, pdf_path: str, questions: List[dict],
+               warmup_runs: int, repetitions: int, **kwargs):
+    """Executa uma passada simples ou, com aquecimento/repetições, o modo benchmark. Retorna (test_summary, benchmark)."""
+    if warmup_runs == 0 and repetitions == 1:
+        return orchestrator.run_tests(pdf_path, questions, **kwargs), None
+    return orchestrator.run_benchmark(pdf_path, questions, warmup_runs=warmup_runs, repetitions=repetitions, **kwargs)
+
+# --- Endpoint Principal ---
+@app.post("/test/pdf", response_model=TestSummaryResponse, tags=["PDF Testing"])
+async def run_pdf_test(
+    file: Optional[UploadFile] = File(None, description="Arquivo PDF a ser testado (ou use `document_id`)."),
+    document_id: Optional[str] = Form(None, description="Id (SHA-256) de um documento já enviado para `/documents`."),
+    test_suite_json: str = Form(..., description='JSON string contendo uma lista de objetos com "question" e "answer".'),
+    models_to_run: str = Form(..., description="String com nomes dos modelos separados por vírgula. Ex: 'local_ocr,openai_gpt4o'"),
+    warmup_runs: int = Form(0, ge=0, le=10, description="Modo benchmark: passadas de aquecimento descartadas."),
+    repetitions: int = Form(1, ge=1, le=50, description="Modo benchmark: passadas medidas (com mais de uma, a resposta traz percentis de latência)."),
+    response_format: ResponseFormat = Form("json", description=RESPONSE_FORMAT_HELP)
+):
+    """
+    Recebe um PDF, um conjunto de perguntas/respostas e uma lista de modelos.
+    Executa os testes e retorna um resumo comparativo.
+    Para testes longos, prefira a API de jobs (`POST /jobs/pdf`).
+    """
+    selected_models = await _select_models(models_to_run)
+    questions = _parse_questions(test_suite_json)
+
+    document = await _resolve_document(file, document_id)
+    filename = file.filename if file else document.filename
+
+    try:
+        # Executa a orquestração fora do event loop, para não travar o servidor
         orchestrator = PDFTestOrchestrator(models=selected_models)
-        results = orchestrator.run_tests(temp_pdf_path, questions)
+        results, benchmark = await run_in_threadpool(
+            _run_suite, orchestrator, document.path, questions, warmup_runs, repetitions,
+            doc_hash=document.document_id, document_name=filename,
+        )
         
-        return {
-            "filename": file.filename,
-            "filesize_bytes": len(content),
-            "test_summary": results
+        report = {
+            "filename": filename,
+            "filesize_bytes": document.size_bytes,
+            "document_id": document.document_id,
+            "test_summary": results,
+            "benchmark": benchmark,
+            "resources": orchestrator.resources,
+            "run_id": orchestrator.run_id,
         }
+        return await run_in_threadpool(_format_report, report, response_format)
     finally:
-        # Garante que o arquivo temporário seja deletado
-        os.unlink(temp_pdf_path)
+        # Libera o documento para a política de remoção do armazenamento
+        document_store.unpin(document.document_id)
+
+@app.post("/test/pdf/stream", tags=["PDF Testing"])
+async def stream_pdf_test(
+    file: Optional[UploadFile] = File(None, description="Arquivo PDF a ser testado (ou use `document_id`)."),
+    document_id: Optional[str] = Form(None, description="Id (SHA-256) de um documento já enviado para `/documents`."),
+    test_suite_json: str = Form(..., description='JSON string contendo uma lista de objetos com "question" e "answer".'),
+    models_to_run: str = Form(..., description="String com nomes dos modelos separados por vírgula. Ex: 'local_ocr,openai_gpt4o'"),
+    warmup_runs: int = Form(0, ge=0, le=10, description="Modo benchmark: passadas de aquecimento descartadas."),
+    repetitions: int = Form(1, ge=1, le=50, description="Modo benchmark: passadas medidas (com mais de uma, a resposta traz percentis de latência)."),
+    response_format: Literal["json", "compact"] = Form("json", description="Formato do registro de resumo: `json` ou `compact` (colunar).")
+):
+    """
+    Variante em streaming de `/test/pdf` (NDJSON, um objeto JSON por linha).
+    Cada item é enviado assim que é avaliado (`"type": "result"`), na ordem em que termina,
+    e ao final vem um registro de resumo (`"type": "summary"`) no mesmo formato de `/test/pdf`.
+    Se o cliente desconectar, as perguntas ainda não iniciadas são canceladas.
+    """
+    selected_models = await _select_models(models_to_run)
+    questions = _parse_questions(test_suite_json)
+    document = await _resolve_document(file, document_id)
+    filename = file.filename if file else document.filename
+
+    model_names = [model.model_name for model in selected_models]
+    job = Job(
+        model_names=model_names,
+        num_questions=len(questions),
+        metadata={"filename": filename, "filesize_bytes": document.size_bytes, "document_id": document.document_id},
+    )
+    events = queue.Queue()
+
+    def on_result(model_index, question_index, result):
+        job.record_result(model_index, question_index, result)
+        event = TestResultEvent(model_name=model_names[model_index], question_index=question_index, **result)
+        events.put(event.model_dump_json())
+
+    def work(job: Job):
+        orchestrator = PDFTestOrchestrator(models=selected_models)
+        results, benchmark = _run_suite(
+            orchestrator, document.path, questions, warmup_runs, repetitions,
+            on_result=on_result, cancel_event=job.cancel_event, doc_hash=document.document_id,
+            document_name=filename,
+        )
+        summary = TestSummaryEvent(
+            job_id=job.job_id,
+            status="cancelled" if job.cancel_event.is_set() else "completed",
+            filename=filename,
+            filesize_bytes=document.size_bytes,
+            document_id=document.document_id,
+            test_summary=results,
+            benchmark=benchmark,
+            resources=orchestrator.resources,
+            run_id=orchestrator.run_id,
+        )
+        if response_format == "compact":
+            events.put(json.dumps(compact_report(summary.model_dump()), ensure_ascii=False))
+        else:
+            events.put(summary.model_dump_json())
+
+    def cleanup():
+        document_store.unpin(document.document_id)
+        events.put(None)  # Sinaliza o fim do stream (inclusive em caso de erro)
+
+    try:
+        job_manager.submit(job, work, cleanup=cleanup)
+    except QueueFullError as e:
+        document_store.unpin(document.document_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+
+    def generate():
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                yield event + "\n"
+            if job.status == "failed":
+                yield json.dumps({"type": "error", "job_id": job.job_id, "detail": job.error}, ensure_ascii=False) + "\n"
+        finally:
+            # Cliente desconectou (ou o stream terminou): descarta o que ainda não começou
+            job_manager.cancel(job.job_id)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers={"X-Job-Id": job.job_id})
+
+# --- Endpoints de Jobs ---
+@app.post("/jobs/pdf", response_model=JobSubmitResponse, status_code=202, tags=["PDF Testing"])
+async def submit_pdf_test_job(
+    file: Optional[UploadFile] = File(None, description="Arquivo PDF a ser testado (ou use `document_id`)."),
+    document_id: Optional[str] = Form(None, description="Id (SHA-256) de um documento já enviado para `/documents`."),
+    test_suite_json: str = Form(..., description='JSON string contendo uma lista de objetos com "question" e "answer".'),
+    models_to_run: str = Form(..., description="String com nomes dos modelos separados por vírgula. Ex: 'local_ocr,openai_gpt4o'"),
+    warmup_runs: int = Form(0, ge=0, le=10, description="Modo benchmark: passadas de aquecimento descartadas."),
+    repetitions: int = Form(1, ge=1, le=50, description="Modo benchmark: passadas medidas (com mais de uma, a resposta traz percentis de latência).")
+):
+    """
+    Submete um teste para execução em segundo plano e retorna imediatamente o id do job.
+    Acompanhe o progresso (e os resultados parciais) em `GET /jobs/{job_id}`.
+    """
+    selected_models = await _select_models(models_to_run)
+    questions = _parse_questions(test_suite_json)
+    document = await _resolve_document(file, document_id)
+
+    filename = file.filename if file else document.filename
+    job = Job(
+        model_names=[model.model_name for model in selected_models],
+        num_questions=len(questions),
+        metadata={
+            "filename": filename,
+            "filesize_bytes": document.size_bytes,
+            "document_id": document.document_id,
+        },
+    )
+
+    def work(job: Job):
+        orchestrator = PDFTestOrchestrator(models=selected_models)
+        results, benchmark = _run_suite(
+            orchestrator, document.path, questions, warmup_runs, repetitions,
+            on_result=job.record_result, cancel_event=job.cancel_event, doc_hash=document.document_id,
+            document_name=filename,
+        )
+        if benchmark is not None:
+            # Resultado final: um item por pergunta (mediana + amostras de todas as repetições)
+            job.replace_results(results)
+            job.metadata["benchmark"] = benchmark
+        job.metadata["resources"] = orchestrator.resources
+        job.metadata["run_id"] = orchestrator.run_id
+
+    try:
+        job_manager.submit(job, work, cleanup=lambda: document_store.unpin(document.document_id))
+    except QueueFullError as e:
+        document_store.unpin(document.document_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+
+    return {"job_id": job.job_id, "status": job.status}
+
+def _get_job(job_id: str, corpus: bool = False) -> Job:
+    """Busca um job do tipo pedido (teste de um PDF ou benchmark de corpus)."""
+    job = job_manager.get(job_id)
+    if job is None or isinstance(job, CorpusJob) != corpus:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
+    return job
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse, tags=["PDF Testing"])
+async def get_pdf_test_job(job_id: str, response_format: ResponseFormat = Query("json", description=RESPONSE_FORMAT_HELP)):
+    """Retorna o status de um job e os resultados já concluídos."""
+    return await run_in_threadpool(_format_report, _get_job(job_id).snapshot(), response_format)
+
+@app.delete("/jobs/{job_id}", response_model=JobStatusResponse, tags=["PDF Testing"])
+async def cancel_pdf_test_job(job_id: str):
+    """Cancela um job. Os itens já concluídos continuam disponíveis."""
+    job = _get_job(job_id)
+    job_manager.cancel(job_id)
+    return job.snapshot()
+
+# --- Endpoints de Benchmark de Corpus ---
+@app.post("/benchmarks/corpus", response_model=JobSubmitResponse, status_code=202, tags=["Corpus Benchmark"])
+async def submit_corpus_benchmark(request: CorpusBenchmarkRequest):
+    """
+    Submete um benchmark de corpus: vários PDFs (já enviados para `/documents`), cada um com as
+    suas perguntas, em todos os modelos pedidos. Todo o trabalho documento × modelo × pergunta é
+    agendado em um pool compartilhado, e o relatório combinado fica em `GET /benchmarks/{job_id}`.
+    """
+    if not request.documents:
+        raise HTTPException(status_code=400, detail="O manifesto precisa de pelo menos um documento.")
+    selected_models = await _select_models(",".join(request.models))
+    for entry in request.documents:
+        if not entry.questions:
+            raise HTTPException(status_code=400, detail=f"O documento '{entry.document_id}' não tem perguntas.")
+
+    # Protege os documentos contra remoção enquanto o benchmark estiver na fila ou rodando
+    pinned, missing = [], []
+    for entry in request.documents:
+        document = document_store.get(entry.document_id, pin=True)
+        if document is None:
+            missing.append(entry.document_id)
+        else:
+            pinned.append(document)
+
+    def release():
+        for document in pinned:
+            document_store.unpin(document.document_id)
+
+    if missing:
+        release()
+        raise HTTPException(
+            status_code=404,
+            detail=f"Documentos não encontrados (envie-os em `/documents`): {sorted(set(missing))}"
+        )
+
+    names = [entry.name or document.filename for entry, document in zip(request.documents, pinned)]
+    job = CorpusJob(
+        model_names=[model.model_name for model in selected_models],
+        documents=[
+            {
+                "filename": name,
+                "filesize_bytes": document.size_bytes,
+                "document_id": document.document_id,
+                "num_questions": len(entry.questions),
+            }
+            for entry, document, name in zip(request.documents, pinned, names)
+        ],
+    )
+
+    def work(job: CorpusJob):
+        orchestrator = PDFTestOrchestrator(models=selected_models)
+        orchestrator.run_corpus(
+            [
+                {"pdf_path": document.path, "doc_hash": document.document_id, "name": name,
+                 "questions": entry.questions}
+                for entry, document, name in zip(request.documents, pinned, names)
+            ],
+            on_result=job.record_corpus_result,
+            cancel_event=job.cancel_event,
+        )
+        job.metadata["resources"] = orchestrator.resources
+        job.metadata["run_id"] = orchestrator.run_id
+
+    try:
+        job_manager.submit(job, work, cleanup=release)
+    except QueueFullError as e:
+        release()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+
+    return {"job_id": job.job_id, "status": job.status}
+
+@app.get("/benchmarks/{job_id}", response_model=CorpusBenchmarkReport, tags=["Corpus Benchmark"])
+async def get_corpus_benchmark(job_id: str, response_format: ResponseFormat = Query("json", description=RESPONSE_FORMAT_HELP)):
+    """
+    Retorna o relatório combinado do benchmark (parcial enquanto ele estiver rodando).
+    Em corpora grandes, `compact` evita repetir perguntas, gabaritos e respostas a cada item.
+    """
+    return await run_in_threadpool(_format_report, _get_job(job_id, corpus=True).snapshot(), response_format)
+
+@app.delete("/benchmarks/{job_id}", response_model=CorpusBenchmarkReport, tags=["Corpus Benchmark"])
+async def cancel_corpus_benchmark(job_id: str, response_format: ResponseFormat = Query("json", description=RESPONSE_FORMAT_HELP)):
+    """Cancela um benchmark. Os itens já concluídos continuam no relatório."""
+    job = _get_job(job_id, corpus=True)
+    job_manager.cancel(job_id)
+    return await run_in_threadpool(_format_report, job.snapshot(), response_format)
+
+# --- Endpoints do Histórico de Resultados ---
+def _get_results_store():
+    if results_store is None:
+        raise HTTPException(status_code=503, detail="Histórico de resultados desativado (RESULTS_DB_PATH vazio).")
+    return results_store
+
+@app.get("/results/runs", tags=["Results History"])
+async def list_result_runs(limit: int = 50, model: Optional[str] = None):
+    """Execuções gravadas no histórico (mais recentes primeiro), com acurácia, latência e custo por modelo."""
+    return await run_in_threadpool(_get_results_store().runs, limit=limit, model_name=model)
+
+@app.get("/results/history", tags=["Results History"])
+async def get_results_history(model: Optional[str] = None, since: Optional[float] = None,
+                              until: Optional[float] = None):
+    """
+    Evolução dos agregados ao longo do tempo: um ponto por execução e modelo (acurácia,
+    p50/p95/p99 da latência, custo). `since`/`until` são timestamps Unix.
+    """
+    return await run_in_threadpool(_get_results_store().history, model_name=model, since=since, until=until)
+
+@app.get("/results/compare", tags=["Results History"])
+async def compare_result_runs(base: str, other: str):
+    """Compara duas execuções: agregados lado a lado e as perguntas que passaram a acertar ou errar."""
+    return await run_in_threadpool(_get_results_store().compare_runs, base, other)
+
+# --- Endpoints de Documentos ---
+def _document_response(document: StoredDocument, already_stored: bool = True) -> dict:
+    return {
+        "document_id": document.document_id,
+        "filename": document.filename,
+        "size_bytes": document.size_bytes,
+        "created_at": document.created_at,
+        "already_stored": already_stored,
+    }
+
+@app.post("/documents", response_model=StoredDocumentResponse, tags=["Documents"])
+async def upload_document(file: UploadFile = File(..., description="Arquivo PDF a ser armazenado.")):
+    """
+    Armazena um PDF (gravado em disco em blocos) e retorna o seu id, o SHA-256 do conteúdo.
+    Enviar de novo o mesmo conteúdo não duplica nada.
+    """
+    document, already_stored = await document_store.save_upload(file)
+    return _document_response(document, already_stored)
+
+@app.api_route("/documents/{document_id}", methods=["GET", "HEAD"], response_model=StoredDocumentResponse, tags=["Documents"])
+async def get_document(document_id: str):
+    """Verifica se um documento já está armazenado (pelo SHA-256), para evitar reenviá-lo."""
+    document = document_store.get(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Documento '{document_id}' não encontrado.")
+    return _document_response(document)
+
+@app.delete("/documents/{document_id}", status_code=204, tags=["Documents"])
+async def delete_document(document_id: str):
+    """Remove um documento armazenado (documentos em uso por algum teste não são removidos)."""
+    if document_store.get(document_id) is None:
+        raise HTTPException(status_code=404, detail=f"Documento '{document_id}' não encontrado.")
+    if not document_store.delete(document_id):
+        raise HTTPException(status_code=409, detail=f"Documento '{document_id}' está em uso por um teste.")
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Configuration"])
+async def get_metrics():
+    """
+    Métricas no formato de exposição do Prometheus: histogramas da duração de cada etapa
+    (por modelo), da latência por item e a contagem de itens avaliados.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/judge/stats", tags=["Configuration"])
+async def get_judge_stats():
+    """
+    Limiares do avaliador local e a concordância dele com o juiz de IA: quantos itens foram
+    decididos localmente, quantos foram para o juiz e quanto as duas avaliações concordam.
+    """
+    return get_judge().stats()
 
 @app.get("/models", tags=["Configuration"])
 async def get_available_models():
-    """Retorna a lista de modelos de ingestão disponíveis para teste."""
-    return {"models": list(AVAILABLE_MODELS.keys())}
\ No newline at end of file
+    """
+    Retorna a lista de modelos de ingestão disponíveis para teste e a prontidão de cada um
+    (`ready`: carregado; `available`: carrega no primeiro uso; `unavailable`: falta dependência
+    ou variável de ambiente; `error`: a última tentativa de carregar falhou).
+    """
+    return {"models": model_registry.keys(), "details": model_registry.status()}
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Servidor que simula o endpoint de chat da OpenAI, para testar o dispatcher (limites de taxa,
+prioridades e novas tentativas) e a plataforma inteira sem gastar créditos.
+
+    uvicorn mock_openai_server:app --port 8001
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock uvicorn main:app
+
+Variáveis de ambiente:
+MOCK_LATENCY_MS: latência simulada de cada resposta (padrão: 200)
+MOCK_RPM: requisições por minuto aceitas antes de responder 429 (padrão: 0, sem limite)
+MOCK_ERROR_RATE: fração das requisições que recebem 429/500 aleatórios (padrão: 0)
+MOCK_RETRY_AFTER: valor do cabeçalho `Retry-After` nos 429 (padrão: 1)
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Servidor simulado da OpenAI")
+
+LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "200"))
+RPM = int(os.getenv("MOCK_RPM", "0"))
+ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+RETRY_AFTER = os.getenv("MOCK_RETRY_AFTER", "1")
+
+_recent_requests = deque()
+_lock = threading.Lock()
+stats = {"requests": 0, "rate_limited": 0, "server_errors": 0}
+
+
+def _error(status: int, message: str, headers=None) -> JSONResponse:
+    error_type = "rate_limit_error" if status == 429 else "server_error"
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": error_type, "code": None, "param": None}},
+        headers=headers,
+    )
+
+
+def _prompt_text(messages) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if part.get("type") == "text")
+        else:
+            parts.append(content or "")
+    return "\n".join(parts)
+
+
+def _answer(body: dict) -> str:
+    """Resposta determinística no formato que cada chamador espera."""
+    prompt = _prompt_text(body.get("messages", []))
+    response_format = (body.get("response_format") or {}).get("type")
+
+    if response_format == "json_schema":
+        # Juiz em lote: um veredicto por "id: N" do prompt
+        ids = [int(i) for i in re.findall(r"^id: (\d+)", prompt, flags=re.MULTILINE)]
+        return json.dumps({"verdicts": [{"id": i, "correct": True} for i in ids]})
+    if response_format == "json_object":
+        # Modelo multimodal em lote: uma resposta por pergunta numerada
+        ids = [int(i) for i in re.findall(r'^\s*(\d+)\. "', prompt, flags=re.MULTILINE)]
+        return json.dumps({"answers": [{"id": i, "answer": f"Resposta simulada {i}"} for i in ids]})
+    if "Responda apenas com a palavra" in prompt:
+        return "Sim"  # Juiz individual
+    return "Resposta simulada."
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    now = time.monotonic()
+    with _lock:
+        stats["requests"] += 1
+        while _recent_requests and now - _recent_requests[0] > 60:
+            _recent_requests.popleft()
+        over_limit = RPM > 0 and len(_recent_requests) >= RPM
+        if over_limit:
+            # Como a API real: avisa quando a janela de um minuto libera a próxima requisição
+            retry_after = str(max(int(60 - (now - _recent_requests[0])) + 1, 1))
+        else:
+            _recent_requests.append(now)
+
+    if over_limit or random.random() < ERROR_RATE / 2:
+        with _lock:
+            stats["rate_limited"] += 1
+        headers = {"Retry-After": retry_after if over_limit else RETRY_AFTER}
+        return _error(429, "Rate limit reached (simulado).", headers=headers)
+    if random.random() < ERROR_RATE / 2:
+        with _lock:
+            stats["server_errors"] += 1
+        return _error(500, "Erro interno (simulado).")
+
+    await asyncio.sleep(LATENCY_MS / 1000)
+    content = _answer(body)
+    prompt_tokens = len(_prompt_text(body.get("messages", []))) // 4
+    completion_tokens = len(content) // 4 + 1
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    """Contadores do servidor simulado (requisições, 429 e 500 devolvidos)."""
+    return stats
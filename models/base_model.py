@@ -1,20 +1,118 @@
 #Ideia: Todos os modelos devem herdar uma classe base que define o contrato
 
+import threading
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Union
+
+from utils.cache import file_sha256, get_document_cache
+from utils.timing import span
+
+
+@dataclass
+class IngestedDocument:
+    """
+    Representação reutilizável de um PDF já processado por um modelo.
+    Produzida uma única vez por `ingest` e reaproveitada por todas as perguntas.
+    """
+    doc_hash: str
+    pdf_path: str
+    pages: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # Índice de busca opcional (ex: BM25Index), construído na ingestão
+    index: Optional[Any] = None
+
+    @property
+    def full_text(self) -> str:
+        return "".join(self.pages)
+
+
+@dataclass
+class QueryResult:
+    """
+    Resposta de um modelo acompanhada de detalhes para o relatório
+    (ex: quais páginas foram enviadas para a API).
+    """
+    answer: str
+    details: Dict[str, Any] = field(default_factory=dict)
+    # Em respostas em lote: tempo gasto só com este item (ex: nova tentativa individual),
+    # que não deve ser dividido com os demais itens do lote
+    exclusive_ms: float = 0.0
+
 
 class IngestionModel(ABC):
     """
-    Interface abstrata para todos os modelos de ingestão de pdf
+    Interface abstrata para todos os modelos de ingestão de pdf.
+
+    O contrato é dividido em duas fases:
+    - `ingest`: processa o PDF uma vez (com cache pelo hash do conteúdo)
+    - `query`: responde uma pergunta a partir do documento já ingerido
     """
+    # Incremente quando a lógica de ingestão mudar, para invalidar o cache em disco
+    ingest_version = 1
+    # Máximo de chamadas simultâneas a este modelo no processo inteiro.
+    # Modelos remotos (APIs) podem usar valores altos; modelos que usam CPU local devem ficar baixos.
+    max_concurrency = 4
+    # Modelos que respondem várias perguntas em uma única chamada devem implementar `query_batch`
+    supports_batch_query = False
+    # Máximo de perguntas por chamada em lote (None = todas as perguntas do documento de uma vez)
+    max_batch_questions: Optional[int] = None
+
     def __init__(self, model_name: str):
         self.model_name = model_name
+        self.concurrency_limiter = threading.BoundedSemaphore(self.max_concurrency)
+
+    def ingest(self, pdf_path: str, doc_hash: Optional[str] = None) -> IngestedDocument:
+        """
+        Recebe o caminho de um PDF e retorna sua representação ingerida.
+        Documentos com o mesmo conteúdo são servidos do cache.
+        `doc_hash` evita recalcular o hash quando ele já é conhecido (ex: armazenamento de documentos).
+        """
+        if doc_hash is None:
+            with span("hash"):
+                doc_hash = file_sha256(pdf_path)
+        cache = get_document_cache()
+        cache_key = (self.model_name, self.ingest_version, doc_hash)
+
+        document = cache.get(cache_key)
+        if document is None:
+            with span("build_document"):
+                document = self._build_document(pdf_path, doc_hash)
+            cache.put(cache_key, document)
+
+        # O mesmo conteúdo pode chegar por caminhos diferentes (ex: arquivos temporários)
+        if document.pdf_path != pdf_path:
+            document = replace(document, pdf_path=pdf_path)
+        return document
+
+    def _build_document(self, pdf_path: str, doc_hash: str) -> IngestedDocument:
+        """
+        Faz o processamento pesado do PDF. Modelos que não pré-processam nada
+        (ex: os que enviam o PDF direto para uma API) podem manter o padrão.
+        """
+        return IngestedDocument(doc_hash=doc_hash, pdf_path=pdf_path)
+
+    @abstractmethod
+    def query(self, document: IngestedDocument, query: str) -> Union[str, QueryResult]:
+        """
+        Recebe um documento já ingerido e uma pergunta, retorna a resposta como string
+        (ou um QueryResult, quando houver detalhes a reportar)
+        """
+        pass
+
+    def query_batch(self, document: IngestedDocument, queries: List[str]) -> List[Union[str, QueryResult]]:
+        """
+        Responde várias perguntas sobre o mesmo documento, na mesma ordem.
+        O padrão é uma chamada por pergunta; modelos com `supports_batch_query` fazem uma única chamada.
+        """
+        return [self.query(document, query) for query in queries]
 
-        @abstractmethod
-        def ingest_and_query(self, pdf_path: str, query: str) -> str:
-            """
-            Recebe o caminho de um PDF e uma pergunta, retorna a resposta como string
-            """
-            pass
+    def ingest_and_query(self, pdf_path: str, query: str) -> str:
+        """
+        Atalho para ingerir e perguntar em uma única chamada.
+        """
+        answer = self.query(self.ingest(pdf_path), query)
+        return answer.answer if isinstance(answer, QueryResult) else answer
 
-        def __str__(self):
-            return self.model_name
\ No newline at end of file
+    def __str__(self):
+        return self.model_name
@@ -0,0 +1,162 @@
+from collections import Counter
+
+from .base_model import IngestionModel, IngestedDocument, QueryResult
+from utils.ocr_engine import get_ocr_engine
+from utils.openai_dispatcher import Priority, estimate_tokens, get_openai_dispatcher
+from utils.page_renderer import get_page_renderer
+from utils.page_routing import OCR, VISION, PageRouter, profile_page
+from utils.page_selection import build_page_index, plan_image_budget, select_pages
+from utils.page_stream import PageStream, get_stream_settings
+from utils.pricing import openai_usage
+from utils.retrieval import BM25Index
+from utils.timing import span
+
+
+class HybridRoutingModel(IngestionModel):
+    """
+    Lê cada página pelo caminho mais barato que dá conta dela (ver utils.page_routing):
+    texto nativo, OCR local ou imagem para o modelo multimodal.
+
+    Só as páginas de diagrama vão para a API, junto com os trechos de texto mais relevantes
+    das demais páginas; documentos sem páginas de diagrama são respondidos sem nenhuma chamada.
+    """
+    # Ingestão usa o OCR local; as perguntas são busca local + no máximo uma chamada à API
+    max_concurrency = 4
+    ingest_version = 1
+
+    def __init__(self, model_name="gpt-4o", top_k=3, dpi=200, max_vision_pages=4, image_token_budget=4000,
+                 router: PageRouter = None):
+        super().__init__(f"Hybrid_{model_name}")
+        self.dispatcher = get_openai_dispatcher()
+        self.model = model_name
+        self.top_k = top_k
+        self.dpi = dpi
+        # Máximo de páginas de diagrama por pergunta e o orçamento de tokens de imagem delas
+        self.max_vision_pages = max_vision_pages
+        self.image_token_budget = image_token_budget
+        self.router = router or PageRouter()
+
+    def _page_reader(self):
+        """Leitor do pipeline de páginas: classifica a página e só a renderiza se ela for para o OCR."""
+        def read(doc, page):
+            # Classificação pelo próprio PDF, sem renderizar
+            with span("parse"):
+                text = page.get_text()
+                profile = profile_page(page, text)
+            route = self.router.route(profile)
+            png_bytes = None
+            if route == OCR:
+                try:
+                    with span("render"):
+                        png_bytes = page.get_pixmap(dpi=300).tobytes("png")
+                except Exception as e:
+                    print(f"Aviso: Erro no OCR da página {page.number+1}: {e}")
+            page_size = (page.rect.width, page.rect.height)
+            return (text, profile, route, page_size, png_bytes), len(text) + len(png_bytes or b"")
+        return read
+
+    def _build_document(self, pdf_path: str, doc_hash: str) -> IngestedDocument:
+        engine = get_ocr_engine()
+        routes, profiles, page_texts, page_sizes, ocr_jobs = [], [], [], [], {}
+        stream = PageStream(pdf_path, self._page_reader(), **get_stream_settings())
+        for page_num, (text, profile, route, page_size, png_bytes) in stream:
+            if png_bytes is not None:
+                try:
+                    ocr_jobs[page_num] = engine.submit(png_bytes)
+                except Exception as e:
+                    print(f"Aviso: Erro no OCR da página {page_num+1}: {e}")
+                del png_bytes
+            routes.append(route)
+            profiles.append(profile.as_dict())
+            page_texts.append(text)
+            page_sizes.append(page_size)
+
+        # Páginas em que o OCR não encontrou texto são diagramas: sobem para o modelo multimodal
+        with span("ocr"):
+            for page_num, future in ocr_jobs.items():
+                try:
+                    ocr_text = future.result()
+                except Exception as e:
+                    print(f"Aviso: Erro no OCR da página {page_num+1}: {e}")
+                    ocr_text = ""
+                if self.router.escalate_after_ocr(ocr_text):
+                    routes[page_num] = VISION
+                page_texts[page_num] = f"{page_texts[page_num]}\n[OCR Página Completa {page_num+1}]:\n{ocr_text}"
+
+        with span("index"):
+            index = BM25Index.from_pages(page_texts)
+            page_index = build_page_index(page_texts)
+        return IngestedDocument(
+            doc_hash=doc_hash, pdf_path=pdf_path, pages=page_texts, index=index,
+            metadata={
+                "page_sizes": page_sizes,
+                "page_routes": routes,
+                "page_profiles": profiles,
+                "page_index": page_index,
+            },
+        )
+
+    def _plan_vision_pages(self, document: IngestedDocument, query: str):
+        """Páginas de diagrama mais relevantes para a pergunta (as demais, em ordem), dentro do orçamento."""
+        routes = document.metadata["page_routes"]
+        vision_pages = [i for i, route in enumerate(routes) if route == VISION]
+        if not vision_pages:
+            return []
+        with span("retrieval"):
+            ranking = select_pages(document.metadata["page_index"], len(routes), query, len(routes))
+        ranked = [i for i in ranking if i in vision_pages]
+        ranked += [i for i in vision_pages if i not in ranked]
+        return plan_image_budget(
+            document.metadata["page_sizes"], ranked[:self.max_vision_pages], self.image_token_budget, max_dpi=self.dpi
+        )
+
+    def _details(self, document: IngestedDocument, plans) -> dict:
+        return {
+            "page_routes": dict(Counter(document.metadata["page_routes"])),
+            "pages_sent": [plan.page_index + 1 for plan in plans],
+            "estimated_image_tokens": sum(plan.tokens for plan in plans),
+        }
+
+    def query(self, document: IngestedDocument, query: str) -> QueryResult:
+        with span("retrieval"):
+            hits = document.index.search(query, top_k=self.top_k)
+        excerpts = "\n\n".join(f"[Página {chunk.page}] {chunk.text}" for chunk, _ in hits)
+        plans = self._plan_vision_pages(document, query)
+        details = self._details(document, plans)
+
+        # Sem páginas de diagrama: os trechos do texto já são a resposta, sem chamar a API
+        if not plans:
+            answer = excerpts or "Nenhum trecho relevante encontrado no documento."
+            return QueryResult(answer=answer, details=details)
+
+        try:
+            renderer = get_page_renderer()
+            prompt = f"""
+                            Responda à pergunta de forma direta e precisa usando as imagens das páginas de diagrama e os trechos de texto do documento abaixo.
+                            Pergunta: "{query}"
+                            Trechos de texto:
+                            {excerpts or "(nenhum trecho relevante)"}
+                            """
+            content = [{"type": "text", "text": prompt}]
+            for plan in plans:
+                rendered = renderer.render_page(
+                    document.pdf_path, plan.page_index, dpi=plan.dpi, image_format="JPEG",
+                    doc_hash=document.doc_hash, quality=plan.quality,
+                )
+                content.append({"type": "image_url", "image_url": {"url": rendered.data_url, "detail": plan.detail}})
+            messages = [{"role": "user", "content": content}]
+
+            with span("api"):
+                response = self.dispatcher.chat_completion(
+                    priority=Priority.ANSWER,
+                    estimated_tokens=estimate_tokens([{"role": "user", "content": prompt}], 300)
+                    + details["estimated_image_tokens"],
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=300,
+                    temperature=0.0,
+                )
+            details["usage"] = openai_usage(self.model, response)
+            return QueryResult(answer=response.choices[0].message.content.strip(), details=details)
+        except Exception as e:
+            return QueryResult(answer=f"ERRO no processamento multimodal: {str(e)}", details=details)
@@ -1,50 +1,269 @@
 # models/local_ocr_model.py (VERSÃO CORRIGIDA)
 
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
+import hashlib
 import io
-from .base_model import IngestionModel
+import math
+from concurrent.futures import Future
+from typing import Optional
+
+from PIL import Image
+
+from .base_model import IngestionModel, IngestedDocument, QueryResult
+from utils.cache import LRUCache
+from utils.ocr_engine import get_ocr_engine
+from utils.ocr_regions import (
+    PAGE, OCRRegion, choose_dpi, estimate_glyph_height_pt, find_ocr_regions, merge_reading_order, page_font_size,
+)
+from utils.page_stream import PageStream, get_stream_settings
+from utils.retrieval import BM25Index
+from utils.timing import span
 
 # Você precisa ter o Tesseract-OCR instalado no seu sistema
 # sudo apt-get install tesseract-ocr tesseract-ocr-por (para português)
 
+
+def image_entropy(image_bytes: bytes, thumbnail_size: int = 128) -> Optional[float]:
+    """
+    Entropia (em bits) do histograma em tons de cinza de uma miniatura da imagem.
+    Imagens de uma cor só (fundos, faixas decorativas) ficam perto de zero.
+    Retorna None se a imagem não puder ser decodificada.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image.draft("L", (thumbnail_size, thumbnail_size))  # JPEG: já decodifica reduzida
+            gray = image.convert("L")
+        gray.thumbnail((thumbnail_size, thumbnail_size))
+        histogram = gray.histogram()
+    except Exception:
+        return None
+    total = sum(histogram)
+    return -sum(count / total * math.log2(count / total) for count in histogram if count)
+
+
+def _completed_future(text: str) -> Future:
+    future = Future()
+    future.set_result(text)
+    return future
+
+
 class LocalOCRModel(IngestionModel):
-    def __init__(self):
+    # O OCR de cada documento já é distribuído entre os núcleos pelo OCREngine:
+    # uma ingestão por vez evita disputar os mesmos workers
+    max_concurrency = 1
+    # v2: documentos passam a incluir o índice BM25
+    # v3: imagens pequenas/sem conteúdo são ignoradas e as estatísticas de OCR vão nos metadados
+    # v4: OCR por região (recortes em tons de cinza, DPI pelo tamanho do texto, ordem de leitura)
+    ingest_version = 4
+
+    def __init__(self, top_k: int = 3, min_image_side: int = 16, min_image_area: int = 2048,
+                 min_image_entropy: float = 0.1, image_memo_size: int = 4096,
+                 min_text_chars: int = 50, target_glyph_px: int = 40, min_dpi: int = 150, max_dpi: int = 300,
+                 default_font_size: float = 10.0):
         super().__init__("Local_PyMuPDF_Tesseract")
+        self.top_k = top_k
+        # Abaixo disso, a página é tratada como imagem: desenhos vetoriais também vão para o OCR e,
+        # sem nenhuma região encontrada, a página inteira é reconhecida
+        self.min_text_chars = min_text_chars
+        # Resolução de cada recorte: o texto deve ficar com ~target_glyph_px pixels de altura.
+        # O tamanho vem das linhas medidas na própria região, do corpo do texto nativo ou do padrão
+        self.target_glyph_px = target_glyph_px
+        self.min_dpi = min_dpi
+        self.max_dpi = max_dpi
+        self.default_font_size = default_font_size
+        # Filtros de imagens incorporadas que dificilmente contêm texto (0 desativa cada um)
+        self.min_image_side = min_image_side
+        self.min_image_area = min_image_area
+        self.min_image_entropy = min_image_entropy
+        # Texto já reconhecido por conteúdo da imagem (hash), reaproveitado entre documentos
+        # (ex: o mesmo logotipo em todos os PDFs da empresa)
+        self.image_text_memo = LRUCache(max_entries=image_memo_size)
 
-    def ingest_and_query(self, pdf_path: str, query: str) -> str:
-        full_text = ""
-        doc = fitz.open(pdf_path)
+    def _skip_reason(self, width: int, height: int) -> Optional[str]:
+        """Filtro pelas dimensões declaradas no PDF (antes mesmo de extrair a imagem)."""
+        if min(width, height) < self.min_image_side or width * height < self.min_image_area:
+            return "small"
+        return None
 
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            
-            # 1. Tenta extrair texto nativo
-            text = page.get_text()
-            full_text += text
+    def _region_dpi(self, page, region: OCRRegion, font_size: list) -> int:
+        """DPI do recorte a partir do tamanho estimado do texto na região."""
+        glyph_pt = estimate_glyph_height_pt(page, region.bbox)
+        if glyph_pt is None:
+            if not font_size:
+                font_size.append(page_font_size(page) or self.default_font_size)
+            glyph_pt = font_size[0]
+        return choose_dpi(glyph_pt, self.target_glyph_px, self.min_dpi, self.max_dpi)
 
-            # 2. Se não houver muito texto nativo, trata a página inteira como imagem (fallback)
-            if len(text.strip()) < 50: # Um limiar para considerar a página como "imagem"
-                try:
-                    pix = page.get_pixmap(dpi=300) # Renderiza a página com alta resolução
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    ocr_text = pytesseract.image_to_string(img, lang='por')
-                    full_text += f"\n[OCR Página Completa {page_num+1}]:\n{ocr_text}"
-                except Exception as e:
-                    print(f"Aviso: Erro no OCR da página inteira {page_num+1}: {e}")
-
-            # 3. Extrai imagens incorporadas (ainda útil para PDFs mistos)
-            image_list = page.get_images(full=True)
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
+    def _page_reader(self):
+        """
+        Leitor de páginas do pipeline (roda na thread produtora, a única que toca o PDF):
+        os blocos de texto nativo e, em vez da página inteira, só as regiões que precisam de OCR
+        (imagens incorporadas e, em páginas quase sem texto, desenhos vetoriais), cada uma renderizada
+        em tons de cinza com o DPI escolhido pelo tamanho do texto.
+        A mesma imagem no mesmo tamanho é renderizada só na primeira vez em que aparece
+        (com o DPI escolhido nessa vez, guardado junto da chave).
+        """
+        import fitz  # PyMuPDF
+
+        # (xref, largura, altura) -> DPI usado na primeira renderização
+        rendered = {}
+
+        def read(doc, page):
+            # 1. Texto nativo, bloco a bloco (com a posição, para a ordem de leitura)
+            with span("parse"):
+                blocks = [(tuple(block[:4]), block[4]) for block in page.get_text("blocks") if block[6] == 0]
+            native_chars = sum(len(text.strip()) for _, text in blocks)
+
+            # 2. Regiões para o OCR, sem renderizar nada; imagens pequenas nem entram
+            with span("regions"):
+                image_infos = page.get_image_info(xrefs=True)
+                kept = [info for info in image_infos if not self._skip_reason(info["width"], info["height"])]
+                scanned_page = native_chars < self.min_text_chars  # Um limiar para considerar a página como "imagem"
+                regions = find_ocr_regions(page, kept, include_vectors=scanned_page)
+                if scanned_page and not regions:
+                    regions = [OCRRegion(tuple(page.rect), PAGE)]
+
+            # 3. Cada região em tons de cinza, na resolução que o tamanho do texto pede:
+            # (índice, chave de reaproveitamento, PNG ou None se já renderizada, pixels)
+            clips, font_size = [], []
+            for region_index, region in enumerate(regions):
                 try:
-                    image = Image.open(io.BytesIO(image_bytes))
-                    ocr_text = pytesseract.image_to_string(image, lang='por')
-                    full_text += f"\n[OCR Imagem Incorporada {page_num+1}-{img_index+1}]:\n{ocr_text}"
+                    with span("render"):
+                        clip = fitz.Rect(region.bbox)
+                        reuse_key = None
+                        if len(region.xrefs) == 1 and region.xrefs[0] > 0 and region.kind != PAGE:
+                            reuse_key = (region.xrefs[0], round(clip.width), round(clip.height))
+                        png_bytes, pixels = None, 0
+                        # Imagem já vista: nem a sonda do tamanho do texto é renderizada de novo
+                        if reuse_key is None or reuse_key not in rendered:
+                            dpi = self._region_dpi(page, region, font_size)
+                            pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csGRAY)
+                            png_bytes, pixels = pix.tobytes("png"), pix.width * pix.height
+                            del pix
+                            if reuse_key is not None:
+                                rendered[reuse_key] = dpi
+                    clips.append((region, reuse_key, png_bytes, pixels))
                 except Exception as e:
-                    print(f"Aviso: Erro no OCR da imagem incorporada {img_index+1}: {e}")
-        
-        return full_text
\ No newline at end of file
+                    print(f"Aviso: Erro ao renderizar a região {region_index+1} da página {page.number+1}: {e}")
+
+            stats = {
+                "skipped": len(image_infos) - len(kept),
+                # Referência: a página quase sem texto era renderizada inteira a 300 DPI
+                "full_page_pixels": round(page.rect.width * 300 / 72) * round(page.rect.height * 300 / 72)
+                                    if scanned_page else 0,
+            }
+            nbytes = sum(len(text) for _, text in blocks) + sum(len(png or b"") for _, _, png, _ in clips)
+            return (blocks, clips, stats), nbytes
+
+        return read
+
+    def _ocr_regions(self, clips, engine, reuse_jobs, content_jobs, stats):
+        """
+        Agenda o OCR das regiões de uma página, sem repetir trabalho: a mesma imagem no mesmo
+        tamanho (ex: o logotipo repetido em todas as páginas) e o mesmo conteúdo (hash do recorte)
+        são reconhecidos uma única vez. Retorna [(região, future)] das regiões aceitas.
+        """
+        jobs = []
+        for region, reuse_key, png_bytes, pixels in clips:
+            # Mesma imagem já vista neste documento: reaproveita a decisão (OCR ou descarte)
+            if png_bytes is None:
+                future = reuse_jobs.get(reuse_key)
+                if future is None:
+                    stats["skipped"] += 1
+                else:
+                    stats["reused"] += 1
+                    jobs.append((region, future))
+                continue
+
+            future = None
+            content_key = (engine.lang, hashlib.sha256(png_bytes).hexdigest())
+            memo_text = self.image_text_memo.get(content_key)
+            if content_key in content_jobs:
+                future = content_jobs[content_key]
+                stats["reused"] += 1
+            elif memo_text is not None:
+                future = content_jobs[content_key] = _completed_future(memo_text)
+                stats["reused"] += 1
+            else:
+                entropy = image_entropy(png_bytes) if self.min_image_entropy > 0 else None
+                if entropy is not None and entropy < self.min_image_entropy:
+                    stats["skipped"] += 1
+                else:
+                    future = content_jobs[content_key] = engine.submit(png_bytes)
+                    stats["ocr"] += 1
+                    stats["ocr_pixels"] += pixels
+
+            if reuse_key is not None:
+                reuse_jobs[reuse_key] = future
+            if future is not None:
+                jobs.append((region, future))
+        return jobs
+
+    def _build_document(self, pdf_path: str, doc_hash: str) -> IngestedDocument:
+        engine = get_ocr_engine()
+
+        # Fase 1: as páginas chegam uma a uma do pipeline (leitura antecipada limitada) e todo o OCR
+        # é despachado para o pool de workers; os bytes de cada página são liberados logo em seguida.
+        # Cada página guarda (blocos de texto nativo, [(região, cabeçalho, descrição para avisos, future)])
+        page_jobs = []
+        # Memo das regiões: pela imagem/tamanho e pelo hash do recorte (ver _ocr_regions)
+        reuse_jobs, content_jobs = {}, {}
+        region_stats = {"ocr": 0, "reused": 0, "skipped": 0, "ocr_pixels": 0, "full_page_pixels": 0}
+        stream = PageStream(pdf_path, self._page_reader(), **get_stream_settings())
+        for page_num, (blocks, clips, stats) in stream:
+            region_stats["skipped"] += stats["skipped"]
+            region_stats["full_page_pixels"] += stats["full_page_pixels"]
+            ocr_jobs = []
+            for region_index, (region, future) in enumerate(
+                self._ocr_regions(clips, engine, reuse_jobs, content_jobs, region_stats)
+            ):
+                if region.kind == PAGE:
+                    header, description = f"\n[OCR Página Completa {page_num+1}]:\n", f"página inteira {page_num+1}"
+                else:
+                    header = f"\n[OCR Região {page_num+1}-{region_index+1}]:\n"
+                    description = f"região {region_index+1} da página {page_num+1}"
+                ocr_jobs.append((region.bbox, (header, description, future)))
+
+            page_jobs.append((blocks, ocr_jobs))
+            del clips
+
+        # Fase 2: remonta o texto de cada página, com o OCR de cada região na ordem de leitura.
+        # "ocr" mede só a espera pelos workers que ainda não terminaram (o resto correu em paralelo à fase 1)
+        pages = []
+        with span("ocr"):
+            for blocks, ocr_jobs in page_jobs:
+                parts = []
+                for part in merge_reading_order(blocks, ocr_jobs):
+                    if isinstance(part, str):
+                        parts.append(part)
+                        continue
+                    header, description, future = part
+                    try:
+                        parts.append(header + future.result())
+                    except Exception as e:
+                        print(f"Aviso: Erro no OCR da {description}: {e}")
+                pages.append("".join(parts))
+        del page_jobs
+
+        # Guarda o texto das regiões novas para os próximos documentos
+        for content_key, future in content_jobs.items():
+            if future.done() and future.exception() is None:
+                self.image_text_memo.put(content_key, future.result())
+
+        # Índice de busca construído uma única vez, junto com o documento
+        with span("index"):
+            index = BM25Index.from_pages(pages)
+        return IngestedDocument(
+            doc_hash=doc_hash, pdf_path=pdf_path, pages=pages, index=index,
+            metadata={"region_ocr": region_stats},
+        )
+
+    def query(self, document: IngestedDocument, query: str) -> QueryResult:
+        # Retorna os trechos mais relevantes para a pergunta, com o número da página
+        with span("retrieval"):
+            hits = document.index.search(query, top_k=self.top_k)
+        # Regiões reconhecidas, reaproveitadas (repetidas) e ignoradas pelos filtros, e os pixels do OCR
+        details = {"region_ocr": document.metadata.get("region_ocr")}
+        if not hits:
+            return QueryResult(answer="Nenhum trecho relevante encontrado no documento.", details=details)
+        answer = "\n\n".join(f"[Página {chunk.page}] {chunk.text}" for chunk, _ in hits)
+        return QueryResult(answer=answer, details=details)
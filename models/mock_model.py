@@ -0,0 +1,59 @@
+import hashlib
+import random
+import time
+from typing import Optional
+
+from .base_model import IngestionModel, IngestedDocument, QueryResult
+from utils.timing import span
+
+
+def seeded_rng(*parts) -> random.Random:
+    """Gerador determinístico a partir do conteúdo (mesma entrada, mesma latência e mesma falha)."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def simulated_delay(rng: random.Random, latency_ms: float, jitter: float) -> float:
+    """Latência (s) com variação uniforme de ±`jitter` (fração) em torno de `latency_ms`."""
+    return max(latency_ms * (1 + rng.uniform(-jitter, jitter)), 0.0) / 1000
+
+
+class MockModel(IngestionModel):
+    """
+    Modelo simulado para testes de carga: não lê o PDF nem chama nenhuma API, só espera
+    (`time.sleep`) o tempo configurado e responde um texto fixo. A latência e as falhas
+    são sorteadas a partir do conteúdo (documento, pergunta, `seed`), então a mesma carga
+    produz sempre os mesmos resultados. Mede o custo do próprio servidor sem chave da OpenAI.
+
+    - `ingest_latency_ms`: ingestão de cada documento novo (depois vem do cache de documentos)
+    - `query_latency_ms`: resposta de cada pergunta
+    - `failure_rate`: fração das perguntas que levantam erro (o item vira "ERRO: ...")
+    - `max_concurrency`: chamadas simultâneas (ex: 1 simula o OCR local, valores altos uma API)
+    """
+    ingest_version = 1
+
+    def __init__(self, name: str = "mock", ingest_latency_ms: float = 50.0, query_latency_ms: float = 100.0,
+                 jitter: float = 0.2, failure_rate: float = 0.0, max_concurrency: Optional[int] = None,
+                 seed: int = 0):
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        super().__init__(f"Mock_{name}")
+        self.ingest_latency_ms = ingest_latency_ms
+        self.query_latency_ms = query_latency_ms
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+
+    def _build_document(self, pdf_path: str, doc_hash: str) -> IngestedDocument:
+        rng = seeded_rng(self.seed, self.model_name, doc_hash)
+        with span("parse"):
+            time.sleep(simulated_delay(rng, self.ingest_latency_ms, self.jitter))
+        return IngestedDocument(doc_hash=doc_hash, pdf_path=pdf_path, pages=[f"Documento simulado {doc_hash[:12]}"])
+
+    def query(self, document: IngestedDocument, query: str) -> QueryResult:
+        rng = seeded_rng(self.seed, self.model_name, document.doc_hash, query)
+        with span("api"):
+            time.sleep(simulated_delay(rng, self.query_latency_ms, self.jitter))
+        if rng.random() < self.failure_rate:
+            raise RuntimeError("falha simulada do modelo")
+        return QueryResult(answer=f"Resposta simulada ({self.model_name}): {query}", details={"simulated": True})
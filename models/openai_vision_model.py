@@ -1,65 +1,217 @@
-import base64
-import io
-from openai import OpenAI
-from .base_model import IngestionModel
-import os
-from pdf2image import convert_from_path
-from PIL import Image
+import json
+import time
+from typing import List
+from .base_model import IngestionModel, IngestedDocument, QueryResult
+from utils.page_renderer import get_page_renderer
+from utils.page_selection import build_page_index, low_text_pages, plan_image_budget, select_pages
+from utils.openai_dispatcher import Priority, estimate_tokens, get_openai_dispatcher
+from utils.pricing import openai_usage
+from utils.timing import span
 
 class OpenAIVisionModel(IngestionModel):
-    def __init__(self, model_name="gpt-4o-mini"):
+    # O trabalho pesado acontece na API: as perguntas podem ser disparadas em paralelo
+    max_concurrency = 8
+    # v2: documentos passam a incluir a camada de texto e o tamanho das páginas
+    # v3: e as páginas sem texto (candidatas mesmo sem resultado no BM25)
+    ingest_version = 3
+    # As perguntas de um documento vão em lotes (as páginas são enviadas uma vez por lote)
+    supports_batch_query = True
+    # Lotes maiores estouram o limite de saída do modelo, e a requisição inteira falha
+    max_batch_questions = 8
+    # Tokens de saída reservados por resposta e teto por requisição
+    max_tokens_per_answer = 300
+    max_batch_output_tokens = 4096
+
+    def __init__(self, model_name="gpt-4o-mini", dpi=200, max_pages=8, image_token_budget=8000,
+                 batch_image_token_budget=16000):
         super().__init__(f"OpenAI_{model_name}")
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Todas as chamadas passam pelo dispatcher do processo (limites de taxa, fila e novas tentativas)
+        self.dispatcher = get_openai_dispatcher()
         self.model = model_name
+        # DPI máximo: o planejador usa menos quando a API descartaria os pixels extras
+        self.dpi = dpi
+        # Máximo de páginas enviadas por pergunta (resultados do BM25 + páginas sem texto, quando o PDF tem camada de texto)
+        self.max_pages = max_pages
+        # Orçamento de tokens de imagem por pergunta (e por requisição em lote)
+        self.image_token_budget = image_token_budget
+        self.batch_image_token_budget = batch_image_token_budget
+
+    def _build_document(self, pdf_path: str, doc_hash: str) -> IngestedDocument:
+        # Só a camada de texto e o tamanho das páginas: é barato e serve para escolher as páginas relevantes
+        import fitz  # PyMuPDF
+        with span("parse"), fitz.open(pdf_path) as doc:
+            pages = [page.get_text() for page in doc]
+            page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+
+        image_pages = low_text_pages(pages)
+        has_text = len(image_pages) < len(pages)
+        with span("index"):
+            index = build_page_index(pages) if has_text else None
+        return IngestedDocument(
+            doc_hash=doc_hash,
+            pdf_path=pdf_path,
+            pages=pages,
+            metadata={"page_sizes": page_sizes, "image_pages": image_pages},
+            index=index,
+        )
+
+    def _convert_pdf_to_images_base64(self, document: IngestedDocument, plans):
+        """Converte as páginas planejadas em imagens base64 (renderizadas uma única vez e reaproveitadas)."""
+        renderer = get_page_renderer()
+        return [
+            renderer.render_page(
+                document.pdf_path, plan.page_index, dpi=plan.dpi, image_format="JPEG",
+                doc_hash=document.doc_hash, quality=plan.quality,
+            ).data_url
+            for plan in plans
+        ]
+
+    def _plan_pages(self, document: IngestedDocument, queries: List[str], token_budget: int):
+        """Seleciona as páginas relevantes para as perguntas e ajusta a resolução ao orçamento de tokens."""
+        page_sizes = document.metadata["page_sizes"]
+        with span("retrieval"):
+            rankings = [
+                select_pages(document.index, len(page_sizes), query, self.max_pages, document.metadata["image_pages"])
+                for query in queries
+            ]
+
+        # Intercala os rankings das perguntas, para que cada uma tenha suas páginas mais relevantes primeiro
+        ranked_pages = []
+        for position in range(max(len(ranking) for ranking in rankings)):
+            for ranking in rankings:
+                if position < len(ranking) and ranking[position] not in ranked_pages:
+                    ranked_pages.append(ranking[position])
+
+        return plan_image_budget(page_sizes, ranked_pages, token_budget, max_dpi=self.dpi)
+
+    def _build_messages(self, document: IngestedDocument, prompt: str, plans):
+        # Monta o payload multimodal
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    }
+                ]
+            }
+        ]
+
+        # Adiciona cada página selecionada como uma imagem na requisição
+        for img_url, plan in zip(self._convert_pdf_to_images_base64(document, plans), plans):
+            messages[0]["content"].append({
+                "type": "image_url",
+                "image_url": {
+                    "url": img_url,
+                    "detail": plan.detail
+                }
+            })
+        return messages
 
-    def _convert_pdf_to_images_base64(self, pdf_path: str):
-        """Converte cada página de um PDF em uma imagem base64."""
-        images = convert_from_path(pdf_path)
-        base64_images = []
-        for image in images:
-            buffered = io.BytesIO()
-            image.save(buffered, format="JPEG")
-            img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
-            base64_images.append(f"data:image/jpeg;base64,{img_str}")
-        return base64_images
-
-    def ingest_and_query(self, pdf_path: str, query: str) -> str:
+    @staticmethod
+    def _estimate_tokens(messages, plans, max_tokens: int) -> int:
+        """Tokens da requisição para o limite de TPM: texto + custo já planejado das imagens + saída máxima."""
+        text_only = [{"role": m["role"], "content": [p for p in m["content"] if p["type"] == "text"]} for m in messages]
+        return estimate_tokens(text_only, max_tokens) + sum(plan.tokens for plan in plans)
+
+    @staticmethod
+    def _pages_details(plans) -> dict:
+        return {
+            "pages_sent": [plan.page_index + 1 for plan in plans],
+            "page_detail": {plan.page_index + 1: plan.detail for plan in plans},
+            "estimated_image_tokens": sum(plan.tokens for plan in plans),
+        }
+
+    def query(self, document: IngestedDocument, query: str) -> QueryResult:
         try:
-            base64_images = self._convert_pdf_to_images_base64(pdf_path)
-            
-            # Monta o payload multimodal
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"""
+            plans = self._plan_pages(document, [query], self.image_token_budget)
+            messages = self._build_messages(document, f"""
                             Analise as imagens do documento fornecido e responda à seguinte pergunta de forma direta e precisa.
                             Pergunta: "{query}"
-                            """
-                        }
-                    ]
-                }
-            ]
-            
-            # Adiciona cada página do PDF como uma imagem na requisição
-            for img_url in base64_images:
-                messages[0]["content"].append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": img_url
-                    }
-                })
+                            """, plans)
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=300,
-                temperature=0.0,
+            with span("api"):
+                response = self.dispatcher.chat_completion(
+                    priority=Priority.ANSWER,
+                    estimated_tokens=self._estimate_tokens(messages, plans, self.max_tokens_per_answer),
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=self.max_tokens_per_answer,
+                    temperature=0.0,
+                )
+            return QueryResult(
+                answer=response.choices[0].message.content.strip(),
+                details={**self._pages_details(plans), "usage": openai_usage(self.model, response)},
             )
-            return response.choices[0].message.content.strip()
 
         except Exception as e:
             # Fornece um erro mais detalhado se a conversão ou a API falhar
-            return f"ERRO no processamento multimodal: {str(e)}"
\ No newline at end of file
+            return QueryResult(answer=f"ERRO no processamento multimodal: {str(e)}")
+
+    def query_batch(self, document: IngestedDocument, queries: List[str]) -> List[QueryResult]:
+        """
+        Envia as páginas uma única vez com as perguntas e lê as respostas estruturadas (JSON).
+        Mais de `max_batch_questions` perguntas viram várias requisições, uma por lote.
+        Perguntas sem resposta válida são refeitas individualmente.
+        """
+        if len(queries) <= 1:
+            return [self.query(document, query) for query in queries]
+        if len(queries) > self.max_batch_questions:
+            return [
+                result
+                for start in range(0, len(queries), self.max_batch_questions)
+                for result in self.query_batch(document, queries[start:start + self.max_batch_questions])
+            ]
+
+        answers = {}
+        details = {}
+        try:
+            plans = self._plan_pages(document, queries, self.batch_image_token_budget)
+            numbered = "\n".join(f'{i}. "{query}"' for i, query in enumerate(queries))
+            messages = self._build_messages(document, f"""
+                            Analise as imagens do documento fornecido e responda a cada uma das perguntas abaixo de forma direta e precisa.
+                            Responda em JSON no formato {{"answers": [{{"id": <número da pergunta>, "answer": "<resposta>"}}]}}, com uma resposta para cada pergunta.
+                            Perguntas:
+                            {numbered}
+                            """, plans)
+
+            max_tokens = min(self.max_tokens_per_answer * len(queries), self.max_batch_output_tokens)
+            with span("api"):
+                response = self.dispatcher.chat_completion(
+                    priority=Priority.ANSWER,
+                    estimated_tokens=self._estimate_tokens(messages, plans, max_tokens),
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=0.0,
+                    response_format={"type": "json_object"},
+                )
+            parsed = json.loads(response.choices[0].message.content)
+            for item in parsed.get("answers", []):
+                try:
+                    index, answer = int(item["id"]), str(item["answer"]).strip()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if 0 <= index < len(queries) and answer:
+                    answers[index] = answer
+            # O uso da requisição é dividido igualmente entre as perguntas do lote
+            details = {
+                **self._pages_details(plans), "batch_size": len(queries),
+                "usage": openai_usage(self.model, response, share=1 / len(queries)),
+            }
+        except Exception as e:
+            print(f"Aviso: Falha na consulta em lote ao {self.model_name}, refazendo pergunta a pergunta: {e}")
+
+        results = []
+        for index, query in enumerate(queries):
+            if index in answers:
+                results.append(QueryResult(answer=answers[index], details=details))
+                continue
+            # Resposta estruturada ausente ou inválida: pergunta individual, com o tempo atribuído só a ela
+            start_time = time.perf_counter()
+            result = self.query(document, query)
+            result.exclusive_ms = (time.perf_counter() - start_time) * 1000
+            result.details = {**result.details, "batch_fallback": True}
+            results.append(result)
+        return results
@@ -0,0 +1,264 @@
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Type
+
+from .base_model import IngestionModel
+
+# Grupo de entry points em que pacotes externos registram modelos, ex. no pyproject.toml do plugin:
+#   [project.entry-points."pdf_ingest.models"]
+#   meu_modelo = "meu_pacote.modelo:MeuModelo"
+ENTRY_POINT_GROUP = "pdf_ingest.models"
+
+
+class ModelContractError(TypeError):
+    """A classe registrada não cumpre o contrato de IngestionModel."""
+
+
+class ModelUnavailableError(RuntimeError):
+    """O modelo não pôde ser carregado (dependência ausente, configuração faltando, erro na criação)."""
+
+
+@dataclass
+class ModelSpec:
+    """
+    Como criar um modelo, sem importá-lo: "módulo:Classe" e os argumentos do construtor.
+    `requires` (módulos Python) e `env` (variáveis de ambiente) permitem dizer se o modelo
+    está disponível sem carregar nada.
+    """
+    key: str
+    target: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    requires: List[str] = field(default_factory=list)
+    env: List[str] = field(default_factory=list)
+    source: str = "builtin"
+
+
+BUILTIN_MODELS = [
+    ModelSpec("local_ocr", "models.local_ocr_model:LocalOCRModel",
+              requires=["fitz", "PIL", "pytesseract"]),
+    ModelSpec("openai_gpt4o", "models.openai_vision_model:OpenAIVisionModel", {"model_name": "gpt-4o"},
+              requires=["fitz", "PIL", "openai"], env=["OPENAI_API_KEY"]),
+    # Texto nativo, OCR local ou visão, decidido página a página
+    ModelSpec("hybrid_gpt4o", "models.hybrid_model:HybridRoutingModel", {"model_name": "gpt-4o"},
+              requires=["fitz", "PIL", "pytesseract", "openai"], env=["OPENAI_API_KEY"]),
+    ModelSpec("google_docai", "models.google_docai_model:GoogleDocAIModel",
+              requires=["fitz", "google.cloud.documentai"],
+              env=["GOOGLE_DOCAI_PROJECT", "GOOGLE_DOCAI_PROCESSOR_ID"]),
+]
+
+# Modelos simulados para testes de carga (MOCK_MODELS=1): perfis de uma API remota e do OCR local.
+# Outros perfis podem ser declarados no MODELS_CONFIG com target "models.mock_model:MockModel"
+MOCK_MODELS = [
+    ModelSpec("mock_remote", "models.mock_model:MockModel",
+              {"name": "remote", "ingest_latency_ms": 20, "query_latency_ms": 300, "max_concurrency": 32,
+               "failure_rate": 0.01}),
+    ModelSpec("mock_local", "models.mock_model:MockModel",
+              {"name": "local", "ingest_latency_ms": 1500, "query_latency_ms": 10, "max_concurrency": 1}),
+]
+
+
+def check_contract(cls: Any) -> Type[IngestionModel]:
+    """Valida uma classe de modelo no momento do registro/carregamento; levanta ModelContractError."""
+    if not (inspect.isclass(cls) and issubclass(cls, IngestionModel)):
+        raise ModelContractError(f"{cls!r} não herda de IngestionModel.")
+    if inspect.isabstract(cls):
+        missing = ", ".join(sorted(cls.__abstractmethods__))
+        raise ModelContractError(f"{cls.__name__} não implementa os métodos abstratos: {missing}.")
+    parameters = list(inspect.signature(cls.query).parameters)
+    if len(parameters) < 3:
+        raise ModelContractError(f"{cls.__name__}.query deve receber (document, query).")
+    if cls.supports_batch_query and cls.query_batch is IngestionModel.query_batch:
+        raise ModelContractError(f"{cls.__name__} declara supports_batch_query, mas não implementa query_batch.")
+    if not isinstance(cls.max_concurrency, int) or cls.max_concurrency < 1:
+        raise ModelContractError(f"{cls.__name__}.max_concurrency deve ser um inteiro >= 1.")
+    if not isinstance(cls.ingest_version, int):
+        raise ModelContractError(f"{cls.__name__}.ingest_version deve ser um inteiro.")
+    return cls
+
+
+def _resolve(target: str) -> Any:
+    module_name, _, attribute = target.partition(":")
+    if not attribute:
+        raise ValueError(f"Alvo '{target}' inválido: use 'módulo:Classe'.")
+    value = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def _module_available(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class ModelRegistry:
+    """
+    Registro dos modelos disponíveis no servidor. Nada é importado nem instanciado no registro:
+    o módulo do modelo (e as dependências pesadas dele, como PyMuPDF, Tesseract e o SDK da OpenAI)
+    só é carregado no primeiro uso, e a instância é reaproveitada dali em diante.
+    O contrato (IngestionModel) é verificado quando a classe é carregada.
+    """
+    def __init__(self):
+        self._specs: Dict[str, ModelSpec] = {}
+        self._instances: Dict[str, IngestionModel] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec: ModelSpec) -> None:
+        with self._lock:
+            self._specs[spec.key] = spec
+            self._instances.pop(spec.key, None)
+            self._errors.pop(spec.key, None)
+            self._locks.setdefault(spec.key, threading.Lock())
+
+    def register_class(self, key: str, cls: Any, **kwargs) -> None:
+        """Registra uma classe já importada; o contrato é verificado imediatamente."""
+        check_contract(cls)
+        self.register(ModelSpec(key, f"{cls.__module__}:{cls.__qualname__}", kwargs, source="code"))
+
+    def unregister(self, key: str) -> None:
+        with self._lock:
+            self._specs.pop(key, None)
+            self._instances.pop(key, None)
+            self._errors.pop(key, None)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._specs)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._specs
+
+    def get(self, key: str) -> IngestionModel:
+        """Instância do modelo, criada no primeiro uso. Levanta KeyError ou ModelUnavailableError."""
+        with self._lock:
+            spec = self._specs[key]
+            instance = self._instances.get(key)
+            lock = self._locks[key]
+        if instance is not None:
+            return instance
+
+        with lock:
+            with self._lock:
+                instance = self._instances.get(key)
+            if instance is not None:
+                return instance
+            try:
+                cls = check_contract(_resolve(spec.target))
+                instance = cls(**spec.kwargs)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                with self._lock:
+                    self._errors[key] = error
+                raise ModelUnavailableError(f"Modelo '{key}' indisponível: {error}") from e
+            with self._lock:
+                self._instances[key] = instance
+                self._errors.pop(key, None)
+            return instance
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Prontidão de cada modelo, sem carregar nenhum:
+        - "ready": já carregado e instanciado
+        - "available": dependências e variáveis de ambiente presentes, carrega no primeiro uso
+        - "unavailable": falta alguma dependência ou variável de ambiente
+        - "error": a última tentativa de carregar falhou
+        """
+        with self._lock:
+            specs = list(self._specs.values())
+            instances = dict(self._instances)
+            errors = dict(self._errors)
+
+        report = []
+        for spec in specs:
+            missing_modules = [name for name in spec.requires if not _module_available(name)]
+            missing_env = [name for name in spec.env if not os.getenv(name)]
+            if spec.key in instances:
+                state = "ready"
+            elif spec.key in errors:
+                state = "error"
+            elif missing_modules or missing_env:
+                state = "unavailable"
+            else:
+                state = "available"
+            instance = instances.get(spec.key)
+            report.append({
+                "name": spec.key,
+                "target": spec.target,
+                "source": spec.source,
+                "state": state,
+                "model_name": instance.model_name if instance is not None else None,
+                "missing_dependencies": missing_modules,
+                "missing_env": missing_env,
+                "error": errors.get(spec.key),
+            })
+        return report
+
+    # --- Descoberta ---
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        """Registra os modelos anunciados por pacotes instalados (sem importá-los)."""
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=group):
+            self.register(ModelSpec(entry_point.name, entry_point.value, source="entry_point"))
+
+    def load_config(self, path: str) -> None:
+        """
+        Lê um JSON no formato:
+            {"models": {"chave": {"target": "módulo:Classe", "kwargs": {...}, "requires": [...], "env": [...]}}}
+        Uma chave com valor null remove o modelo (inclusive um embutido).
+        """
+        with open(path, encoding="utf-8") as config_file:
+            config = json.load(config_file)
+        for key, entry in config.get("models", {}).items():
+            if entry is None:
+                self.unregister(key)
+                continue
+            self.register(ModelSpec(
+                key,
+                entry["target"],
+                kwargs=entry.get("kwargs", {}),
+                requires=entry.get("requires", []),
+                env=entry.get("env", []),
+                source="config",
+            ))
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Retorna o registro de modelos do processo: os embutidos, os de entry points
+    (grupo `pdf_ingest.models`) e os do arquivo de configuração. Variáveis de ambiente:
+    MODELS_CONFIG: caminho de um JSON com modelos adicionais ou substitutos (ver `load_config`)
+    MOCK_MODELS: registra também os modelos simulados `mock_remote` e `mock_local` (padrão: 0)
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = ModelRegistry()
+            for spec in BUILTIN_MODELS:
+                registry.register(spec)
+            if os.getenv("MOCK_MODELS", "0").lower() not in ("0", "false", "no"):
+                for spec in MOCK_MODELS:
+                    registry.register(spec)
+            try:
+                registry.load_entry_points()
+            except Exception as e:
+                print(f"Aviso: Falha ao descobrir modelos por entry points: {e}")
+            config_path = os.getenv("MODELS_CONFIG")
+            if config_path:
+                registry.load_config(config_path)
+            _registry = registry
+        return _registry
@@ -1,82 +1,549 @@
+import math
 import time
-from models.base_model import IngestionModel
-from typing import List, Dict, Any
-from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from models.base_model import IngestionModel, QueryResult
+from typing import List, Dict, Any, Optional, Callable
+from utils.cache import file_sha256
+from utils.judge import AIJudge, get_judge
+from utils.memory import MemoryTracker, get_memory_ceiling_bytes, use_tracker
+from utils.metrics import ITEM_LATENCY, ITEMS_EVALUATED
+from utils.pricing import scale_usage
+from utils.results_store import ResultsStore, get_results_store
+from utils.stats import summarize_latencies
+from utils.timing import StageTimings, collect_timings, span
 import os
 import json
 
+# Assinatura do callback de progresso: (índice do modelo, índice da pergunta, resultado)
+ResultCallback = Callable[[int, int, Dict[str, Any]], None]
+# Callback de progresso de um corpus: (índice do documento, índice do modelo, índice da pergunta, resultado)
+CorpusResultCallback = Callable[[int, int, int, Dict[str, Any]], None]
+
+
+class _ModelRun:
+    """Estado compartilhado pelas perguntas de um mesmo modelo durante uma execução."""
+    def __init__(self, model: IngestionModel, model_index: int, num_questions: int, doc_hash: Optional[str] = None):
+        self.model = model
+        self.doc_hash = doc_hash
+        self.model_index = model_index
+        self.num_questions = num_questions
+        # Os resultados são gravados por posição, então a ordem final é sempre a mesma
+        self.results: List[Optional[Dict[str, Any]]] = [None] * num_questions
+        self.document = None
+        self.ingest_error = None
+        self.ingest_share = 0.0
+        # Etapas da ingestão, já divididas pelo número de perguntas
+        self.ingest_timings = StageTimings()
+        # Uso de API da ingestão (ex: páginas do Document AI), já dividido pelo número de perguntas.
+        # Só é atribuído quando o documento foi processado nesta execução (não veio do cache)
+        self.ingest_usage = None
+        self.active_lanes = 1
+        self._ingested = False
+        self._ingest_lock = threading.Lock()
+        self._next_index = 0
+        self._pending = []
+        # Envios ao juiz agendados por prazo (ver `schedule_flush`)
+        self._flush_timers: List[threading.Timer] = []
+        self._lock = threading.Lock()
+
+    def get_document(self, pdf_path: str):
+        """Ingere o documento uma única vez; as demais perguntas aguardam e reaproveitam."""
+        with self._ingest_lock:
+            if not self._ingested:
+                ingest_start = time.perf_counter()
+                with collect_timings() as timings, span("ingest"):
+                    try:
+                        self.document = self.model.ingest(pdf_path, doc_hash=self.doc_hash)
+                    except Exception as e:
+                        self.ingest_error = f"ERRO: {str(e)}"
+                ingest_latency = (time.perf_counter() - ingest_start) * 1000
+                # O custo da ingestão é dividido igualmente entre as perguntas
+                self.ingest_share = ingest_latency / max(self.num_questions, 1)
+                self.ingest_timings = timings.scaled(1 / max(self.num_questions, 1))
+                usage = self.document.metadata.get("usage") if self.document is not None else None
+                if usage and "build_document" in timings.durations_ms:
+                    self.ingest_usage = scale_usage(usage, 1 / max(self.num_questions, 1))
+                self._ingested = True
+        return self.document, self.ingest_error, self.ingest_share
+
+    def take_batch(self, max_size: Optional[int]) -> List[int]:
+        """Entrega o próximo lote de perguntas pendentes deste modelo (todas, se `max_size` for None)."""
+        with self._lock:
+            end = self.num_questions if max_size is None else min(self._next_index + max_size, self.num_questions)
+            batch = list(range(self._next_index, end))
+            self._next_index = end
+            return batch
+
+    def next_index(self) -> Optional[int]:
+        """Entrega a próxima pergunta pendente deste modelo (ou None quando acabarem)."""
+        with self._lock:
+            if self._next_index >= self.num_questions:
+                return None
+            index = self._next_index
+            self._next_index += 1
+            return index
+
+    def add_pending(self, index: int, result: Dict[str, Any]) -> bool:
+        """Guarda uma resposta que ainda não passou pelo juiz; retorna True se ela é a mais antiga pendente."""
+        with self._lock:
+            self._pending.append((index, result))
+            return len(self._pending) == 1
+
+    def schedule_flush(self, delay_s: float, flush: Callable[[], None]) -> None:
+        """Agenda `flush` para daqui a `delay_s` segundos (envio ao juiz mesmo com o lote incompleto)."""
+        timer = threading.Timer(delay_s, flush)
+        timer.daemon = True
+        with self._lock:
+            self._flush_timers = [t for t in self._flush_timers if t.is_alive()] + [timer]
+        timer.start()
+
+    def cancel_flushes(self) -> None:
+        """Cancela os envios agendados e espera os que já estão em andamento."""
+        with self._lock:
+            timers, self._flush_timers = self._flush_timers, []
+        for timer in timers:
+            timer.cancel()
+            timer.join()
+
+    def take_pending(self, min_size: int) -> list:
+        """Retira as respostas pendentes, se já houver pelo menos `min_size` delas."""
+        with self._lock:
+            if not self._pending or len(self._pending) < min_size:
+                return []
+            pending, self._pending = self._pending, []
+            return pending
+
+    def finish_lane(self) -> bool:
+        """Marca o fim de uma pista; retorna True para a última pista do modelo."""
+        with self._lock:
+            self.active_lanes -= 1
+            return self.active_lanes == 0
+
+
 class PDFTestOrchestrator:
-    def __init__(self, models: List[IngestionModel]):
+    def __init__(self, models: List[IngestionModel], max_workers: Optional[int] = None,
+                 judge: Optional[AIJudge] = None, memory_ceiling_bytes: Optional[int] = None,
+                 results_store: Optional[ResultsStore] = None):
         self.models = models
-        self.judge_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # O juiz (e o seu cliente HTTP e cache de veredictos) é compartilhado pelo processo inteiro
+        self.judge = judge or get_judge()
+        # Máximo de perguntas em paralelo por modelo; max_workers <= 1 mantém a execução sequencial original
+        self.max_workers = max_workers or int(os.getenv("ORCHESTRATOR_MAX_WORKERS", "8"))
+        # Prazo máximo de uma resposta esperando o lote do juiz encher (os resultados só saem depois do juiz)
+        self.judge_flush_s = float(os.getenv("JUDGE_FLUSH_MS", "300")) / 1000
+        # Teto de crescimento do RSS por execução (ver utils.memory) e o uso medido na última execução
+        self.memory_ceiling_bytes = get_memory_ceiling_bytes() if memory_ceiling_bytes is None else memory_ceiling_bytes
+        self.memory: Optional[MemoryTracker] = None
+        self.resources: Optional[Dict[str, Any]] = None
+        # Histórico persistente dos resultados (None se desativado) e o id da última execução gravada
+        self.results_store = results_store or get_results_store()
+        self.run_id: Optional[str] = None
 
-    def _get_ai_judge_evaluation(self, question, expected_answer, actual_answer) -> bool:
-        """Usa um LLM para avaliar semanticamente se a resposta obtida é correta."""
-        if not actual_answer or "erro" in actual_answer.lower():
-            return False
+    @contextmanager
+    def _track_memory(self):
+        """Acompanha a memória durante uma execução; o resumo fica em `self.resources`."""
+        self.memory = MemoryTracker(self.memory_ceiling_bytes)
+        try:
+            with self.memory:
+                yield self.memory
+        finally:
+            self.resources = self.memory.report()
+            self.memory = None
+
+    @contextmanager
+    def _record_run(self, kind: str, cancel_event: Optional[threading.Event], **metadata):
+        """Registra a execução no histórico de resultados; o id fica em `self.run_id`."""
+        self.run_id = None
+        if self.results_store is None:
+            yield None
+            return
+        self.run_id = self.results_store.start_run(kind, [model.model_name for model in self.models], metadata)
+        status = "failed"
+        try:
+            yield self.run_id
+            status = "cancelled" if cancel_event is not None and cancel_event.is_set() else "completed"
+        finally:
+            self.results_store.finish_run(self.run_id, status)
 
-        # Para respostas curtas, uma verificação simples pode ser suficiente e mais barata
-        if len(expected_answer) < 20 and expected_answer.lower() in actual_answer.lower():
-            return True
+    def _recording(self, on_result: Optional[ResultCallback], doc_hash: Optional[str],
+                   document_name: Optional[str]) -> Optional[ResultCallback]:
+        """Envolve o callback de progresso para gravar cada item no histórico assim que ele é avaliado."""
+        if self.run_id is None:
+            return on_result
+        run_id = self.run_id
 
-        prompt = f"""
-        Você é um juiz de IA avaliando a qualidade da resposta de outro modelo.
-        Sua tarefa é determinar se a "Resposta Obtida" é uma resposta semanticamente correta para a "Pergunta", comparando-a com a "Resposta Esperada" (gabarito).
+        def callback(model_index: int, question_index: int, result: Dict[str, Any]) -> None:
+            try:
+                self.results_store.append(run_id, doc_hash, self.models[model_index].model_name,
+                                          question_index, result, document_name=document_name)
+            except Exception as e:
+                print(f"Aviso: Falha ao gravar o resultado no histórico: {e}")
+            if on_result:
+                on_result(model_index, question_index, result)
+        return callback
 
-        A "Resposta Obtida" não precisa ser idêntica à "Resposta Esperada". Ela pode ser um resumo, uma parafrase, ou conter informações adicionais, desde que o cerne da resposta esteja correto.
+    def _document_entry(self, pdf_path: str, doc_hash: Optional[str], document_name: Optional[str],
+                        num_questions: int) -> Dict[str, Any]:
+        """Identificação do documento no histórico (o SHA-256 é calculado se ainda não for conhecido)."""
+        if self.results_store is not None and doc_hash is None:
+            doc_hash = file_sha256(pdf_path)
+        return {"doc_hash": doc_hash, "name": document_name or os.path.basename(pdf_path),
+                "num_questions": num_questions}
 
-        Pergunta: "{question}"
-        Resposta Esperada (Gabarito): "{expected_answer}"
-        Resposta Obtida (para ser avaliada): "{actual_answer}"
+    def _answer_item(self, run: _ModelRun, pdf_path: str, item: Dict[str, str]) -> Dict[str, Any]:
+        """Executa uma pergunta em um modelo (a avaliação do juiz acontece depois, em lote)."""
+        question = item.get("question")
+        expected_answer = item.get("answer")
 
-        A "Resposta Obtida" está correta? Responda apenas com a palavra "Sim" ou "Não".
+        with collect_timings(run.model.model_name) as timings:
+            # O limite de concorrência vale para o modelo no processo inteiro (entre requisições)
+            with span("queue_wait"):
+                run.model.concurrency_limiter.acquire()
+            try:
+                document, ingest_error, ingest_share = run.get_document(pdf_path)
+
+                details = None
+                start_time = time.perf_counter()
+                if ingest_error:
+                    actual_answer = ingest_error
+                else:
+                    try:
+                        with span("query"):
+                            actual_answer = run.model.query(document, question)
+                    except Exception as e:
+                        actual_answer = f"ERRO: {str(e)}"
+                end_time = time.perf_counter()
+            finally:
+                run.model.concurrency_limiter.release()
+
+        if isinstance(actual_answer, QueryResult):
+            actual_answer, details = actual_answer.answer, actual_answer.details
+        if run.ingest_usage:
+            details = {**(details or {}), "ingest_usage": run.ingest_usage}
+
+        latency = (end_time - start_time) * 1000 + ingest_share
+        timings.merge(run.ingest_timings)
+        ITEM_LATENCY.observe(latency / 1000, model=run.model.model_name)
+
+        return {
+            "question": question,
+            "expected_answer": expected_answer,
+            "actual_answer": actual_answer,
+            "latency_ms": round(latency),
+            "is_correct": False,
+            "details": details,
+            "stage_timings_ms": timings.as_dict(),
+        }
+
+    def _answer_batch(self, run: _ModelRun, pdf_path: str, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Executa várias perguntas em uma única chamada ao modelo.
+        O tempo da chamada compartilhada é dividido igualmente entre os itens; o tempo
+        exclusivo de cada item (ex: nova tentativa individual) é somado só a ele.
         """
+        questions = [item.get("question") for item in items]
+
+        with collect_timings(run.model.model_name) as timings:
+            with span("queue_wait"):
+                run.model.concurrency_limiter.acquire()
+            try:
+                document, ingest_error, ingest_share = run.get_document(pdf_path)
+
+                start_time = time.perf_counter()
+                if ingest_error:
+                    answers = [ingest_error] * len(items)
+                else:
+                    try:
+                        with span("query"):
+                            answers = run.model.query_batch(document, questions)
+                    except Exception as e:
+                        answers = [f"ERRO: {str(e)}"] * len(items)
+                end_time = time.perf_counter()
+            finally:
+                run.model.concurrency_limiter.release()
+
+        exclusive = [answer.exclusive_ms if isinstance(answer, QueryResult) else 0.0 for answer in answers]
+        shared_latency = max((end_time - start_time) * 1000 - sum(exclusive), 0.0) / max(len(items), 1)
+        # As etapas da chamada em lote são divididas igualmente entre os itens, como a latência
+        item_timings = timings.scaled(1 / max(len(items), 1))
+        item_timings.merge(run.ingest_timings)
+
+        results = []
+        for item, answer, exclusive_ms in zip(items, answers, exclusive):
+            details = None
+            if isinstance(answer, QueryResult):
+                answer, details = answer.answer, answer.details
+            if run.ingest_usage:
+                details = {**(details or {}), "ingest_usage": run.ingest_usage}
+            latency = shared_latency + exclusive_ms + ingest_share
+            ITEM_LATENCY.observe(latency / 1000, model=run.model.model_name)
+            results.append({
+                "question": item.get("question"),
+                "expected_answer": item.get("answer"),
+                "actual_answer": answer,
+                "latency_ms": round(latency),
+                "is_correct": False,
+                "details": details,
+                "stage_timings_ms": item_timings.as_dict(),
+            })
+        return results
+
+    def _score_pending(self, run: _ModelRun, on_result: Optional[ResultCallback], min_size: int) -> None:
+        """Avalia em lote as respostas acumuladas de um modelo e publica os resultados."""
+        batch = run.take_pending(min_size)
+        if not batch:
+            return
+
+        # --- AVALIAÇÃO COM "IA COMO JUIZ", VÁRIOS ITENS POR REQUISIÇÃO ---
+        # O tempo do juiz fica nas etapas do item, mas não entra na latência do modelo
+        with collect_timings(run.model.model_name) as timings, span("judge"):
+            verdicts = self.judge.evaluate_batch([
+                (result["question"], result["expected_answer"], result["actual_answer"]) for _, result in batch
+            ])
+        judge_share = timings.durations_ms["judge"] / len(batch)
+        for (index, result), is_correct in zip(batch, verdicts):
+            result["is_correct"] = is_correct
+            result.setdefault("stage_timings_ms", {})["judge"] = round(judge_share, 1)
+            ITEMS_EVALUATED.inc(model=run.model.model_name, correct=str(bool(is_correct)).lower())
+            run.results[index] = result
+            if on_result:
+                on_result(run.model_index, index, result)
+
+    def _run_lane(self, run: _ModelRun, pdf_path: str, test_questions: List[Dict[str, str]],
+                  on_result: Optional[ResultCallback], cancel_event: Optional[threading.Event]) -> None:
+        """Consome as perguntas pendentes de um modelo até acabarem (ou até a execução ser cancelada)."""
+        # As pistas rodam em threads do pool: o teto de memória da execução precisa ser repassado
+        with use_tracker(self.memory):
+            self._consume_lane(run, pdf_path, test_questions, on_result, cancel_event)
+
+    def _consume_lane(self, run: _ModelRun, pdf_path: str, test_questions: List[Dict[str, str]],
+                      on_result: Optional[ResultCallback], cancel_event: Optional[threading.Event]) -> None:
         try:
-            response = self.judge_client.chat.completions.create(
-                model="gpt-4o", # Poderia ser um modelo mais barato como gpt-3.5-turbo
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=5,
-                temperature=0.0,
-            )
-            decision = response.choices[0].message.content.strip().lower()
-            return "sim" in decision
-        except Exception:
-            # Em caso de falha do juiz, recorre à verificação simples
-            return (expected_answer or "").lower() in (actual_answer or "").lower()
-
-    def run_tests(self, pdf_path: str, test_questions: List[Dict[str, str]]) -> List[Dict[str, Any]]:
-        final_results = []
-        
-        for model in self.models:
-            model_results = []
-            for item in test_questions:
-                question = item.get("question")
-                expected_answer = item.get("answer")
-                
-                start_time = time.time()
-                try:
-                    actual_answer = model.ingest_and_query(pdf_path, question)
-                except Exception as e:
-                    actual_answer = f"ERRO: {str(e)}"
-                end_time = time.time()
-                
-                latency = (end_time - start_time) * 1000
-                
-                # --- NOVA AVALIAÇÃO COM "IA COMO JUIZ" ---
-                is_correct = self._get_ai_judge_evaluation(question, expected_answer, actual_answer)
-                
-                result = {
-                    "question": question,
-                    "expected_answer": expected_answer,
-                    "actual_answer": actual_answer,
-                    "latency_ms": round(latency),
-                    "is_correct": is_correct
-                }
-                model_results.append(result)
-            
-            final_results.append({
+            if run.model.supports_batch_query:
+                # As perguntas vão em lotes de até `max_batch_questions`; cada lote é avaliado assim que volta
+                while cancel_event is None or not cancel_event.is_set():
+                    indexes = run.take_batch(run.model.max_batch_questions)
+                    if not indexes:
+                        break
+                    results = self._answer_batch(run, pdf_path, [test_questions[i] for i in indexes])
+                    for index, result in zip(indexes, results):
+                        run.add_pending(index, result)
+                    self._score_pending(run, on_result, min_size=1)
+                return
+
+            while cancel_event is None or not cancel_event.is_set():
+                index = run.next_index()
+                if index is None:
+                    break
+                if run.add_pending(index, self._answer_item(run, pdf_path, test_questions[index])):
+                    # Primeira resposta na fila: vai para o juiz no prazo, mesmo que o lote não encha
+                    run.schedule_flush(self.judge_flush_s, lambda: self._score_pending(run, on_result, min_size=1))
+                # Lotes cheios já vão para o juiz, sem esperar as demais perguntas
+                self._score_pending(run, on_result, min_size=self.judge.max_batch_size)
+        finally:
+            # A última pista do modelo avalia o que sobrou
+            if run.finish_lane():
+                run.cancel_flushes()
+                self._score_pending(run, on_result, min_size=1)
+                # O documento ingerido continua no cache dos modelos; aqui ele não é mais necessário
+                run.document = None
+
+    def run_tests(self, pdf_path: str, test_questions: List[Dict[str, str]],
+                  on_result: Optional[ResultCallback] = None,
+                  cancel_event: Optional[threading.Event] = None,
+                  doc_hash: Optional[str] = None, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Executa todas as perguntas em todos os modelos.
+        `on_result(model_index, question_index, result)` é chamado assim que cada item é avaliado.
+        Se `cancel_event` for acionado, as perguntas ainda não iniciadas são descartadas.
+        `doc_hash` (opcional) é o SHA-256 do PDF, quando já conhecido.
+        O pico de memória da execução fica em `self.resources`; com o histórico de resultados ativo,
+        cada item é gravado nele e o id da execução fica em `self.run_id`.
+        """
+        document = self._document_entry(pdf_path, doc_hash, document_name, len(test_questions))
+        with self._track_memory(), self._record_run("test", cancel_event, documents=[document]):
+            on_result = self._recording(on_result, document["doc_hash"], document["name"])
+            runs = self._execute(pdf_path, test_questions, on_result, cancel_event, doc_hash)
+        return self._summaries(runs)
+
+    def _execute(self, pdf_path: str, test_questions: List[Dict[str, str]],
+                 on_result: Optional[ResultCallback], cancel_event: Optional[threading.Event],
+                 doc_hash: Optional[str]) -> List[_ModelRun]:
+        """Uma passada completa (todas as perguntas em todos os modelos); retorna o estado de cada modelo."""
+        runs = [
+            _ModelRun(model, model_index, len(test_questions), doc_hash=doc_hash)
+            for model_index, model in enumerate(self.models)
+        ]
+
+        if self.max_workers <= 1:
+            for run in runs:
+                self._run_lane(run, pdf_path, test_questions, on_result, cancel_event)
+        else:
+            lanes = []
+            for run in runs:
+                self._assign_lanes(run)
+                lanes.extend([run] * run.active_lanes)
+
+            with ThreadPoolExecutor(max_workers=max(len(lanes), 1)) as pool:
+                futures = [
+                    pool.submit(self._run_lane, run, pdf_path, test_questions, on_result, cancel_event)
+                    for run in lanes
+                ]
+                for future in futures:
+                    future.result()
+
+        return runs
+
+    def run_benchmark(self, pdf_path: str, test_questions: List[Dict[str, str]],
+                      warmup_runs: int = 1, repetitions: int = 5,
+                      on_result: Optional[ResultCallback] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      doc_hash: Optional[str] = None, document_name: Optional[str] = None):
+        """
+        Modo benchmark: `warmup_runs` passadas descartadas (ingestão, caches e conexões ficam quentes),
+        seguidas de `repetitions` passadas medidas.
+        `on_result` recebe os itens das passadas medidas, com o campo "repetition" (a partir de 0).
+
+        Retorna (test_summary, benchmark):
+        - test_summary: um item por pergunta (o da última repetição), com `latency_ms` igual à
+          mediana das repetições e todas as amostras em `latency_samples_ms`
+        - benchmark: por modelo, percentis, desvio padrão e intervalo de confiança da latência
+        O pico de memória de todas as passadas fica em `self.resources`; no histórico de resultados,
+        só as passadas medidas são gravadas (uma linha por repetição).
+        """
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+
+        warmups_done = 0
+        measured = []
+        document = self._document_entry(pdf_path, doc_hash, document_name, len(test_questions))
+        with self._track_memory(), self._record_run("benchmark", cancel_event, documents=[document],
+                                                     warmup_runs=warmup_runs, repetitions=repetitions):
+            on_result = self._recording(on_result, document["doc_hash"], document["name"])
+            for _ in range(warmup_runs):
+                if cancelled():
+                    break
+                self._execute(pdf_path, test_questions, None, cancel_event, doc_hash)
+                warmups_done += 1
+
+            for repetition in range(repetitions):
+                if cancelled():
+                    break
+                callback = None
+                if on_result:
+                    callback = lambda model_index, question_index, result, repetition=repetition: on_result(
+                        model_index, question_index, {**result, "repetition": repetition}
+                    )
+                measured.append(self._execute(pdf_path, test_questions, callback, cancel_event, doc_hash))
+
+        test_summary, benchmark = [], []
+        for model_index, model in enumerate(self.models):
+            results, samples, correct = [], [], []
+            for question_index in range(len(test_questions)):
+                items = [runs[model_index].results[question_index] for runs in measured]
+                items = [item for item in items if item is not None]
+                if not items:
+                    continue
+                latencies = [item["latency_ms"] for item in items]
+                samples.extend(latencies)
+                correct.extend(item["is_correct"] for item in items)
+                summary = summarize_latencies(latencies)
+                results.append({**items[-1], "latency_ms": round(summary["p50_ms"]), "latency_samples_ms": latencies})
+
+            test_summary.append({"model_name": model.model_name, "results": results})
+            benchmark.append({
                 "model_name": model.model_name,
-                "results": model_results
+                "warmup_runs": warmups_done,
+                "repetitions": len(measured),
+                "accuracy": sum(correct) / len(correct) if correct else None,
+                **summarize_latencies(samples),
             })
-        
-        return final_results
\ No newline at end of file
+        return test_summary, benchmark
+
+    def _assign_lanes(self, run: _ModelRun) -> None:
+        """
+        Cada modelo ganha "pistas" (workers) até o seu limite de concorrência:
+        modelos remotos se espalham pelas perguntas, modelos locais ficam limitados.
+        """
+        if run.model.supports_batch_query:
+            # Uma pista por lote de perguntas, dentro do limite de concorrência
+            batch_size = run.model.max_batch_questions or max(run.num_questions, 1)
+            batches = math.ceil(run.num_questions / batch_size)
+            run.active_lanes = max(min(run.model.max_concurrency, batches, self.max_workers), 1)
+        else:
+            run.active_lanes = max(min(run.model.max_concurrency, run.num_questions, self.max_workers), 1)
+
+    @staticmethod
+    def _summaries(runs: List[_ModelRun]) -> List[Dict[str, Any]]:
+        return [
+            # Itens não executados (execução cancelada) ficam de fora
+            {"model_name": run.model.model_name, "results": [r for r in run.results if r is not None]}
+            for run in runs
+        ]
+
+    def run_corpus(self, documents: List[Dict[str, Any]],
+                   on_result: Optional[CorpusResultCallback] = None,
+                   cancel_event: Optional[threading.Event] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Executa um corpus inteiro (vários PDFs, cada um com as suas perguntas) em todos os modelos.
+        Cada documento é um dict com "pdf_path", "questions" e, opcionalmente, "doc_hash" e "name".
+
+        O trabalho documento × modelo × pergunta é distribuído em um pool por modelo, compartilhado
+        por todos os documentos e dimensionado pelo limite de concorrência do modelo: enquanto um
+        modelo local processa um documento, um modelo remoto já atende vários outros.
+        `on_result(document_index, model_index, question_index, result)` é chamado a cada item avaliado.
+        Retorna, para cada documento, o mesmo resumo por modelo de `run_tests`.
+        O pico de memória do corpus inteiro fica em `self.resources`.
+        """
+        runs = [
+            [
+                _ModelRun(model, model_index, len(document["questions"]), doc_hash=document.get("doc_hash"))
+                for model_index, model in enumerate(self.models)
+            ]
+            for document in documents
+        ]
+
+        entries = [
+            self._document_entry(document["pdf_path"], document.get("doc_hash"), document.get("name"),
+                                 len(document["questions"]))
+            for document in documents
+        ]
+
+        def lane_callback(document_index: int) -> Optional[ResultCallback]:
+            callback = None
+            if on_result is not None:
+                callback = lambda model_index, question_index, result: on_result(
+                    document_index, model_index, question_index, result
+                )
+            entry = entries[document_index]
+            return self._recording(callback, entry["doc_hash"], entry["name"])
+
+        with self._track_memory(), self._record_run("corpus", cancel_event, documents=entries):
+            pools = [
+                ThreadPoolExecutor(
+                    max_workers=max(min(model.max_concurrency, self.max_workers), 1),
+                    thread_name_prefix=f"corpus-{model.model_name}",
+                )
+                for model in self.models
+            ]
+            try:
+                futures = []
+                # Documentos em ordem: cada pool termina um documento antes de avançar muito nos seguintes
+                for document_index, (document, document_runs) in enumerate(zip(documents, runs)):
+                    callback = lane_callback(document_index)
+                    for run, pool in zip(document_runs, pools):
+                        self._assign_lanes(run)
+                        futures.extend(
+                            pool.submit(self._run_lane, run, document["pdf_path"], document["questions"],
+                                        callback, cancel_event)
+                            for _ in range(run.active_lanes)
+                        )
+                for future in futures:
+                    future.result()
+            finally:
+                for pool in pools:
+                    pool.shutdown(wait=True, cancel_futures=True)
+
+        return [self._summaries(document_runs) for document_runs in runs]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional
 
 # Schemas para a resposta da API
 
@@ -9,12 +9,144 @@ class TestResultItem(BaseModel):
     actual_answer: str
     latency_ms: float
     is_correct: bool
+    # Informações extras reportadas pelo modelo (ex: páginas enviadas para a API)
+    details: Optional[Dict[str, Any]] = None
+    # Tempo (ms) de cada etapa atribuído ao item: ingest (com parse, render, ocr, index...),
+    # query (com retrieval, render, encode, api...), queue_wait e judge. Etapas aninhadas se sobrepõem.
+    stage_timings_ms: Optional[Dict[str, float]] = None
+    # Modo benchmark: latência de cada repetição medida (`latency_ms` passa a ser a mediana)
+    latency_samples_ms: Optional[List[float]] = None
 
 class ModelTestResult(BaseModel):
     model_name: str
     results: List[TestResultItem]
 
+class LatencyStats(BaseModel):
+    """Distribuição da latência de um modelo no modo benchmark (todas as perguntas × repetições)."""
+    model_name: str
+    warmup_runs: int
+    repetitions: int
+    accuracy: Optional[float] = None
+    samples: int
+    mean_ms: Optional[float] = None
+    std_ms: Optional[float] = None
+    min_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    # Intervalo de confiança de 95% da média (ausente com uma única amostra)
+    ci95_low_ms: Optional[float] = None
+    ci95_high_ms: Optional[float] = None
+
+class ResourceUsage(BaseModel):
+    """Memória da execução. O RSS é do processo inteiro (inclui execuções simultâneas)."""
+    peak_rss_mb: float
+    baseline_rss_mb: float
+    rss_growth_mb: float
+    # Maior volume de páginas lidas e ainda não consumidas, somando os pipelines de páginas
+    peak_page_buffer_mb: float
+    # Crescimento máximo do RSS permitido (REQUEST_MEMORY_CEILING_MB); ausente se desativado
+    memory_ceiling_mb: Optional[float] = None
+    ceiling_exceeded: bool = False
+
 class TestSummaryResponse(BaseModel):
     filename: str
     filesize_bytes: int
-    test_summary: List[ModelTestResult]
\ No newline at end of file
+    # SHA-256 do PDF no armazenamento de documentos (permite repetir o teste sem reenviar o arquivo)
+    document_id: Optional[str] = None
+    test_summary: List[ModelTestResult]
+    # Presente apenas no modo benchmark (aquecimento + repetições)
+    benchmark: Optional[List[LatencyStats]] = None
+    resources: Optional[ResourceUsage] = None
+    # Id da execução no histórico de resultados (`/results/...`); ausente se o histórico estiver desativado
+    run_id: Optional[str] = None
+
+# Schemas para a API de jobs (execução em segundo plano)
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    filesize_bytes: int
+    document_id: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    completed_items: int
+    total_items: int
+    error: Optional[str] = None
+    test_summary: List[ModelTestResult]
+    benchmark: Optional[List[LatencyStats]] = None
+    resources: Optional[ResourceUsage] = None
+    run_id: Optional[str] = None
+
+
+# Schemas para o streaming de resultados (NDJSON, um objeto por linha)
+
+class TestResultEvent(TestResultItem):
+    type: str = "result"
+    model_name: str
+    question_index: int
+    # Modo benchmark: repetição medida à qual o item pertence
+    repetition: Optional[int] = None
+
+class TestSummaryEvent(TestSummaryResponse):
+    type: str = "summary"
+    job_id: str
+    status: str
+
+
+
+# Schemas para o armazenamento de documentos
+
+class StoredDocumentResponse(BaseModel):
+    document_id: str
+    filename: str
+    size_bytes: int
+    created_at: float
+    already_stored: bool
+
+
+# Schemas para o benchmark de corpus (vários documentos em uma única execução)
+
+class CorpusDocument(BaseModel):
+    # Documento já enviado para `/documents` (id = SHA-256 do conteúdo)
+    document_id: str
+    # Nome exibido no relatório (padrão: nome original do arquivo enviado)
+    name: Optional[str] = None
+    questions: List[Dict[str, str]]
+
+class CorpusBenchmarkRequest(BaseModel):
+    models: List[str]
+    documents: List[CorpusDocument]
+
+class CorpusModelSummary(BaseModel):
+    model_name: str
+    total_items: int
+    completed_items: int
+    correct_items: int
+    accuracy: Optional[float] = None
+    avg_latency_ms: Optional[float] = None
+    total_latency_ms: float
+
+class CorpusBenchmarkReport(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    completed_items: int
+    total_items: int
+    error: Optional[str] = None
+    # Agregado por modelo sobre o corpus inteiro
+    models: List[CorpusModelSummary]
+    # Um resumo por documento, no mesmo formato de `/test/pdf`
+    documents: List[TestSummaryResponse]
+    resources: Optional[ResourceUsage] = None
+    # Id da execução no histórico de resultados (compare corpora em `/results/compare`)
+    run_id: Optional[str] = None
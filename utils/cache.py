@@ -0,0 +1,145 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula o hash SHA-256 do conteúdo de um arquivo, lendo em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe limitado por número de entradas e/ou por tamanho total.
+    `sizeof` define o "peso" de cada valor quando `max_bytes` é usado.
+    """
+    def __init__(self, max_entries: Optional[int] = 128, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._data[key]
+            self._data[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        # Remove sempre a entrada menos usada, mas nunca a que acabou de entrar
+        while len(self._data) > 1 and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            old_key, _ = self._data.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(old_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+class DocumentCache:
+    """
+    Cache de documentos já ingeridos, indexado por (modelo, hash do PDF).
+    Possui um nível em memória (LRU) e um nível opcional em disco (pickle).
+    """
+    def __init__(self, max_entries: int = 32, disk_dir: Optional[str] = None):
+        self.memory = LRUCache(max_entries=max_entries)
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key) -> str:
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.pkl")
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or not self.disk_dir:
+            return value
+
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except Exception as e:
+            print(f"Aviso: Cache em disco corrompido ({path}): {e}")
+            return None
+        self.memory.put(key, value)
+        return value
+
+    def put(self, key, value) -> None:
+        self.memory.put(key, value)
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)  # Escrita atômica
+        except Exception as e:
+            print(f"Aviso: Não foi possível gravar o cache em disco ({path}): {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+_document_cache: Optional[DocumentCache] = None
+_document_cache_lock = threading.Lock()
+
+
+def get_document_cache() -> DocumentCache:
+    """
+    Retorna o cache compartilhado por todos os modelos do processo, criado no primeiro uso
+    (depois do load_dotenv). Variáveis de ambiente:
+    DOCUMENT_CACHE_SIZE: número de documentos em memória
+    DOCUMENT_CACHE_DIR: se definido, ativa o nível em disco
+    """
+    global _document_cache
+    with _document_cache_lock:
+        if _document_cache is None:
+            _document_cache = DocumentCache(
+                max_entries=int(os.getenv("DOCUMENT_CACHE_SIZE", "32")),
+                disk_dir=os.getenv("DOCUMENT_CACHE_DIR") or None,
+            )
+        return _document_cache
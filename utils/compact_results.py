@@ -0,0 +1,155 @@
+import io
+import json
+from typing import Any, Dict, List, Optional
+
+# Identifica o bloco colunar (`results`) nas respostas compactas
+COLUMNAR_FORMAT = "columnar-v1"
+
+# Tipos de mídia das exportações binárias (precisam do pacote opcional `pyarrow`)
+EXPORT_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class _Interner:
+    """Tabela de valores únicos: cada valor repetido vira o índice da primeira ocorrência."""
+    def __init__(self):
+        self.values: List[Any] = []
+        self._index: Dict[Any, int] = {}
+
+    def __call__(self, value) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def compact_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Versão compacta de um relatório de resultados (`/test/pdf`, `/jobs/{id}` ou `/benchmarks/{id}`).
+    Os campos de resumo continuam iguais; os itens de `test_summary` (de cada documento, no corpus)
+    viram um único bloco colunar em `results`:
+
+    - `models`: nomes dos modelos, uma única vez
+    - `questions`: pares {"question", "expected_answer"} únicos (gabaritos longos aparecem uma vez)
+    - `answers`: respostas únicas, deduplicadas pelo conteúdo (ex: o texto inteiro do documento que
+      o modelo local devolve a cada pergunta)
+    - `columns`: uma lista por campo, um valor por item. `model`, `question` e `answer` são índices
+      nas tabelas acima e, no corpus, `document` é o índice em `documents`. `stage_timings_ms`
+      traz uma coluna por etapa (None onde a etapa não ocorreu); colunas sem nenhum valor são omitidas.
+    """
+    models, questions, answers = _Interner(), _Interner(), _Interner()
+    columns: Dict[str, List[Any]] = {
+        "model": [], "question": [], "answer": [], "latency_ms": [], "is_correct": [],
+        "details": [], "latency_samples_ms": [],
+    }
+    stages: Dict[str, List[Optional[float]]] = {}
+
+    if "documents" in report:
+        # Corpus: os documentos já estão em `documents`, sem os itens
+        columns["document"] = []
+        compact = {key: value for key, value in report.items() if key != "documents"}
+        compact["documents"] = []
+        summaries = []
+        for document_index, document in enumerate(report["documents"]):
+            compact["documents"].append({key: value for key, value in document.items() if key != "test_summary"})
+            summaries.append((document_index, document.get("test_summary") or []))
+    else:
+        compact = {key: value for key, value in report.items() if key != "test_summary"}
+        summaries = [(None, report.get("test_summary") or [])]
+
+    rows = 0
+    for document_index, test_summary in summaries:
+        for model_summary in test_summary:
+            model_index = models(model_summary["model_name"])
+            for item in model_summary["results"]:
+                if document_index is not None:
+                    columns["document"].append(document_index)
+                columns["model"].append(model_index)
+                columns["question"].append(questions((item["question"], item["expected_answer"])))
+                columns["answer"].append(answers(item["actual_answer"]))
+                columns["latency_ms"].append(item["latency_ms"])
+                columns["is_correct"].append(item["is_correct"])
+                columns["details"].append(item.get("details"))
+                columns["latency_samples_ms"].append(item.get("latency_samples_ms"))
+                for stage, duration_ms in (item.get("stage_timings_ms") or {}).items():
+                    stages.setdefault(stage, [None] * rows).append(duration_ms)
+                rows += 1
+                for values in stages.values():
+                    if len(values) < rows:
+                        values.append(None)
+
+    for name in ("details", "latency_samples_ms"):
+        if all(value is None for value in columns[name]):
+            del columns[name]
+    if stages:
+        columns["stage_timings_ms"] = stages
+
+    compact["results"] = {
+        "format": COLUMNAR_FORMAT,
+        "rows": rows,
+        "models": models.values,
+        "questions": [{"question": question, "expected_answer": expected} for question, expected in questions.values],
+        "answers": answers.values,
+        "columns": columns,
+    }
+    return compact
+
+
+def results_table(compact: Dict[str, Any]):
+    """
+    Tabela Arrow (uma linha por item) de um relatório compacto. Modelos, documentos, perguntas e
+    respostas viram colunas de dicionário (cada texto é gravado uma vez); os campos de resumo do
+    relatório vão em JSON nos metadados da tabela (chave `report`).
+    """
+    import pyarrow as pa
+
+    results = compact["results"]
+    columns = results["columns"]
+
+    def interned(indices, values):
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(values, pa.string()))
+
+    arrays = {}
+    if "document" in columns:
+        arrays["document"] = interned(
+            columns["document"],
+            [document.get("filename") or document.get("document_id") for document in compact["documents"]],
+        )
+    arrays["model_name"] = interned(columns["model"], results["models"])
+    arrays["question"] = interned(columns["question"], [entry["question"] for entry in results["questions"]])
+    arrays["expected_answer"] = interned(columns["question"], [entry["expected_answer"] for entry in results["questions"]])
+    arrays["actual_answer"] = interned(columns["answer"], results["answers"])
+    arrays["latency_ms"] = pa.array(columns["latency_ms"], pa.float64())
+    arrays["is_correct"] = pa.array(columns["is_correct"], pa.bool_())
+    if "latency_samples_ms" in columns:
+        arrays["latency_samples_ms"] = pa.array(columns["latency_samples_ms"], pa.list_(pa.float64()))
+    for stage, values in (columns.get("stage_timings_ms") or {}).items():
+        arrays[f"stage_{stage}_ms"] = pa.array(values, pa.float64())
+    if "details" in columns:
+        arrays["details"] = pa.array(
+            [json.dumps(value, ensure_ascii=False) if value is not None else None for value in columns["details"]],
+            pa.string(),
+        )
+
+    summary = {key: value for key, value in compact.items() if key != "results"}
+    return pa.table(arrays).replace_schema_metadata({"report": json.dumps(summary, ensure_ascii=False)})
+
+
+def export_results(compact: Dict[str, Any], export_format: str) -> bytes:
+    """Relatório compacto como stream Arrow IPC (`arrow`) ou arquivo Parquet (`parquet`)."""
+    import pyarrow as pa
+
+    table = results_table(compact)
+    buffer = io.BytesIO()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, buffer, compression="zstd")
+    elif export_format == "arrow":
+        with pa.ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {export_format}")
+    return buffer.getvalue()
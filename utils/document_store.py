@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+_DOC_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass
+class StoredDocument:
+    document_id: str  # SHA-256 do conteúdo
+    path: str
+    filename: str
+    size_bytes: int
+    created_at: float
+    last_access: float
+
+
+class DocumentStore:
+    """
+    Armazenamento de PDFs endereçado pelo conteúdo (SHA-256).
+    Uploads são gravados em disco em blocos enquanto o hash é calculado, então a memória
+    fica estável mesmo para arquivos grandes. Quando o total passa de `max_bytes`, os documentos
+    usados há mais tempo são removidos (exceto os que estão em uso por algum teste).
+    """
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._documents: Dict[str, StoredDocument] = {}
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    # --- Índice ---
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def _load_index(self) -> None:
+        saved = {}
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Aviso: Índice do armazenamento de documentos ilegível, reconstruindo: {e}")
+
+        # O diretório é a fonte da verdade; o índice só guarda nome original e último acesso
+        for name in os.listdir(self.root):
+            document_id, ext = os.path.splitext(name)
+            if ext != ".pdf" or not _DOC_ID_RE.match(document_id):
+                continue
+            path = os.path.join(self.root, name)
+            stat = os.stat(path)
+            meta = saved.get(document_id, {})
+            self._documents[document_id] = StoredDocument(
+                document_id=document_id,
+                path=path,
+                filename=meta.get("filename", name),
+                size_bytes=stat.st_size,
+                created_at=meta.get("created_at", stat.st_mtime),
+                last_access=meta.get("last_access", stat.st_mtime),
+            )
+
+    def _save_index(self) -> None:
+        data = {
+            document_id: {k: v for k, v in asdict(doc).items() if k in ("filename", "created_at", "last_access")}
+            for document_id, doc in self._documents.items()
+        }
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._index_path)
+
+    # --- Operações ---
+
+    async def save_upload(self, upload, chunk_size: int = 1024 * 1024, pin: bool = False):
+        """
+        Grava um UploadFile em disco em blocos, calculando o hash ao mesmo tempo.
+        Retorna (StoredDocument, já_existia). Com `pin=True` o documento já volta protegido
+        contra remoção (libere com `unpin`).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await upload.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            return self._commit(tmp_path, digest.hexdigest(), size, upload.filename or "documento.pdf", pin)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _commit(self, tmp_path: str, document_id: str, size: int, filename: str, pin: bool):
+        now = time.time()
+        with self._lock:
+            if pin:
+                self._pins[document_id] = self._pins.get(document_id, 0) + 1
+            existing = self._documents.get(document_id)
+            if existing is not None:
+                existing.last_access = now
+                return existing, True
+
+            path = os.path.join(self.root, f"{document_id}.pdf")
+            os.replace(tmp_path, path)
+            document = StoredDocument(
+                document_id=document_id, path=path, filename=filename,
+                size_bytes=size, created_at=now, last_access=now,
+            )
+            self._documents[document_id] = document
+            self._evict(keep=document_id)
+            self._save_index()
+            return document, False
+
+    def get(self, document_id: str, pin: bool = False) -> Optional[StoredDocument]:
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is not None:
+                document.last_access = time.time()
+                if pin:
+                    self._pins[document_id] = self._pins.get(document_id, 0) + 1
+            return document
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is None or self._pins.get(document_id):
+                return False
+            self._remove(document)
+            self._save_index()
+            return True
+
+    def unpin(self, document_id: str) -> None:
+        with self._lock:
+            remaining = self._pins.get(document_id, 0) - 1
+            if remaining > 0:
+                self._pins[document_id] = remaining
+            else:
+                self._pins.pop(document_id, None)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(doc.size_bytes for doc in self._documents.values())
+
+    def _remove(self, document: StoredDocument) -> None:
+        del self._documents[document.document_id]
+        try:
+            os.unlink(document.path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        total = self.total_bytes
+        for document in sorted(self._documents.values(), key=lambda doc: doc.last_access):
+            if total <= self.max_bytes:
+                break
+            if document.document_id == keep or self._pins.get(document.document_id):
+                continue
+            total -= document.size_bytes
+            self._remove(document)
+
+
+_document_store: Optional[DocumentStore] = None
+_document_store_lock = threading.Lock()
+
+
+def get_document_store() -> DocumentStore:
+    """
+    Retorna o armazenamento de documentos do processo. Variáveis de ambiente:
+    DOCUMENT_STORE_DIR: diretório dos PDFs (padrão: .cache/documents)
+    DOCUMENT_STORE_MAX_MB: tamanho máximo antes de remover os documentos menos usados
+    """
+    global _document_store
+    with _document_store_lock:
+        if _document_store is None:
+            _document_store = DocumentStore(
+                root=os.getenv("DOCUMENT_STORE_DIR", ".cache/documents"),
+                max_bytes=int(os.getenv("DOCUMENT_STORE_MAX_MB", "2048")) * 1024 * 1024,
+            )
+        return _document_store
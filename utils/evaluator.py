@@ -0,0 +1,371 @@
+import math
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .retrieval import strip_accents, tokenize
+
+# (pergunta, resposta esperada, resposta obtida)
+Triple = Tuple[str, str, str]
+# Fato extraído de um texto: (tipo, valor normalizado)
+Fact = Tuple[str, object]
+
+_NUMERAL_WORDS = {
+    "zero": 0, "um": 1, "uma": 1, "dois": 2, "duas": 2, "tres": 3, "quatro": 4, "cinco": 5, "seis": 6,
+    "sete": 7, "oito": 8, "nove": 9, "dez": 10, "onze": 11, "doze": 12, "treze": 13, "catorze": 14,
+    "quatorze": 14, "quinze": 15, "dezesseis": 16, "dezessete": 17, "dezoito": 18, "dezenove": 19,
+    "vinte": 20, "trinta": 30, "quarenta": 40, "cinquenta": 50, "sessenta": 60, "setenta": 70,
+    "oitenta": 80, "noventa": 90, "cem": 100, "cento": 100, "duzentos": 200, "duzentas": 200,
+    "trezentos": 300, "trezentas": 300, "quatrocentos": 400, "quatrocentas": 400, "quinhentos": 500,
+    "quinhentas": 500, "seiscentos": 600, "seiscentas": 600, "setecentos": 700, "setecentas": 700,
+    "oitocentos": 800, "oitocentas": 800, "novecentos": 900, "novecentas": 900,
+}
+_MULTIPLIERS = {"mil": 1e3, "milhao": 1e6, "milhoes": 1e6, "mi": 1e6, "bilhao": 1e9, "bilhoes": 1e9, "bi": 1e9}
+_DURATION_DAYS = {
+    "ano": 365, "anos": 365, "mes": 365 / 12, "meses": 365 / 12, "semana": 7, "semanas": 7,
+    "dia": 1, "dias": 1, "hora": 1 / 24, "horas": 1 / 24,
+}
+# Tolerância relativa na comparação de valores ("1 ano" ~ "12 meses" ~ "365 dias")
+_TOLERANCE = {"duration_days": 0.02}
+_MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6, "julho": 7,
+    "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+_NUMBER = r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?"
+# Numeral por extenso, simples ou composto ("dez", "mil e quinhentos", "cento e vinte")
+_NUMERAL_WORD = rf"(?:{'|'.join(sorted([*_NUMERAL_WORDS, 'mil'], key=len, reverse=True))})\b"
+_NUMERAL = rf"{_NUMERAL_WORD}(?:\s+(?:e\s+)?{_NUMERAL_WORD})*"
+_QUANTITY = rf"(?:{_NUMBER}|{_NUMERAL})"
+_MULTIPLIER = rf"(?:\s*(?:{'|'.join(sorted(_MULTIPLIERS, key=len, reverse=True))})\b)?"
+
+_ID_RE = re.compile(r"\d[\d./-]{6,}\d")
+# Versões ("versão 1.2", "v2.0.1", "1.2.3"): identificadores, não números
+_VERSION_RE = re.compile(r"\b(?:versao|v)\s*(\d+(?:\.\d+)+)\b|\b(\d+(?:\.\d+){2,})\b")
+_THOUSANDS_RE = re.compile(r"\d{1,3}(?:\.\d{3})+")
+# Palavras que invertem o sentido da resposta ("não em São Paulo")
+_NEGATIONS = {"nao", "nunca", "nem", "nenhum", "nenhuma", "jamais"}
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+_DATE_NUMERIC_RE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b|\b(\d{4})-(\d{2})-(\d{2})\b")
+_DATE_TEXT_RE = re.compile(rf"\b(\d{{1,2}}) de ({'|'.join(_MONTHS)})(?: de (\d{{4}}))?\b")
+_MONEY_RE = re.compile(
+    rf"(?:r\$|us\$|\$|€)\s*({_QUANTITY}){_MULTIPLIER}|\b({_QUANTITY}){_MULTIPLIER}\s*(?:reais|real|dolares|euros)\b"
+)
+_PERCENT_RE = re.compile(rf"\b({_QUANTITY})\s*(?:%|por cento\b)")
+_DURATION_RE = re.compile(rf"\b({_QUANTITY})\s*({'|'.join(sorted(_DURATION_DAYS, key=len, reverse=True))})\b")
+_PLAIN_NUMBER_RE = re.compile(rf"\b({_NUMBER}){_MULTIPLIER}")
+
+
+def normalize_answer(text: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços normalizados."""
+    return re.sub(r"\s+", " ", strip_accents((text or "").lower())).strip()
+
+
+def parse_number(raw: str) -> float:
+    """Número no formato brasileiro ("1.500,00", "2,5") ou simples ("1500", "2.5"); aceita numerais por extenso."""
+    raw = raw.strip()
+    if re.fullmatch(_NUMERAL, raw):
+        return float(_parse_numeral(raw))
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?", raw):
+        return float(raw.replace(".", "").replace(",", "."))
+    return float(raw.replace(",", "."))
+
+
+def _parse_numeral(raw: str) -> int:
+    """Valor de um numeral por extenso: "mil e quinhentos" = 1500, "dois mil e trezentos" = 2300."""
+    total, current = 0, 0
+    for word in raw.split():
+        if word == "e":
+            continue
+        if word == "mil":
+            total += (current or 1) * 1000
+            current = 0
+        else:
+            current += _NUMERAL_WORDS[word]
+    return total + current
+
+
+def _with_multiplier(match, group: int, value: float) -> float:
+    """Aplica o multiplicador ("16 milhões") que vem logo depois do número do grupo `group`."""
+    words = re.findall(r"[a-z]+", match.string[match.end(group):match.end()])
+    for word in words:
+        if word in _MULTIPLIERS:
+            return value * _MULTIPLIERS[word]
+    return value
+
+
+def _extract(text: Optional[str]) -> Tuple[Set[Fact], str]:
+    """Fatos do texto e o que sobra dele depois de removidos os trechos reconhecidos."""
+    text = normalize_answer(text)
+    facts: Set[Fact] = set()
+
+    def consume(pattern, handler):
+        nonlocal text
+        def replace(match):
+            fact = handler(match)
+            if fact is None:
+                return match.group(0)
+            facts.add(fact)
+            return " "
+        text = pattern.sub(replace, text)
+
+    def identifier(match):
+        raw = match.group(0)
+        digits = re.sub(r"\D", "", raw)
+        # CNPJ, CPF e códigos: pontuação de documento ou sequências longas; datas e valores ficam para depois
+        if len(digits) >= 11 or (len(digits) >= 9 and re.search(r"[/-]", raw)):
+            return ("id", digits)
+        return None
+
+    def version(match):
+        raw = match.group(1) or match.group(2)
+        # "1.500.000" é um número com separador de milhar, não uma versão
+        if match.group(2) and _THOUSANDS_RE.fullmatch(raw):
+            return None
+        return ("id", f"v{raw}")
+
+    def numeric_date(match):
+        if match.group(4):
+            year, month, day = int(match.group(4)), int(match.group(5)), int(match.group(6))
+        else:
+            day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+            year += 2000 if year < 100 else 0
+        return ("date", (year, month, day)) if 1 <= month <= 12 and 1 <= day <= 31 else None
+
+    def text_date(match):
+        year = int(match.group(3)) if match.group(3) else None
+        return ("date", (year, _MONTHS[match.group(2)], int(match.group(1))))
+
+    def money(match):
+        group = 1 if match.group(1) else 2
+        return ("money", round(_with_multiplier(match, group, parse_number(match.group(group))), 2))
+
+    consume(_VERSION_RE, version)
+    consume(_ID_RE, identifier)
+    consume(_DATE_NUMERIC_RE, numeric_date)
+    consume(_DATE_TEXT_RE, text_date)
+    consume(_MONEY_RE, money)
+    consume(_PERCENT_RE, lambda m: ("percent", round(parse_number(m.group(1)), 4)))
+    consume(_DURATION_RE, lambda m: ("duration_days", round(parse_number(m.group(1)) * _DURATION_DAYS[m.group(2)], 4)))
+    consume(_PLAIN_NUMBER_RE, lambda m: ("number", round(_with_multiplier(m, 1, parse_number(m.group(1))), 4)))
+    return facts, text
+
+
+def extract_facts(text: Optional[str]) -> Set[Fact]:
+    """
+    Extrai os fatos objetivos de uma resposta: identificadores (CNPJ, códigos), datas, valores
+    monetários, percentuais, durações ("1 ano" = "12 meses") e números ("16 milhões").
+    Cada trecho reconhecido é removido antes do próximo tipo, para não ser contado duas vezes.
+    """
+    return _extract(text)[0]
+
+
+def _fact_matches(expected: Fact, actual_facts: Set[Fact]) -> bool:
+    kind, value = expected
+    for actual_kind, actual_value in actual_facts:
+        if actual_kind != kind:
+            continue
+        if kind == "date":
+            # Data sem ano no gabarito (ou na resposta) casa com qualquer ano
+            if actual_value[1:] == value[1:] and (value[0] is None or actual_value[0] in (None, value[0])):
+                return True
+        elif math.isclose(actual_value, value, rel_tol=_TOLERANCE.get(kind, 1e-6)) if kind != "id" else actual_value == value:
+            return True
+    return False
+
+
+def fact_scores(expected_answers: Sequence[str],
+                actual_answers: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Para cada item: fração dos fatos do gabarito presentes na resposta (NaN se o gabarito não tem fatos),
+    se há conflito (nenhum fato do gabarito encontrado, mas a resposta traz fatos do mesmo tipo),
+    se o gabarito é só fatos (ex: "R$ 1.500,00"), sem texto além deles, e se a resposta traz fatos
+    a mais do mesmo tipo (ex: "o item 5 é a roda; o item 3 é o motor" para um gabarito "5").
+    """
+    scores = np.full(len(expected_answers), np.nan)
+    conflicts = np.zeros(len(expected_answers), dtype=bool)
+    facts_only = np.zeros(len(expected_answers), dtype=bool)
+    extra_facts = np.zeros(len(expected_answers), dtype=bool)
+    for i, (expected, actual) in enumerate(zip(expected_answers, actual_answers)):
+        expected_facts, residual = _extract(expected)
+        if not expected_facts:
+            continue
+        facts_only[i] = not tokenize(_NON_WORD_RE.sub(" ", residual))
+        actual_facts = extract_facts(actual)
+        matched = sum(_fact_matches(fact, actual_facts) for fact in expected_facts)
+        scores[i] = matched / len(expected_facts)
+        expected_kinds = {kind for kind, _ in expected_facts}
+        conflicts[i] = matched == 0 and any(kind in expected_kinds for kind, _ in actual_facts)
+        extra_facts[i] = any(
+            fact[0] in expected_kinds and not _fact_matches(fact, expected_facts) for fact in actual_facts
+        )
+    return scores, conflicts, facts_only, extra_facts
+
+
+def _hash_features(features: Sequence[str], buckets: int) -> np.ndarray:
+    return np.fromiter((zlib.crc32(f.encode("utf-8")) % buckets for f in features), dtype=np.int64, count=len(features))
+
+
+def _feature_matrix(texts: Sequence[List[str]], buckets: int, dtype) -> np.ndarray:
+    """Contagem de features (tokens ou trigramas) por texto, com o truque do hashing em `buckets` colunas."""
+    matrix = np.zeros((len(texts), buckets), dtype=dtype)
+    for row, features in enumerate(texts):
+        if features:
+            np.add.at(matrix[row], _hash_features(features, buckets), 1)
+    return matrix
+
+
+def _trigrams(text: str) -> List[str]:
+    padded = f" {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def containment_scores(expected_answers: Sequence[str], actual_answers: Sequence[str],
+                       buckets: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pontuações vetorizadas (NumPy) de todo o lote de uma vez:
+    - token_recall: fração dos termos do gabarito presentes na resposta
+    - fuzzy: fração dos trigramas de caracteres do gabarito presentes na resposta
+      (tolera erros de OCR, plurais e pequenas variações de grafia)
+    Ambas medem o quanto do gabarito está contido na resposta, que pode ser mais longa.
+    """
+    expected_tokens = [tokenize(text or "") for text in expected_answers]
+    actual_tokens = [tokenize(text or "") for text in actual_answers]
+    expected_bin = _feature_matrix(expected_tokens, buckets, np.uint16) > 0
+    actual_bin = _feature_matrix(actual_tokens, buckets, np.uint16) > 0
+    expected_terms = expected_bin.sum(axis=1)
+    token_recall = np.where(
+        expected_terms > 0, (expected_bin & actual_bin).sum(axis=1) / np.maximum(expected_terms, 1), np.nan
+    )
+
+    expected_grams = _feature_matrix([_trigrams(normalize_answer(t)) for t in expected_answers], buckets, np.uint16)
+    actual_grams = _feature_matrix([_trigrams(normalize_answer(t)) for t in actual_answers], buckets, np.uint16)
+    total_grams = expected_grams.sum(axis=1)
+    fuzzy = np.minimum(expected_grams, actual_grams).sum(axis=1) / np.maximum(total_grams, 1)
+    return token_recall, fuzzy
+
+
+def verbosity_flags(expected_answers: Sequence[str], actual_answers: Sequence[str],
+                    max_length_ratio: float = 3.0, length_slack: int = 4) -> np.ndarray:
+    """
+    Respostas que a contenção do gabarito não basta para aceitar, porque a precisão não é medida:
+    - muito mais longas que o gabarito (mais de `max_length_ratio` × as palavras dele + `length_slack`),
+      como os trechos do BM25 devolvidos pelos modelos locais, que quase sempre contêm os termos certos
+    - com negação ausente do gabarito ("no Rio de Janeiro, não em São Paulo")
+    """
+    flags = np.zeros(len(expected_answers), dtype=bool)
+    for i, (expected, actual) in enumerate(zip(expected_answers, actual_answers)):
+        expected_words = _NON_WORD_RE.sub(" ", normalize_answer(expected)).split()
+        actual_words = _NON_WORD_RE.sub(" ", normalize_answer(actual)).split()
+        too_long = len(actual_words) > max_length_ratio * len(expected_words) + length_slack
+        negated = bool(_NEGATIONS.intersection(actual_words) - set(expected_words))
+        flags[i] = too_long or negated
+    return flags
+
+
+@dataclass
+class LocalVerdict:
+    score: float
+    # True/False quando a pontuação é conclusiva; None na faixa incerta (vai para o juiz)
+    decision: Optional[bool]
+
+
+class LocalEvaluator:
+    """
+    Avaliador local em camadas, sem chamadas à API:
+    1. normalização (acentos, caixa, espaços)
+    2. sobreposição de termos e similaridade por trigramas (vetorizadas sobre o lote inteiro)
+    3. extração de fatos (valores em R$, datas, durações, percentuais, números, identificadores)
+
+    A pontuação combinada decide os casos claros: >= `accept_threshold` está correto e,
+    quando um fato da resposta contradiz o gabarito (ex: "2 anos" para "1 ano"), <= `reject_threshold`
+    está errado. Pontuações baixas sem contradição (ex: o fato escrito de um jeito que a extração não
+    reconhece) e a faixa intermediária vão para o juiz de IA.
+    A pontuação mede o quanto do gabarito está na resposta, não o que ela tem a mais: respostas
+    longas demais, com negação ou com fatos a mais do mesmo tipo nunca são aceitas localmente
+    (vão para o juiz), veja `verbosity_flags`.
+    """
+    def __init__(self, accept_threshold: float = 0.8, reject_threshold: float = 0.1, buckets: int = 4096,
+                 max_length_ratio: float = 3.0):
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.buckets = buckets
+        self.max_length_ratio = max_length_ratio
+
+    def score_batch(self, triples: Sequence[Triple]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pontuação de cada item e se ele pode ser aceito e rejeitado sem o juiz."""
+        expected = [expected_answer or "" for _, expected_answer, _ in triples]
+        actual = [actual_answer or "" for _, _, actual_answer in triples]
+        if not triples:
+            return np.zeros(0), np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+
+        token_recall, fuzzy = containment_scores(expected, actual, self.buckets)
+        facts, conflicts, facts_only, extra_facts = fact_scores(expected, actual)
+        acceptable = ~(verbosity_flags(expected, actual, self.max_length_ratio) | extra_facts)
+
+        # Gabarito só com stopwords/símbolos: fica apenas a similaridade por trigramas
+        lexical = np.where(np.isnan(token_recall), fuzzy, 0.5 * token_recall + 0.5 * fuzzy)
+        # Com fatos no gabarito (ex: "R$ 1.500,00", "1 ano"), eles dominam a pontuação
+        with_facts = np.where(facts_only, facts, 0.6 * facts + 0.4 * lexical)
+        scores = np.where(np.isnan(facts), lexical, with_facts)
+        # Fatos divergentes (ex: "2 anos" para um gabarito de "1 ano") derrubam a pontuação
+        scores = np.where(conflicts, np.minimum(scores, self.reject_threshold), scores)
+        # Só uma contradição é rejeitada sem o juiz
+        return np.clip(scores, 0.0, 1.0), acceptable, conflicts
+
+    def evaluate_batch(self, triples: Sequence[Triple]) -> List[LocalVerdict]:
+        scores, acceptable, rejectable = self.score_batch(triples)
+        accepted = (scores >= self.accept_threshold) & acceptable
+        rejected = (scores <= self.reject_threshold) & rejectable
+        decisions = np.where(accepted, 1, np.where(rejected, 0, -1))
+        return [
+            LocalVerdict(score=float(score), decision=None if decision < 0 else bool(decision))
+            for score, decision in zip(scores, decisions)
+        ]
+
+
+class AgreementStats:
+    """
+    Concordância entre o avaliador local e o juiz de IA:
+    - decisões locais auditadas (amostra enviada também ao juiz, ver `audit_rate`)
+    - faixa incerta: se a "tendência" local (pontuação >= 0,5) bate com o veredicto do juiz
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {
+            "local_accepted": 0, "local_rejected": 0, "uncertain": 0, "uncertain_lean_agreements": 0,
+            "audited": 0, "audit_agreements": 0,
+        }
+
+    def record_local(self, decision: bool) -> None:
+        with self._lock:
+            self.counts["local_accepted" if decision else "local_rejected"] += 1
+
+    def record_judged(self, local: LocalVerdict, judge_verdict: bool) -> None:
+        """Registra o veredicto do juiz (da API ou do cache) para um item já pontuado localmente."""
+        with self._lock:
+            if local.decision is None:
+                self.counts["uncertain"] += 1
+                self.counts["uncertain_lean_agreements"] += int((local.score >= 0.5) == judge_verdict)
+            else:
+                self.counts["audited"] += 1
+                self.counts["audit_agreements"] += int(local.decision == judge_verdict)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = dict(self.counts)
+        decided = counts["local_accepted"] + counts["local_rejected"]
+        total = decided + counts["uncertain"]
+        return {
+            **counts,
+            "local_decision_rate": decided / total if total else None,
+            "audit_agreement_rate": counts["audit_agreements"] / counts["audited"] if counts["audited"] else None,
+            "uncertain_lean_agreement_rate": (
+                counts["uncertain_lean_agreements"] / counts["uncertain"] if counts["uncertain"] else None
+            ),
+        }
+
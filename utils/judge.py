@@ -0,0 +1,376 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .evaluator import AgreementStats, LocalEvaluator, LocalVerdict
+from .metrics import REGISTRY, Counter
+from .openai_dispatcher import Priority, get_openai_dispatcher
+
+# (pergunta, resposta esperada, resposta obtida)
+JudgeTriple = Tuple[str, str, str]
+
+VERDICTS_TOTAL = REGISTRY.register(Counter(
+    "judge_verdicts_total",
+    "Veredictos emitidos, por origem (local, cache, api, fallback).",
+    ("source",),
+))
+
+# Incremente quando os prompts mudarem, para não reaproveitar veredictos antigos
+JUDGE_PROMPT_VERSION = 1
+
+SINGLE_PROMPT = """
+Você é um juiz de IA avaliando a qualidade da resposta de outro modelo.
+Sua tarefa é determinar se a "Resposta Obtida" é uma resposta semanticamente correta para a "Pergunta", comparando-a com a "Resposta Esperada" (gabarito).
+
+A "Resposta Obtida" não precisa ser idêntica à "Resposta Esperada". Ela pode ser um resumo, uma parafrase, ou conter informações adicionais, desde que o cerne da resposta esteja correto.
+
+Pergunta: "{question}"
+Resposta Esperada (Gabarito): "{expected_answer}"
+Resposta Obtida (para ser avaliada): "{actual_answer}"
+
+A "Resposta Obtida" está correta? Responda apenas com a palavra "Sim" ou "Não".
+"""
+
+BATCH_PROMPT = """
+Você é um juiz de IA avaliando a qualidade das respostas de outro modelo.
+Para cada item abaixo, determine se a "Resposta Obtida" é uma resposta semanticamente correta para a "Pergunta", comparando-a com a "Resposta Esperada" (gabarito).
+
+A "Resposta Obtida" não precisa ser idêntica à "Resposta Esperada". Ela pode ser um resumo, uma parafrase, ou conter informações adicionais, desde que o cerne da resposta esteja correto.
+
+Avalie cada item de forma independente e retorne um veredicto para cada "id".
+
+{items}
+"""
+
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "veredictos",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "verdicts": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "correct": {"type": "boolean"},
+                        },
+                        "required": ["id", "correct"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["verdicts"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Normaliza unicode, caixa e espaços para que variações triviais gerem a mesma chave de cache."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class VerdictCache:
+    """
+    Cache persistente (SQLite) de veredictos do juiz, indexado por um hash normalizado
+    de (modelo do juiz, pergunta, resposta esperada, resposta obtida).
+    """
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, is_correct INTEGER NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(judge_model: str, question: str, expected_answer: str, actual_answer: str) -> str:
+        payload = json.dumps([
+            JUDGE_PROMPT_VERSION,
+            judge_model,
+            normalize_text(question),
+            normalize_text(expected_answer),
+            normalize_text(actual_answer),
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bool]:
+        with self._lock:
+            row = self._conn.execute("SELECT is_correct FROM verdicts WHERE key = ?", (key,)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def put(self, key: str, is_correct: bool) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, is_correct) VALUES (?, ?)", (key, int(is_correct))
+            )
+
+
+class AIJudge:
+    """
+    "IA como Juiz": avalia semanticamente se as respostas obtidas estão corretas.
+
+    - O avaliador local (utils.evaluator) resolve os casos claros sem chamar a API;
+      sem ele, só a verificação simples de respostas curtas
+    - Veredictos já conhecidos vêm do cache persistente
+    - O restante é avaliado em lotes, com vários itens em uma única requisição (structured output)
+
+    `audit_rate` envia também ao juiz uma amostra das decisões locais, para medir a concordância
+    (ver `agreement`).
+    """
+    def __init__(self, judge_model: str = "gpt-4o", cache: Optional[VerdictCache] = None,
+                 max_batch_size: int = 10, max_batch_chars: int = 60000,
+                 evaluator: Optional[LocalEvaluator] = None, audit_rate: float = 0.0):
+        self.judge_model = judge_model  # Poderia ser um modelo mais barato como gpt-4o-mini
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+        self.evaluator = evaluator
+        self.audit_rate = audit_rate
+        self.agreement = AgreementStats()
+
+    def _quick_verdict(self, expected_answer: str, actual_answer: str) -> Optional[bool]:
+        if not actual_answer or "erro" in actual_answer.lower():
+            return False
+
+        # Para respostas curtas, uma verificação simples pode ser suficiente e mais barata
+        # (com o avaliador local, a pontuação dele cobre esse caso)
+        if self.evaluator is None and len(expected_answer or "") < 20 \
+                and (expected_answer or "").lower() in actual_answer.lower():
+            return True
+        return None
+
+    @staticmethod
+    def _fallback_verdict(expected_answer: str, actual_answer: str, local: Optional[LocalVerdict]) -> bool:
+        # Em caso de falha do juiz, recorre à pontuação local ou à verificação simples
+        if local is not None:
+            return local.score >= 0.5
+        return (expected_answer or "").lower() in (actual_answer or "").lower()
+
+    def evaluate(self, question: str, expected_answer: str, actual_answer: str) -> bool:
+        """Avalia um único item."""
+        return self.evaluate_batch([(question, expected_answer, actual_answer)])[0]
+
+    def evaluate_batch(self, triples: Sequence[JudgeTriple]) -> List[bool]:
+        """Avalia vários itens, fazendo o mínimo possível de chamadas à API."""
+        verdicts: List[Optional[bool]] = [None] * len(triples)
+        keys: List[Optional[str]] = [None] * len(triples)
+        pending = []
+
+        # Todo o lote é pontuado localmente de uma vez (vetorizado)
+        local: List[Optional[LocalVerdict]] = [None] * len(triples)
+        if self.evaluator is not None and triples:
+            local = self.evaluator.evaluate_batch(triples)
+
+        def resolve(i: int, judge_verdict: bool, source: str) -> None:
+            if local[i] is not None:
+                self.agreement.record_judged(local[i], judge_verdict)
+            if verdicts[i] is None:
+                VERDICTS_TOTAL.inc(source=source)
+                verdicts[i] = judge_verdict
+
+        for i, (question, expected_answer, actual_answer) in enumerate(triples):
+            verdicts[i] = self._quick_verdict(expected_answer, actual_answer)
+            if verdicts[i] is not None:
+                VERDICTS_TOTAL.inc(source="local")
+                continue
+            if local[i] is not None and local[i].decision is not None:
+                verdicts[i] = local[i].decision
+                VERDICTS_TOTAL.inc(source="local")
+                self.agreement.record_local(local[i].decision)
+                # Decisão local mantida; a amostra auditada só alimenta a concordância
+                if not (self.audit_rate > 0 and random.random() < self.audit_rate):
+                    continue
+            if self.cache is not None:
+                keys[i] = VerdictCache.make_key(self.judge_model, question, expected_answer, actual_answer)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    resolve(i, cached, "cache")
+                    continue
+            pending.append(i)
+
+        for chunk in self._chunks(pending, triples):
+            judged = self._judge_remote_batch([triples[i] for i in chunk]) if len(chunk) > 1 else {}
+            for position, i in enumerate(chunk):
+                verdict = judged.get(position)
+                if verdict is None:
+                    # Item único, ou ausente/inválido na resposta em lote: avalia individualmente
+                    verdict = self._judge_remote_single(*triples[i])
+                if verdict is None:
+                    if verdicts[i] is None:
+                        VERDICTS_TOTAL.inc(source="fallback")
+                        verdicts[i] = self._fallback_verdict(triples[i][1], triples[i][2], local[i])
+                    continue
+                resolve(i, verdict, "api")
+                if self.cache is not None:
+                    self.cache.put(keys[i], verdict)
+
+        return [bool(v) for v in verdicts]
+
+    def stats(self) -> Dict[str, object]:
+        """Limiares do avaliador local e a concordância dele com o juiz."""
+        return {
+            "judge_model": self.judge_model,
+            "local_evaluator": self.evaluator is not None,
+            "accept_threshold": self.evaluator.accept_threshold if self.evaluator else None,
+            "reject_threshold": self.evaluator.reject_threshold if self.evaluator else None,
+            "audit_rate": self.audit_rate,
+            "agreement": self.agreement.snapshot(),
+        }
+
+    def _chunks(self, indexes: List[int], triples: Sequence[JudgeTriple]):
+        """Divide os itens pendentes em lotes limitados por quantidade e por tamanho do prompt."""
+        chunk, chunk_chars = [], 0
+        for i in indexes:
+            item_chars = sum(len(part or "") for part in triples[i])
+            if chunk and (len(chunk) >= self.max_batch_size or chunk_chars + item_chars > self.max_batch_chars):
+                yield chunk
+                chunk, chunk_chars = [], 0
+            chunk.append(i)
+            chunk_chars += item_chars
+        if chunk:
+            yield chunk
+
+    def _judge_remote_batch(self, triples: Sequence[JudgeTriple]) -> dict:
+        """Retorna {posição no lote: veredicto}; itens que não puderem ser lidos ficam de fora."""
+        items = "\n\n".join(
+            f'id: {position}\nPergunta: "{question}"\nResposta Esperada (Gabarito): "{expected_answer}"\n'
+            f'Resposta Obtida (para ser avaliada): "{actual_answer}"'
+            for position, (question, expected_answer, actual_answer) in enumerate(triples)
+        )
+        try:
+            response = get_openai_dispatcher().chat_completion(
+                priority=Priority.JUDGE,
+                model=self.judge_model,
+                messages=[{"role": "user", "content": BATCH_PROMPT.format(items=items)}],
+                response_format=BATCH_RESPONSE_FORMAT,
+                max_tokens=30 * len(triples) + 50,
+                temperature=0.0,
+            )
+            parsed = json.loads(response.choices[0].message.content)
+            return {
+                int(v["id"]): bool(v["correct"])
+                for v in parsed.get("verdicts", [])
+                if isinstance(v.get("correct"), bool) and 0 <= int(v["id"]) < len(triples)
+            }
+        except Exception as e:
+            print(f"Aviso: Falha na avaliação em lote do juiz, avaliando item a item: {e}")
+            return {}
+
+    def _judge_remote_single(self, question: str, expected_answer: str, actual_answer: str) -> Optional[bool]:
+        prompt = SINGLE_PROMPT.format(
+            question=question, expected_answer=expected_answer, actual_answer=actual_answer
+        )
+        try:
+            response = get_openai_dispatcher().chat_completion(
+                priority=Priority.JUDGE,
+                model=self.judge_model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=5,
+                temperature=0.0,
+            )
+            decision = response.choices[0].message.content.strip().lower()
+            return "sim" in decision
+        except Exception:
+            return None
+
+
+class StubJudge(AIJudge):
+    """
+    Juiz simulado para testes de carga: o mesmo fluxo do AIJudge (avaliador local, cache, lotes,
+    tentativas individuais e fallback), mas as chamadas "remotas" só esperam `latency_ms` e sorteiam
+    o veredicto (acerto com probabilidade `accuracy`) e as falhas (`failure_rate`) a partir do
+    conteúdo: a mesma carga gera sempre os mesmos veredictos, sem chave da OpenAI.
+    """
+    def __init__(self, latency_ms: float = 50.0, failure_rate: float = 0.0, accuracy: float = 0.8,
+                 seed: int = 0, **kwargs):
+        kwargs.setdefault("judge_model", "stub")
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.accuracy = accuracy
+        self.seed = seed
+
+    def _rng(self, *parts) -> random.Random:
+        digest = hashlib.sha256(json.dumps([self.seed, *parts]).encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _verdict(self, triple: JudgeTriple) -> bool:
+        return self._rng("verdict", *triple).random() < self.accuracy
+
+    def _judge_remote_batch(self, triples: Sequence[JudgeTriple]) -> dict:
+        time.sleep(self.latency_ms / 1000)
+        if self._rng("batch", *[part for triple in triples for part in triple]).random() < self.failure_rate:
+            print("Aviso: Falha simulada na avaliação em lote do juiz, avaliando item a item")
+            return {}
+        return {position: self._verdict(triple) for position, triple in enumerate(triples)}
+
+    def _judge_remote_single(self, question: str, expected_answer: str, actual_answer: str) -> Optional[bool]:
+        time.sleep(self.latency_ms / 1000)
+        triple = (question, expected_answer, actual_answer)
+        if self._rng("single", *triple).random() < self.failure_rate:
+            return None
+        return self._verdict(triple)
+
+
+_judge: Optional[AIJudge] = None
+_judge_lock = threading.Lock()
+
+
+def get_judge() -> AIJudge:
+    """
+    Retorna o juiz compartilhado do processo. Variáveis de ambiente:
+    JUDGE_MODEL: modelo usado como juiz (padrão: gpt-4o)
+    JUDGE_CACHE_PATH: arquivo SQLite do cache de veredictos (vazio desativa o cache)
+    JUDGE_BATCH_SIZE: máximo de itens por requisição ao juiz
+    EVALUATOR_ENABLED: usa o avaliador local antes do juiz (padrão: 1)
+    EVALUATOR_ACCEPT_THRESHOLD / EVALUATOR_REJECT_THRESHOLD: limites da pontuação local (padrão: 0.8 / 0.1)
+    EVALUATOR_MAX_LENGTH_RATIO: respostas mais longas que isso × o gabarito vão para o juiz (padrão: 3)
+    EVALUATOR_AUDIT_RATE: fração das decisões locais também enviada ao juiz (padrão: 0)
+    JUDGE_BACKEND: "openai" (padrão) ou "stub", o juiz simulado dos testes de carga (ver StubJudge)
+    JUDGE_STUB_LATENCY_MS / JUDGE_STUB_FAILURE_RATE / JUDGE_STUB_ACCURACY: parâmetros do juiz simulado
+        (padrão: 50 / 0 / 0.8)
+    """
+    global _judge
+    with _judge_lock:
+        if _judge is None:
+            cache_path = os.getenv("JUDGE_CACHE_PATH", ".cache/judge_verdicts.sqlite3")
+            evaluator = None
+            if os.getenv("EVALUATOR_ENABLED", "1").lower() not in ("0", "false", "no"):
+                evaluator = LocalEvaluator(
+                    accept_threshold=float(os.getenv("EVALUATOR_ACCEPT_THRESHOLD", "0.8")),
+                    reject_threshold=float(os.getenv("EVALUATOR_REJECT_THRESHOLD", "0.1")),
+                    max_length_ratio=float(os.getenv("EVALUATOR_MAX_LENGTH_RATIO", "3")),
+                )
+            options = dict(
+                cache=VerdictCache(cache_path) if cache_path else None,
+                max_batch_size=int(os.getenv("JUDGE_BATCH_SIZE", "10")),
+                evaluator=evaluator,
+                audit_rate=float(os.getenv("EVALUATOR_AUDIT_RATE", "0")),
+            )
+            if os.getenv("JUDGE_BACKEND", "openai").lower() == "stub":
+                _judge = StubJudge(
+                    latency_ms=float(os.getenv("JUDGE_STUB_LATENCY_MS", "50")),
+                    failure_rate=float(os.getenv("JUDGE_STUB_FAILURE_RATE", "0")),
+                    accuracy=float(os.getenv("JUDGE_STUB_ACCURACY", "0.8")),
+                    **options,
+                )
+            else:
+                _judge = AIJudge(judge_model=os.getenv("JUDGE_MODEL", "gpt-4o"), **options)
+        return _judge
@@ -0,0 +1,126 @@
+import os
+import resource
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+_MB = 1024 * 1024
+
+
+def current_rss_bytes() -> int:
+    """Memória residente (RSS) atual do processo. Fora do Linux, usa o pico do processo (getrusage)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # macOS informa bytes; Linux, KB
+
+
+class MemoryCeilingExceeded(MemoryError):
+    """A execução ultrapassou o teto de memória configurado."""
+
+
+class MemoryTracker:
+    """
+    Acompanha a memória de uma execução (um teste, um benchmark ou um corpus):
+    uma thread amostra o RSS do processo em intervalos curtos e guarda o pico.
+
+    Com `ceiling_bytes`, o crescimento do RSS em relação ao início da execução é limitado:
+    quem chama `check()` (ex: o pipeline de páginas, a cada página) recebe MemoryCeilingExceeded
+    em vez de o worker ser derrubado pelo sistema. O RSS é do processo inteiro, então execuções
+    simultâneas dividem o mesmo teto.
+    """
+    def __init__(self, ceiling_bytes: Optional[int] = None, interval: float = 0.05):
+        self.ceiling_bytes = ceiling_bytes or None
+        self.interval = interval
+        self.baseline_bytes = current_rss_bytes()
+        self.peak_bytes = self.baseline_bytes
+        # Maior volume de páginas em memória ao mesmo tempo nos pipelines desta execução
+        self.peak_buffer_bytes = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> int:
+        rss = current_rss_bytes()
+        with self._lock:
+            self.peak_bytes = max(self.peak_bytes, rss)
+            if self.ceiling_bytes and rss - self.baseline_bytes > self.ceiling_bytes:
+                self.exceeded = True
+        return rss
+
+    def record_buffer(self, buffered_bytes: int) -> None:
+        with self._lock:
+            self.peak_buffer_bytes = max(self.peak_buffer_bytes, buffered_bytes)
+
+    def check(self) -> None:
+        """Levanta MemoryCeilingExceeded se o teto foi ultrapassado (agora ou em alguma amostra anterior)."""
+        rss = self.sample()
+        if self.exceeded:
+            raise MemoryCeilingExceeded(
+                f"Teto de memória da execução ultrapassado: RSS {rss / _MB:.0f} MB "
+                f"(início {self.baseline_bytes / _MB:.0f} MB, teto +{self.ceiling_bytes / _MB:.0f} MB)."
+            )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self) -> "MemoryTracker":
+        self._thread = threading.Thread(target=self._run, name="memory-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "peak_rss_mb": round(self.peak_bytes / _MB, 1),
+                "baseline_rss_mb": round(self.baseline_bytes / _MB, 1),
+                "rss_growth_mb": round((self.peak_bytes - self.baseline_bytes) / _MB, 1),
+                "peak_page_buffer_mb": round(self.peak_buffer_bytes / _MB, 1),
+                "memory_ceiling_mb": round(self.ceiling_bytes / _MB, 1) if self.ceiling_bytes else None,
+                "ceiling_exceeded": self.exceeded,
+            }
+
+
+_current_tracker: ContextVar[Optional[MemoryTracker]] = ContextVar("memory_tracker", default=None)
+
+
+@contextmanager
+def use_tracker(tracker: Optional[MemoryTracker]) -> Iterator[Optional[MemoryTracker]]:
+    """Torna o tracker visível para o código chamado no bloco (na mesma thread/contexto)."""
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def current_tracker() -> Optional[MemoryTracker]:
+    return _current_tracker.get()
+
+
+def check_memory() -> None:
+    """Verifica o teto da execução atual, se houver uma sendo acompanhada."""
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.check()
+
+
+def get_memory_ceiling_bytes() -> Optional[int]:
+    """
+    Teto de memória por execução. Variável de ambiente:
+    REQUEST_MEMORY_CEILING_MB: crescimento máximo do RSS durante uma execução (padrão: 2048; 0 desativa)
+    """
+    ceiling_mb = int(os.getenv("REQUEST_MEMORY_CEILING_MB", "2048"))
+    return ceiling_mb * _MB if ceiling_mb > 0 else None
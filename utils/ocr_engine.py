@@ -0,0 +1,150 @@
+import importlib.util
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from PIL import Image
+
+# --- Código executado dentro de cada worker ---
+
+_worker_lang = "por"
+# Um PyTessBaseAPI por thread: a API do tesserocr não pode ser usada por duas threads ao mesmo tempo
+# (nos workers há uma thread só; com workers=0 o OCR roda nas threads de quem chama)
+_worker_local = threading.local()
+
+
+def _init_worker(lang: str) -> None:
+    """Carrega o modelo de OCR uma única vez por worker."""
+    global _worker_lang
+    _worker_lang = lang
+    _worker_api()
+
+
+def _worker_api():
+    """API do tesserocr da thread atual, criada no primeiro uso (None se o tesserocr não estiver disponível)."""
+    if not hasattr(_worker_local, "api"):
+        try:
+            import tesserocr
+            _worker_local.api = tesserocr.PyTessBaseAPI(lang=_worker_lang)
+        except Exception:
+            # Sem o tesserocr, cai no pytesseract (um processo tesseract por chamada, mas ainda em paralelo)
+            _worker_local.api = None
+    return _worker_local.api
+
+
+def _ocr_bytes(image_bytes: bytes) -> str:
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        api = _worker_api()
+        if api is not None:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=_worker_lang)
+    except Exception as e:
+        # Algumas exceções (ex: TesseractNotFoundError) não podem ser reconstruídas no processo
+        # principal e quebrariam o pool inteiro; devolve sempre uma exceção simples
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+# --- Motor de OCR usado pelos modelos ---
+
+class OCREngine:
+    """
+    Pool de workers de OCR de longa duração. Cada worker carrega o modelo de linguagem
+    uma única vez e recebe imagens já codificadas (PNG/JPEG), devolvendo o texto.
+
+    `submit` retorna um Future, então quem chama decide a ordem em que junta os resultados.
+    Com workers=0 o OCR roda no próprio processo, na thread de quem chama (útil para depuração).
+    """
+    def __init__(self, workers: Optional[int] = None, lang: str = "por", max_inflight: Optional[int] = None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.lang = lang
+        # Limita quantas imagens codificadas ficam aguardando na fila (memória)
+        self._inflight = threading.BoundedSemaphore(max_inflight or max(self.workers, 1) * 4)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        if importlib.util.find_spec("tesserocr") is None:
+            print("Aviso: tesserocr não instalado; o OCR usa o pytesseract, que inicia um processo do tesseract "
+                  f"e recarrega o idioma '{lang}' a cada imagem (instale com `pip install tesserocr`).")
+        if self.workers == 0:
+            _init_worker(lang)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # "spawn" evita herdar o estado de threads do servidor via fork
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.lang,),
+                )
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def submit(self, image_bytes: bytes) -> Future:
+        """Agenda o OCR de uma imagem codificada. Bloqueia se houver imagens demais na fila."""
+        if self.workers == 0:
+            future = Future()
+            try:
+                future.set_result(_ocr_bytes(image_bytes))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._inflight.acquire()
+        try:
+            future = self._get_pool().submit(_ocr_bytes, image_bytes)
+        except BrokenProcessPool:
+            # Um worker morreu (ex: falta de memória): recria o pool e tenta de novo
+            self._reset_pool()
+            try:
+                future = self._get_pool().submit(_ocr_bytes, image_bytes)
+            except Exception:
+                self._inflight.release()
+                raise
+        except Exception:
+            self._inflight.release()
+            raise
+        future.add_done_callback(lambda _: self._inflight.release())
+        return future
+
+    def ocr_image(self, image: Image.Image) -> str:
+        """Atalho síncrono para uma imagem PIL."""
+        buffered = io.BytesIO()
+        image.save(buffered, format="PNG")
+        return self.submit(buffered.getvalue()).result()
+
+    def shutdown(self) -> None:
+        self._reset_pool()
+
+
+_ocr_engine: Optional[OCREngine] = None
+_ocr_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """
+    Retorna o motor de OCR compartilhado do processo. Variáveis de ambiente:
+    OCR_WORKERS: número de workers (padrão: número de CPUs; 0 roda no próprio processo)
+    OCR_LANG: idioma do Tesseract (padrão: por)
+    """
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            workers = os.getenv("OCR_WORKERS")
+            _ocr_engine = OCREngine(
+                workers=int(workers) if workers else None,
+                lang=os.getenv("OCR_LANG", "por"),
+            )
+        return _ocr_engine
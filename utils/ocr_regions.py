@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (x0, y0, x1, y1) em pontos da página
+BBox = Tuple[float, float, float, float]
+
+# Tipos de região
+IMAGE = "image"    # imagens incorporadas (uma ou mais, sobrepostas/vizinhas)
+VECTOR = "vector"  # desenhos vetoriais complexos (ex: texto convertido em curvas)
+PAGE = "page"      # a página inteira (digitalizações, ou regiões cobrindo quase tudo)
+
+
+@dataclass
+class OCRRegion:
+    bbox: BBox
+    kind: str
+    # Imagens incorporadas contidas na região
+    xrefs: Tuple[int, ...] = ()
+
+    @property
+    def area(self) -> float:
+        return max(self.bbox[2] - self.bbox[0], 0.0) * max(self.bbox[3] - self.bbox[1], 0.0)
+
+
+def _near(a: BBox, b: BBox, gap: float) -> bool:
+    return not (a[2] < b[0] - gap or b[2] < a[0] - gap or a[3] < b[1] - gap or b[3] < a[1] - gap)
+
+
+def merge_regions(regions: Sequence[OCRRegion], gap: float = 4.0) -> List[OCRRegion]:
+    """Une regiões que se sobrepõem ou estão a menos de `gap` pontos (um único recorte para o OCR)."""
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        result: List[OCRRegion] = []
+        for region in merged:
+            for i, other in enumerate(result):
+                if _near(region.bbox, other.bbox, gap):
+                    result[i] = OCRRegion(
+                        bbox=(min(region.bbox[0], other.bbox[0]), min(region.bbox[1], other.bbox[1]),
+                              max(region.bbox[2], other.bbox[2]), max(region.bbox[3], other.bbox[3])),
+                        kind=IMAGE if IMAGE in (region.kind, other.kind) else VECTOR,
+                        xrefs=other.xrefs + region.xrefs,
+                    )
+                    changed = True
+                    break
+            else:
+                result.append(region)
+        merged = result
+    return merged
+
+
+def _complex_items(drawing: Dict[str, Any]) -> int:
+    """Curvas e linhas diagonais de um desenho (filetes de tabela e retângulos não contam)."""
+    count = 0
+    for item in drawing["items"]:
+        if item[0] == "c" or (item[0] == "l" and item[1].x != item[2].x and item[1].y != item[2].y):
+            count += 1
+    return count
+
+
+def find_ocr_regions(page, image_infos: Sequence[Dict[str, Any]], include_vectors: bool,
+                     min_side: float = 8.0, min_vector_items: int = 20, merge_gap: float = 4.0,
+                     full_page_coverage: float = 0.6) -> List[OCRRegion]:
+    """
+    Regiões de uma página do PyMuPDF que precisam de OCR, a partir do próprio PDF (sem renderizar):
+    - a área visível de cada imagem incorporada em `image_infos` (saída de `get_image_info(xrefs=True)`,
+      já sem as imagens descartadas pelos filtros do modelo)
+    - com `include_vectors`, os agrupamentos de desenhos vetoriais com pelo menos `min_vector_items`
+      curvas/diagonais (texto convertido em curvas, rótulos desenhados)
+    Regiões vizinhas são unidas; se elas cobrirem quase a página inteira, a página vira uma única região.
+    """
+    page_rect = page.rect
+    regions = []
+    for info in image_infos:
+        bbox = page_rect & info["bbox"]  # Só a parte visível da imagem
+        if bbox.is_empty or min(bbox.width, bbox.height) < min_side:
+            continue
+        regions.append(OCRRegion(tuple(bbox), IMAGE, (info.get("xref", 0),)))
+
+    if include_vectors:
+        drawings = page.get_drawings()
+        if drawings:
+            for cluster in page.cluster_drawings(drawings=drawings):
+                items = sum(_complex_items(drawing) for drawing in drawings if drawing["rect"] in cluster)
+                if items >= min_vector_items and min(cluster.width, cluster.height) >= min_side:
+                    regions.append(OCRRegion(tuple(page_rect & cluster), VECTOR))
+
+    regions = merge_regions(regions, gap=merge_gap)
+    page_area = max(page_rect.width * page_rect.height, 1.0)
+    if regions and sum(region.area for region in regions) / page_area >= full_page_coverage:
+        return [OCRRegion(tuple(page_rect), PAGE, tuple(x for region in regions for x in region.xrefs))]
+    return sorted(regions, key=lambda region: (region.bbox[1], region.bbox[0]))
+
+
+def estimate_glyph_height_pt(page, bbox: BBox, probe_dpi: int = 96) -> Optional[float]:
+    """
+    Altura típica das linhas de texto (em pontos) dentro de uma região, medida em uma renderização
+    barata em tons de cinza: as linhas com tinta formam faixas no perfil de projeção horizontal,
+    e o quartil inferior das alturas dessas faixas aproxima o corpo da fonte.
+    Retorna None se a região não tiver contraste ou faixas reconhecíveis (ex: fotos, áreas vazias).
+    """
+    import fitz  # PyMuPDF
+
+    pix = page.get_pixmap(dpi=probe_dpi, clip=fitz.Rect(bbox), colorspace=fitz.csGRAY)
+    if pix.width < 4 or pix.height < 4:
+        return None
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    low, high = int(gray.min()), int(gray.max())
+    if high - low < 64:
+        return None
+    ink_rows = ((gray < (low + high) / 2).mean(axis=1) > 0.02).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], ink_rows, [0])))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    heights = heights[heights >= 2]
+    if heights.size == 0:
+        return None
+    return float(np.percentile(heights, 25)) * 72 / probe_dpi
+
+
+def page_font_size(page) -> Optional[float]:
+    """Corpo mediano do texto nativo da página (estimativa para regiões sem faixas de texto medidas)."""
+    sizes = [
+        span["size"]
+        for block in page.get_text("dict")["blocks"] if block.get("type") == 0
+        for line in block["lines"]
+        for span in line["spans"] if span["text"].strip()
+    ]
+    return float(np.median(sizes)) if sizes else None
+
+
+def choose_dpi(glyph_height_pt: float, target_glyph_px: int = 40, min_dpi: int = 150, max_dpi: int = 300) -> int:
+    """
+    DPI que deixa as linhas de texto com ~`target_glyph_px` pixels de altura (maiúsculas com ~30 px,
+    a faixa em que o Tesseract rende melhor): texto de 10 pt fica perto de 300 DPI, títulos bem abaixo.
+    """
+    dpi = target_glyph_px * 72 / max(glyph_height_pt, 1.0)
+    return int(min(max(dpi, min_dpi), max_dpi))
+
+
+def merge_reading_order(native_blocks: Sequence[Tuple[BBox, Any]], regions: Sequence[Tuple[BBox, Any]],
+                        line_tolerance: float = 3.0) -> List[Any]:
+    """
+    Intercala o resultado do OCR das regiões com os blocos de texto nativo: a ordem dos blocos nativos
+    é preservada (colunas continuam inteiras) e cada região entra antes do primeiro bloco que vem
+    depois dela na leitura (mais abaixo, ou na mesma linha e mais à direita).
+    """
+    def after(block: BBox, region: BBox) -> bool:
+        if block[1] > region[1] + line_tolerance:
+            return True
+        return abs(block[1] - region[1]) <= line_tolerance and block[0] > region[0]
+
+    positions = []
+    for region_bbox, item in regions:
+        position = next((i for i, (block_bbox, _) in enumerate(native_blocks) if after(block_bbox, region_bbox)),
+                        len(native_blocks))
+        positions.append((position, region_bbox[1], region_bbox[0], item))
+    positions.sort(key=lambda entry: entry[:3])
+
+    merged, next_region = [], 0
+    for i, (_, text) in enumerate(native_blocks):
+        while next_region < len(positions) and positions[next_region][0] == i:
+            merged.append(positions[next_region][3])
+            next_region += 1
+        merged.append(text)
+    merged.extend(entry[3] for entry in positions[next_region:])
+    return merged
@@ -0,0 +1,40 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> "OpenAI":
+    """
+    Retorna o cliente OpenAI compartilhado pelo processo inteiro.
+    Um único cliente reaproveita o pool de conexões HTTP (keep-alive) entre todas as chamadas,
+    em vez de abrir conexões novas a cada modelo/orquestrador instanciado.
+
+    As novas tentativas ficam a cargo do dispatcher (utils.openai_dispatcher), então o cliente
+    não repete nada sozinho. Variáveis de ambiente:
+    OPENAI_BASE_URL: endereço alternativo da API (ex: o servidor simulado `mock_openai_server.py`)
+    OPENAI_MAX_CONNECTIONS: tamanho do pool de conexões HTTP
+
+    O SDK só é importado na primeira chamada (a importação é uma das mais lentas da inicialização).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from openai import OpenAI
+            max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+            _client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                ),
+            )
+        return _client
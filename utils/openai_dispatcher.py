@@ -0,0 +1,245 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from .metrics import REGISTRY, Counter
+from .openai_client import get_openai_client
+from .timing import span
+
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "openai_requests_total",
+    "Chamadas à API da OpenAI pelo dispatcher, por prioridade e resultado.",
+    ("priority", "outcome"),
+))
+RETRIES_TOTAL = REGISTRY.register(Counter(
+    "openai_retries_total",
+    "Novas tentativas após erros transitórios (429, 5xx, timeout), por prioridade.",
+    ("priority",),
+))
+
+# Custo aproximado de uma imagem quando o chamador não informa a estimativa (ver page_selection)
+_IMAGE_TOKENS = {"low": 85, "high": 765, "auto": 765}
+
+
+class Priority(IntEnum):
+    """Menor valor = atendido primeiro. As respostas dos modelos estão no caminho medido; o juiz pode esperar."""
+    ANSWER = 0
+    JUDGE = 1
+
+
+class TokenBucket:
+    """
+    Balde de tokens com reposição contínua: `capacity` unidades por minuto.
+    Aceita saldo negativo (ajuste pelo uso real depois da resposta), que é pago com espera.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.available = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos até haver `amount` disponível (0 se já houver). Pedidos maiores que a capacidade esperam o balde cheio."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.available -= amount
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> int:
+    """Estimativa barata de tokens de uma requisição (~4 caracteres por token + imagens + saída máxima)."""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "image_url":
+                total += _IMAGE_TOKENS.get(part["image_url"].get("detail", "auto"), 765)
+            else:
+                total += len(part.get("text") or "") // 4 + 1
+    return total + (max_tokens or 0)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Lê `retry-after-ms` / `retry-after` (segundos) da resposta de erro, se houver."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except ValueError:
+            continue  # Formato de data HTTP: cai no backoff exponencial
+    return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    import openai  # Já carregado pelo cliente que produziu o erro
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True  # APITimeoutError é uma APIConnectionError
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class OpenAIDispatcher:
+    """
+    Ponto único de saída das chamadas à OpenAI do processo.
+
+    - Um único cliente (pool de conexões HTTP compartilhado)
+    - Baldes de tokens para requisições por minuto (RPM) e tokens por minuto (TPM)
+    - Fila por prioridade: respostas dos modelos passam na frente do juiz
+    - Novas tentativas com backoff exponencial com jitter, respeitando `Retry-After`;
+      um 429 pausa a fila inteira, não só a requisição que o recebeu
+    """
+    def __init__(self, client=None, requests_per_minute: float = 500, tokens_per_minute: float = 200000,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0, max_inflight: int = 32):
+        self._client = client
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_inflight = max_inflight
+        self._inflight = 0
+        self._paused_until = 0.0
+        self._waiting: List[tuple] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+
+    # --- Admissão ---
+
+    def _wait_time(self, ticket: tuple, tokens: int) -> Optional[float]:
+        """Segundos até a requisição poder sair; None enquanto não for a vez dela."""
+        if self._waiting[0] != ticket or self._inflight >= self.max_inflight:
+            return None
+        wait = self._paused_until - time.monotonic()
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return max(wait, 0.0)
+
+    def _acquire(self, priority: Priority, tokens: int) -> None:
+        ticket = (int(priority), next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = self._wait_time(ticket, tokens)
+                    if wait == 0.0:
+                        break
+                    self._cond.wait(timeout=wait if wait is not None else 1.0)
+                if self.requests is not None:
+                    self.requests.take(1)
+                if self.tokens is not None:
+                    self.tokens.take(tokens)
+                self._inflight += 1
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def _release(self, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if self.tokens is not None and used_tokens is not None:
+                # Acerta o balde pelo uso real informado pela API
+                self.tokens.take(used_tokens - reserved_tokens)
+            self._cond.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # "Full jitter": espalha as novas tentativas para não voltarem todas ao mesmo tempo
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    # --- Chamadas ---
+
+    def chat_completion(self, priority: Priority = Priority.ANSWER, estimated_tokens: Optional[int] = None, **kwargs):
+        """
+        Equivalente a `client.chat.completions.create(**kwargs)`, passando pelos limites e pela fila.
+        `estimated_tokens` substitui a estimativa por caracteres (ex: quando o custo das imagens já é conhecido).
+        Erros não transitórios, ou que persistirem após `max_retries`, são propagados.
+        """
+        tokens = estimated_tokens or estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        label = priority.name.lower()
+        attempt = 0
+        while True:
+            with span("rate_limit_wait"):
+                self._acquire(priority, tokens)
+            used_tokens = None
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+                usage = getattr(response, "usage", None)
+                used_tokens = getattr(usage, "total_tokens", None)
+                REQUESTS_TOTAL.inc(priority=label, outcome="ok")
+                return response
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    REQUESTS_TOTAL.inc(priority=label, outcome="error")
+                    raise
+                delay = self._backoff(attempt, e)
+                if getattr(e, "status_code", None) == 429:
+                    self._pause(delay)
+                REQUESTS_TOTAL.inc(priority=label, outcome="retry")
+                RETRIES_TOTAL.inc(priority=label)
+            finally:
+                self._release(tokens, used_tokens)
+            attempt += 1
+            with span("retry_backoff"):
+                time.sleep(delay)
+
+
+_dispatcher: Optional[OpenAIDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_openai_dispatcher() -> OpenAIDispatcher:
+    """
+    Retorna o dispatcher compartilhado do processo. Variáveis de ambiente:
+    OPENAI_RPM / OPENAI_TPM: limites de requisições e de tokens por minuto (0 desativa)
+    OPENAI_MAX_RETRIES: novas tentativas em erros transitórios (429, 5xx, timeout)
+    OPENAI_MAX_INFLIGHT: máximo de requisições simultâneas
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = OpenAIDispatcher(
+                requests_per_minute=float(os.getenv("OPENAI_RPM", "500")),
+                tokens_per_minute=float(os.getenv("OPENAI_TPM", "200000")),
+                max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "5")),
+                max_inflight=int(os.getenv("OPENAI_MAX_INFLIGHT", "32")),
+            )
+        return _dispatcher
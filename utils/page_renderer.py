@@ -0,0 +1,139 @@
+import base64
+import io
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from PIL import Image
+
+from .cache import LRUCache, file_sha256
+from .memory import check_memory
+from .timing import span
+
+# Formatos aceitos e o MIME type usado na data URL
+IMAGE_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+}
+
+
+@dataclass
+class RenderedPage:
+    """Página renderizada e já codificada, pronta para ser enviada a uma API."""
+    page_index: int
+    width: int
+    height: int
+    image_format: str
+    data: bytes
+    _data_url: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def data_url(self) -> str:
+        # O base64 é calculado uma única vez e fica guardado junto dos bytes
+        if self._data_url is None:
+            with span("encode"):
+                encoded = base64.b64encode(self.data).decode("utf-8")
+                self._data_url = f"data:{IMAGE_MIME_TYPES[self.image_format]};base64,{encoded}"
+        return self._data_url
+
+
+class PageRenderer:
+    """
+    Serviço que renderiza cada página de um PDF uma única vez.
+    As imagens codificadas ficam em um cache LRU limitado por bytes, com chave
+    (hash do documento, página, DPI, formato, qualidade), e podem ser reaproveitadas por qualquer modelo.
+
+    backend="pymupdf" renderiza no próprio processo; backend="pdf2image" usa o poppler.
+    """
+    def __init__(self, backend: str = "pymupdf", max_bytes: int = 256 * 1024 * 1024):
+        if backend not in ("pymupdf", "pdf2image"):
+            raise ValueError(f"Backend de renderização '{backend}' não suportado.")
+        self.backend = backend
+        # O data URL em base64 ocupa ~4/3 dos bytes originais
+        self.cache = LRUCache(max_entries=None, max_bytes=max_bytes, sizeof=lambda page: len(page.data) * 7 // 3)
+        self._page_counts = LRUCache(max_entries=1024)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def page_count(self, pdf_path: str, doc_hash: str) -> int:
+        count = self._page_counts.get(doc_hash)
+        if count is None:
+            if self.backend == "pymupdf":
+                import fitz  # PyMuPDF
+                with fitz.open(pdf_path) as doc:
+                    count = doc.page_count
+            else:
+                from pdf2image import pdfinfo_from_path
+                count = int(pdfinfo_from_path(pdf_path)["Pages"])
+            self._page_counts.put(doc_hash, count)
+        return count
+
+    def render_page(self, pdf_path: str, page_index: int, dpi: int = 200, image_format: str = "JPEG",
+                    doc_hash: Optional[str] = None, quality: int = 75) -> RenderedPage:
+        image_format = image_format.upper()
+        if image_format not in IMAGE_MIME_TYPES:
+            raise ValueError(f"Formato de imagem '{image_format}' não suportado.")
+        doc_hash = doc_hash or file_sha256(pdf_path)
+        key = (doc_hash, page_index, dpi, image_format, quality)
+
+        page = self.cache.get(key)
+        if page is not None:
+            return page
+
+        # Garante que duas threads pedindo a mesma página não a renderizem duas vezes
+        with self._inflight_lock:
+            lock = self._inflight.setdefault(key, threading.Lock())
+        with lock:
+            page = self.cache.get(key)
+            if page is None:
+                check_memory()
+                with span("render"):
+                    page = self._render(pdf_path, page_index, dpi, image_format, quality)
+                self.cache.put(key, page)
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        return page
+
+    def _render(self, pdf_path: str, page_index: int, dpi: int, image_format: str, quality: int) -> RenderedPage:
+        if self.backend == "pymupdf":
+            import fitz  # PyMuPDF
+            with fitz.open(pdf_path) as doc:
+                pix = doc.load_page(page_index).get_pixmap(dpi=dpi)
+                image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        else:
+            from pdf2image import convert_from_path
+            # Converte apenas a página pedida (pdf2image numera a partir de 1)
+            image = convert_from_path(pdf_path, dpi=dpi, first_page=page_index + 1, last_page=page_index + 1)[0]
+
+        buffered = io.BytesIO()
+        # `quality` só afeta formatos com perda (JPEG/WEBP)
+        image.save(buffered, format=image_format, quality=quality)
+        return RenderedPage(
+            page_index=page_index,
+            width=image.width,
+            height=image.height,
+            image_format=image_format,
+            data=buffered.getvalue(),
+        )
+
+
+_page_renderer: Optional[PageRenderer] = None
+_page_renderer_lock = threading.Lock()
+
+
+def get_page_renderer() -> PageRenderer:
+    """
+    Retorna o renderizador compartilhado do processo. Variáveis de ambiente:
+    PAGE_RENDER_BACKEND: "pymupdf" (padrão, sem subprocesso) ou "pdf2image"
+    PAGE_CACHE_MB: tamanho máximo do cache de imagens codificadas
+    """
+    global _page_renderer
+    with _page_renderer_lock:
+        if _page_renderer is None:
+            _page_renderer = PageRenderer(
+                backend=os.getenv("PAGE_RENDER_BACKEND", "pymupdf"),
+                max_bytes=int(os.getenv("PAGE_CACHE_MB", "256")) * 1024 * 1024,
+            )
+        return _page_renderer
@@ -0,0 +1,76 @@
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+# Rotas possíveis de uma página
+NATIVE = "native"  # camada de texto do PDF
+OCR = "ocr"        # OCR local da página renderizada
+VISION = "vision"  # imagem enviada ao modelo multimodal
+
+
+@dataclass
+class PageProfile:
+    """Medidas baratas de uma página, tiradas do próprio PDF (sem renderizar)."""
+    text_chars: int
+    # Fração da área da página coberta por imagens (soma das áreas, limitada a 1)
+    image_coverage: float
+    # Curvas e linhas diagonais dos desenhos vetoriais (filetes de tabela e retângulos não contam)
+    vector_items: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def profile_page(page, text: Optional[str] = None) -> PageProfile:
+    """
+    Mede densidade de texto, cobertura de imagens e conteúdo vetorial de uma página do PyMuPDF.
+    `text` é o texto da página, quando quem chama já o extraiu (evita um segundo `get_text`).
+    """
+    if text is None:
+        text = page.get_text()
+    page_rect = page.rect
+    page_area = max(page_rect.width * page_rect.height, 1.0)
+
+    image_area = 0.0
+    for info in page.get_image_info():
+        bbox = page_rect & info["bbox"]  # Só a parte visível da imagem
+        if not bbox.is_empty:
+            image_area += bbox.width * bbox.height
+
+    vector_items = 0
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "c":
+                vector_items += 1
+            elif item[0] == "l" and item[1].x != item[2].x and item[1].y != item[2].y:
+                vector_items += 1
+
+    return PageProfile(
+        text_chars=len(text.strip()),
+        image_coverage=min(image_area / page_area, 1.0),
+        vector_items=vector_items,
+    )
+
+
+class PageRouter:
+    """
+    Decide como cada página é lida:
+    - desenhos vetoriais complexos (diagramas, ilustrações numeradas) vão para o modelo multimodal
+    - páginas com camada de texto usam o texto nativo, a menos que uma figura ocupe boa parte delas
+    - páginas quase sem texto, mas com imagens (digitalizações simples), passam pelo OCR local;
+      se o OCR também não encontrar texto, a página é um diagrama e vai para o modelo multimodal
+    """
+    def __init__(self, min_text_chars: int = 50, figure_image_coverage: float = 0.3, min_vector_items: int = 100):
+        self.min_text_chars = min_text_chars
+        self.figure_image_coverage = figure_image_coverage
+        self.min_vector_items = min_vector_items
+
+    def route(self, profile: PageProfile) -> str:
+        if self.min_vector_items and profile.vector_items >= self.min_vector_items:
+            return VISION
+        if profile.text_chars >= self.min_text_chars:
+            return VISION if profile.image_coverage >= self.figure_image_coverage else NATIVE
+        return OCR if profile.image_coverage > 0 else NATIVE
+
+    def escalate_after_ocr(self, ocr_text: str) -> bool:
+        """OCR sem letras suficientes (ex: só os números de um diagrama): a página precisa do modelo multimodal."""
+        return sum(ch.isalpha() for ch in ocr_text) < self.min_text_chars
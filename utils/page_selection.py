@@ -0,0 +1,114 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from .retrieval import BM25Index, Chunk
+
+# Regras de custo de imagem da OpenAI:
+# - detail "low": imagem de até 512x512, custo fixo
+# - detail "high": cabe em 2048x2048, menor lado reduzido para 768, custo por bloco de 512x512
+LOW_DETAIL_TOKENS = 85
+HIGH_DETAIL_BASE_TOKENS = 85
+HIGH_DETAIL_TILE_TOKENS = 170
+
+# Páginas com menos caracteres que isso não têm camada de texto útil (digitalizações, diagramas)
+MIN_TEXT_CHARS = 50
+
+
+def build_page_index(page_texts: Sequence[str]) -> BM25Index:
+    """Índice BM25 com um trecho por página, para ranquear páginas inteiras."""
+    return BM25Index([Chunk(page=i + 1, text=text) for i, text in enumerate(page_texts)])
+
+
+def low_text_pages(page_texts: Sequence[str], min_chars: int = MIN_TEXT_CHARS) -> List[int]:
+    """Índices das páginas sem (ou quase sem) camada de texto: o BM25 nunca as encontra."""
+    return [i for i, text in enumerate(page_texts) if len(text.strip()) < min_chars]
+
+
+def select_pages(index: Optional[BM25Index], num_pages: int, query: str, max_pages: int,
+                 image_pages: Sequence[int] = ()) -> List[int]:
+    """
+    Retorna os índices (a partir de 0) das páginas candidatas, da mais para a menos relevante.
+    Sem camada de texto (ou sem nenhuma página relacionada à pergunta) não há como escolher:
+    todas as páginas seguem, em ordem, e o planejador de tokens decide a resolução.
+    As páginas de `image_pages` (sem texto, ver `low_text_pages`) ocupam as vagas que os resultados
+    do BM25 deixarem livres em `max_pages`, das mais próximas de um resultado para as mais distantes
+    (figuras e digitalizações costumam ficar ao lado da página que as cita).
+    """
+    if index is None or not index.postings:
+        return list(range(num_pages))
+    hits = index.search(query, top_k=max_pages)
+    if not hits:
+        return list(range(num_pages))
+    ranked = [chunk.page - 1 for chunk, _ in hits]
+    candidates = [i for i in image_pages if i not in ranked]
+    candidates.sort(key=lambda i: (min(abs(i - page) for page in ranked), i))
+    return ranked + candidates[:max(max_pages - len(ranked), 0)]
+
+
+def _high_detail_size(width_pt: float, height_pt: float) -> Tuple[int, int]:
+    """Tamanho (em pixels) que a página terá depois do redimensionamento da API no modo "high"."""
+    scale = min(1.0, 2048 / max(width_pt, height_pt))
+    w, h = width_pt * scale, height_pt * scale
+    scale = 768 / min(w, h)
+    return max(int(w * scale), 1), max(int(h * scale), 1)
+
+
+def estimate_image_tokens(width_pt: float, height_pt: float, detail: str) -> int:
+    if detail == "low":
+        return LOW_DETAIL_TOKENS
+    w, h = _high_detail_size(width_pt, height_pt)
+    return HIGH_DETAIL_BASE_TOKENS + HIGH_DETAIL_TILE_TOKENS * math.ceil(w / 512) * math.ceil(h / 512)
+
+
+@dataclass
+class PagePlan:
+    page_index: int
+    detail: str
+    dpi: int
+    quality: int
+    tokens: int
+
+
+def _dpi_for(width_pt: float, height_pt: float, detail: str, max_dpi: int) -> int:
+    """Menor DPI que já entrega a resolução que a API vai usar (pixels além disso são descartados)."""
+    if detail == "low":
+        dpi = 512 / max(width_pt, height_pt) * 72
+    else:
+        w, _ = _high_detail_size(width_pt, height_pt)
+        dpi = w / width_pt * 72
+    return max(min(int(math.ceil(dpi)), max_dpi), 36)
+
+
+def plan_image_budget(page_sizes: Sequence[Tuple[float, float]], ranked_pages: Sequence[int],
+                      token_budget: int, max_dpi: int = 200,
+                      high_quality: int = 85, low_quality: int = 70) -> List[PagePlan]:
+    """
+    Escolhe detail/DPI/qualidade JPEG de cada página para caber em `token_budget`.
+    As páginas mais relevantes recebem "high" primeiro; as demais ficam em "low";
+    se nem tudo em "low" couber, as menos relevantes são descartadas.
+    O resultado volta na ordem original das páginas.
+    """
+    low_cost = LOW_DETAIL_TOKENS
+    max_pages = max(token_budget // low_cost, 1)
+    ranked = list(ranked_pages)[:max_pages]
+
+    plans = []
+    spent = low_cost * len(ranked)  # Piso: todas as páginas em "low"
+    for page_index in ranked:
+        width_pt, height_pt = page_sizes[page_index]
+        high_cost = estimate_image_tokens(width_pt, height_pt, "high")
+        if spent - low_cost + high_cost <= token_budget:
+            spent += high_cost - low_cost
+            detail, quality, tokens = "high", high_quality, high_cost
+        else:
+            detail, quality, tokens = "low", low_quality, low_cost
+        plans.append(PagePlan(
+            page_index=page_index,
+            detail=detail,
+            dpi=_dpi_for(width_pt, height_pt, detail, max_dpi),
+            quality=quality,
+            tokens=tokens,
+        ))
+
+    return sorted(plans, key=lambda plan: plan.page_index)
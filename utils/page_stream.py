@@ -0,0 +1,141 @@
+import contextvars
+import os
+import queue
+import threading
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+from .memory import current_tracker
+
+# reader(documento PyMuPDF, página) -> (dados da página, bytes ocupados por eles)
+PageReader = Callable[[Any, Any], Tuple[Any, int]]
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class PageStream:
+    """
+    Lê as páginas de um PDF sob demanda, em uma thread produtora, sem carregar o documento inteiro:
+
+    - `reader(doc, page)` roda na thread produtora (a única que toca o PDF) e devolve os dados da
+      página (texto, PNG renderizado, imagens incorporadas...) e quantos bytes eles ocupam
+    - no máximo `prefetch` páginas ficam prontas à frente do consumidor, somando no máximo
+      `max_buffer_bytes`; uma página maior que o limite passa sozinha
+    - o buffer de cada página é liberado assim que o consumidor pede a próxima
+    - a cada página, o teto de memória da execução (utils.memory) é verificado
+
+    Uso: `for page_index, data in PageStream(pdf_path, reader): ...`
+    """
+    def __init__(self, pdf_path: str, reader: PageReader, prefetch: int = 2,
+                 max_buffer_bytes: int = 64 * 1024 * 1024, pages: Optional[Sequence[int]] = None):
+        self.pdf_path = pdf_path
+        self.reader = reader
+        self.prefetch = max(prefetch, 1)
+        self.max_buffer_bytes = max_buffer_bytes
+        self.pages = pages
+        self.buffered_bytes = 0
+        self.peak_buffered_bytes = 0
+        self._budget = threading.Condition()
+
+    def _reserve(self, nbytes: int, stop: threading.Event) -> bool:
+        with self._budget:
+            while (self.buffered_bytes > 0 and self.buffered_bytes + nbytes > self.max_buffer_bytes
+                   and not stop.is_set()):
+                self._budget.wait(timeout=0.1)
+            if stop.is_set():
+                return False
+            self.buffered_bytes += nbytes
+            self.peak_buffered_bytes = max(self.peak_buffered_bytes, self.buffered_bytes)
+            buffered = self.buffered_bytes
+        tracker = current_tracker()
+        if tracker is not None:
+            tracker.record_buffer(buffered)
+        return True
+
+    def _release(self, nbytes: int) -> None:
+        with self._budget:
+            self.buffered_bytes -= nbytes
+            self._budget.notify_all()
+
+    @staticmethod
+    def _put(pages: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, pages: queue.Queue, stop: threading.Event) -> None:
+        import fitz  # PyMuPDF
+        try:
+            with fitz.open(self.pdf_path) as doc:
+                indexes = range(doc.page_count) if self.pages is None else self.pages
+                tracker = current_tracker()
+                for page_index in indexes:
+                    if stop.is_set():
+                        return
+                    if tracker is not None:
+                        tracker.check()
+                    data, nbytes = self.reader(doc, doc.load_page(page_index))
+                    if not self._reserve(nbytes, stop):
+                        return
+                    if not self._put(pages, (page_index, data, nbytes), stop):
+                        self._release(nbytes)
+                        return
+            self._put(pages, _END, stop)
+        except BaseException as e:
+            self._put(pages, _Failure(e), stop)
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        pages: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        # A produtora herda o contexto (coleta de etapas de `span` e teto de memória da execução)
+        context = contextvars.copy_context()
+        producer = threading.Thread(
+            target=context.run, args=(self._produce, pages, stop), name="page-stream", daemon=True
+        )
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                page_index, data, nbytes = item
+                item = None
+                try:
+                    yield page_index, data
+                finally:
+                    del data
+                    self._release(nbytes)
+        finally:
+            # Consumidor terminou (ou desistiu): para a produtora e descarta o que ficou na fila
+            # (a produtora desiste de esperar por espaço assim que vê `stop`)
+            stop.set()
+            producer.join()
+            while True:
+                try:
+                    item = pages.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    self._release(item[2])
+
+
+def get_stream_settings() -> dict:
+    """
+    Parâmetros do pipeline de páginas. Variáveis de ambiente:
+    PAGE_PREFETCH: páginas lidas à frente do consumidor (padrão: 2)
+    PAGE_BUFFER_MB: bytes de páginas em memória ao mesmo tempo, por documento (padrão: 64)
+    """
+    return {
+        "prefetch": int(os.getenv("PAGE_PREFETCH", "2")),
+        "max_buffer_bytes": int(os.getenv("PAGE_BUFFER_MB", "64")) * 1024 * 1024,
+    }
@@ -0,0 +1,58 @@
+from typing import Any, Dict, Optional
+
+# Preço (US$ por 1 milhão de tokens) de entrada e saída dos modelos da OpenAI.
+# Os tokens das imagens já vêm somados em `prompt_tokens`.
+OPENAI_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# Document AI (processador de OCR): US$ por página processada
+DOCAI_PRICE_PER_PAGE = 1.50 / 1000
+
+
+def openai_usage(model: str, response, share: float = 1.0) -> Optional[Dict[str, Any]]:
+    """
+    Uso de uma resposta da OpenAI no formato gravado em `details["usage"]`.
+    `share` divide a requisição entre os itens que a compartilham (ex: 1/8 num lote de 8 perguntas).
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return {
+        "model": model,
+        "prompt_tokens": (usage.prompt_tokens or 0) * share,
+        "completion_tokens": (usage.completion_tokens or 0) * share,
+    }
+
+
+def scale_usage(usage: Dict[str, Any], share: float) -> Dict[str, Any]:
+    """Mesmo uso, com as contagens multiplicadas por `share` (ex: ingestão dividida entre as perguntas)."""
+    return {key: value * share if isinstance(value, (int, float)) else value for key, value in usage.items()}
+
+
+def usage_cost_usd(usage: Optional[Dict[str, Any]]) -> float:
+    """Custo de um registro de uso: tokens da OpenAI e/ou páginas do Document AI."""
+    if not usage:
+        return 0.0
+    cost = (usage.get("docai_pages") or 0) * DOCAI_PRICE_PER_PAGE
+    model = usage.get("model")
+    if model:
+        # Versões datadas ("gpt-4o-2024-08-06") usam o preço da família
+        family = max((name for name in OPENAI_PRICES if model.startswith(name)), key=len, default=None)
+        if family is None:
+            # Modelo fora da tabela: o custo dos tokens não é estimado
+            return cost
+        input_price, output_price = OPENAI_PRICES[family]
+        cost += (usage.get("prompt_tokens") or 0) * input_price / 1e6
+        cost += (usage.get("completion_tokens") or 0) * output_price / 1e6
+    return cost
+
+
+def estimate_cost_usd(details: Optional[Dict[str, Any]]) -> float:
+    """
+    Custo de um item a partir do uso de API que o próprio modelo registrou nos detalhes:
+    `usage` (a chamada da pergunta) e `ingest_usage` (a parte do item na ingestão, ex: OCR do Document AI).
+    Modelos locais não registram uso e custam zero.
+    """
+    details = details or {}
+    return usage_cost_usd(details.get("usage")) + usage_cost_usd(details.get("ingest_usage"))
@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from .pricing import estimate_cost_usd
+from .stats import summarize_latencies
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    models TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    doc_hash TEXT NOT NULL,
+    document_name TEXT,
+    model_name TEXT NOT NULL,
+    question_index INTEGER NOT NULL,
+    question_hash TEXT NOT NULL,
+    repetition INTEGER NOT NULL DEFAULT 0,
+    question TEXT,
+    expected_answer TEXT,
+    actual_answer TEXT,
+    is_correct INTEGER,
+    latency_ms REAL,
+    cost_usd_est REAL,
+    stage_timings TEXT,
+    details TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS results_item
+    ON results (run_id, doc_hash, model_name, question_index, repetition);
+CREATE INDEX IF NOT EXISTS results_question ON results (doc_hash, model_name, question_hash);
+CREATE INDEX IF NOT EXISTS results_model_time ON results (model_name, recorded_at);
+
+CREATE TABLE IF NOT EXISTS run_model_stats (
+    run_id TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    items INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    accuracy REAL,
+    mean_ms REAL,
+    p50_ms REAL,
+    p95_ms REAL,
+    p99_ms REAL,
+    cost_usd REAL NOT NULL,
+    PRIMARY KEY (run_id, model_name)
+);
+CREATE INDEX IF NOT EXISTS run_model_stats_time ON run_model_stats (model_name, started_at);
+"""
+
+
+def question_hash(question: Optional[str]) -> str:
+    """Identifica a mesma pergunta entre execuções (sem diferenciar maiúsculas e espaços)."""
+    normalized = " ".join((question or "").lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultsStore:
+    """
+    Histórico persistente (SQLite) dos resultados, indexado por execução, documento (SHA-256),
+    modelo e pergunta. Cada item é gravado assim que é avaliado; quando a execução termina,
+    os agregados por modelo (acurácia, percentis de latência, custo) são calculados uma única vez
+    e guardados em `run_model_stats`, que é o que as consultas de histórico leem.
+    """
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # WAL: o dashboard lê o histórico enquanto os testes gravam
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    # --- Gravação ---
+
+    def start_run(self, kind: str, models: Sequence[str], metadata: Optional[Dict[str, Any]] = None) -> str:
+        run_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, kind, status, started_at, models, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, kind, "running", time.time(), json.dumps(list(models)),
+                 json.dumps(metadata or {}, ensure_ascii=False)),
+            )
+        return run_id
+
+    def append(self, run_id: str, doc_hash: str, model_name: str, question_index: int,
+               result: Dict[str, Any], document_name: Optional[str] = None) -> None:
+        """Grava um item avaliado (no modo benchmark, uma linha por repetição)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO results (
+                    run_id, doc_hash, document_name, model_name, question_index, question_hash, repetition,
+                    question, expected_answer, actual_answer, is_correct, latency_ms, cost_usd_est,
+                    stage_timings, details, recorded_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run_id, doc_hash, document_name, model_name, question_index,
+                    question_hash(result.get("question")), result.get("repetition") or 0,
+                    result.get("question"), result.get("expected_answer"), result.get("actual_answer"),
+                    None if result.get("is_correct") is None else int(result["is_correct"]),
+                    result.get("latency_ms"), estimate_cost_usd(result.get("details")),
+                    json.dumps(result.get("stage_timings_ms")) if result.get("stage_timings_ms") else None,
+                    json.dumps(result.get("details"), ensure_ascii=False, default=str) if result.get("details") else None,
+                    time.time(),
+                ),
+            )
+
+    def finish_run(self, run_id: str, status: str) -> None:
+        """Fecha a execução e calcula os agregados por modelo."""
+        with self._lock:
+            started_at = self._conn.execute("SELECT started_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT model_name, is_correct, latency_ms, cost_usd_est FROM results WHERE run_id = ?", (run_id,)
+            ).fetchall()
+
+            by_model: Dict[str, List[sqlite3.Row]] = {}
+            for row in rows:
+                by_model.setdefault(row["model_name"], []).append(row)
+            stats = []
+            for model_name, items in by_model.items():
+                verdicts = [row["is_correct"] for row in items if row["is_correct"] is not None]
+                latency = summarize_latencies([row["latency_ms"] for row in items if row["latency_ms"] is not None])
+                stats.append((
+                    run_id, model_name, started_at, len(items), sum(verdicts),
+                    sum(verdicts) / len(verdicts) if verdicts else None,
+                    latency.get("mean_ms"), latency.get("p50_ms"), latency.get("p95_ms"), latency.get("p99_ms"),
+                    sum(row["cost_usd_est"] or 0.0 for row in items),
+                ))
+
+            with self._conn:
+                self._conn.execute("DELETE FROM run_model_stats WHERE run_id = ?", (run_id,))
+                self._conn.executemany(
+                    "INSERT INTO run_model_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", stats
+                )
+                self._conn.execute(
+                    "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?", (status, time.time(), run_id)
+                )
+
+    # --- Consultas ---
+
+    def runs(self, limit: int = 50, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Execuções mais recentes, com os agregados de cada modelo."""
+        query = "SELECT * FROM runs"
+        params: list = []
+        if model_name:
+            query += " WHERE run_id IN (SELECT run_id FROM run_model_stats WHERE model_name = ?)"
+            params.append(model_name)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            runs = self._conn.execute(query, params).fetchall()
+            run_ids = [row["run_id"] for row in runs]
+            stats = self._conn.execute(
+                f"SELECT * FROM run_model_stats WHERE run_id IN ({','.join('?' * len(run_ids))})", run_ids
+            ).fetchall() if run_ids else []
+
+        stats_by_run: Dict[str, List[Dict[str, Any]]] = {}
+        for row in stats:
+            stats_by_run.setdefault(row["run_id"], []).append(_model_stats(row))
+        return [
+            {
+                "run_id": row["run_id"],
+                "kind": row["kind"],
+                "status": row["status"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"],
+                "models": json.loads(row["models"]),
+                "metadata": json.loads(row["metadata"] or "{}"),
+                "model_stats": stats_by_run.get(row["run_id"], []),
+            }
+            for row in runs
+        ]
+
+    def history(self, model_name: Optional[str] = None, since: Optional[float] = None,
+                until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Série temporal dos agregados: um ponto por execução finalizada e modelo, do mais antigo ao mais recente."""
+        conditions, params = [], []
+        if model_name:
+            conditions.append("model_name = ?")
+            params.append(model_name)
+        if since is not None:
+            conditions.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("started_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM run_model_stats{where} ORDER BY started_at, model_name", params
+            ).fetchall()
+        return [{"run_id": row["run_id"], "started_at": row["started_at"], **_model_stats(row)} for row in rows]
+
+    def compare_runs(self, base_run_id: str, other_run_id: str) -> Dict[str, Any]:
+        """
+        Compara duas execuções: agregados de cada modelo lado a lado e as perguntas que mudaram
+        de veredicto (mesmo documento, modelo e pergunta). No modo benchmark, uma pergunta conta
+        como correta quando acertou na maioria das repetições.
+        """
+        with self._lock:
+            stats = self._conn.execute(
+                "SELECT * FROM run_model_stats WHERE run_id IN (?, ?)", (base_run_id, other_run_id)
+            ).fetchall()
+            changes = self._conn.execute(
+                """
+                WITH per_question AS (
+                    SELECT run_id, doc_hash, MAX(document_name) AS document_name, model_name, question_hash,
+                           MAX(question) AS question, AVG(is_correct) >= 0.5 AS correct,
+                           AVG(latency_ms) AS latency_ms
+                    FROM results WHERE run_id IN (?, ?)
+                    GROUP BY run_id, doc_hash, model_name, question_hash
+                )
+                SELECT base.doc_hash, base.document_name, base.model_name, base.question,
+                       base.correct AS base_correct, other.correct AS other_correct,
+                       base.latency_ms AS base_latency_ms, other.latency_ms AS other_latency_ms
+                FROM per_question AS base
+                JOIN per_question AS other
+                  ON other.doc_hash = base.doc_hash AND other.model_name = base.model_name
+                 AND other.question_hash = base.question_hash
+                WHERE base.run_id = ? AND other.run_id = ? AND base.correct != other.correct
+                ORDER BY base.model_name, base.document_name, base.question
+                """,
+                (base_run_id, other_run_id, base_run_id, other_run_id),
+            ).fetchall()
+
+        models: Dict[str, Dict[str, Any]] = {}
+        for row in stats:
+            side = "base" if row["run_id"] == base_run_id else "other"
+            models.setdefault(row["model_name"], {"model_name": row["model_name"], "base": None, "other": None})
+            models[row["model_name"]][side] = _model_stats(row)
+        for entry in models.values():
+            base, other = entry["base"], entry["other"]
+            entry["delta"] = {
+                key: other[key] - base[key]
+                for key in ("accuracy", "p50_ms", "p95_ms", "cost_usd")
+                if base and other and base[key] is not None and other[key] is not None
+            }
+        return {
+            "base_run_id": base_run_id,
+            "other_run_id": other_run_id,
+            "models": list(models.values()),
+            "changed_questions": [
+                {
+                    **{key: row[key] for key in ("doc_hash", "document_name", "model_name", "question")},
+                    "status": "fixed" if row["other_correct"] else "regressed",
+                    "base_latency_ms": row["base_latency_ms"],
+                    "other_latency_ms": row["other_latency_ms"],
+                }
+                for row in changes
+            ],
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _model_stats(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        key: row[key]
+        for key in ("model_name", "items", "correct", "accuracy", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "cost_usd")
+    }
+
+
+_store: Optional[ResultsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_results_store() -> Optional[ResultsStore]:
+    """
+    Retorna o histórico de resultados do processo (None se desativado). Variável de ambiente:
+    RESULTS_DB_PATH: arquivo SQLite do histórico (padrão: .cache/results.sqlite3; vazio desativa)
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.getenv("RESULTS_DB_PATH", ".cache/results.sqlite3")
+            if not path:
+                return None
+            _store = ResultsStore(path)
+        return _store
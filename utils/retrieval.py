@@ -0,0 +1,103 @@
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+# Palavras muito frequentes em português que não ajudam a recuperar trechos
+STOPWORDS = {
+    "a", "ao", "aos", "as", "com", "como", "da", "das", "de", "do", "dos", "e", "ela", "ele", "em",
+    "entre", "era", "essa", "esse", "esta", "este", "eu", "foi", "ha", "isso", "isto", "ja", "mais",
+    "mas", "me", "na", "nas", "no", "nos", "o", "os", "ou", "para", "pela", "pelas", "pelo", "pelos",
+    "por", "qual", "quais", "que", "se", "sem", "ser", "seu", "sua", "suas", "seus", "sao", "so",
+    "tem", "um", "uma", "umas", "uns", "voce",
+}
+
+
+def strip_accents(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acentos, sem stopwords."""
+    tokens = re.findall(r"\w+", strip_accents(text.lower()))
+    return [t for t in tokens if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+@dataclass
+class Chunk:
+    page: int  # Número da página (a partir de 1)
+    text: str
+
+
+def chunk_pages(pages: Sequence[str], max_chars: int = 600, min_chars: int = 80) -> List[Chunk]:
+    """
+    Divide o texto de cada página em trechos do tamanho de um parágrafo.
+    Blocos separados por linhas em branco viram trechos; blocos longos são quebrados por linha
+    e blocos muito curtos (títulos, rótulos) são unidos ao seguinte.
+    """
+    chunks = []
+    for page_num, page_text in enumerate(pages, start=1):
+        buffer = ""
+        for block in re.split(r"\n\s*\n", page_text):
+            for line in block.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                if buffer and len(buffer) + len(line) + 1 > max_chars:
+                    chunks.append(Chunk(page=page_num, text=buffer))
+                    buffer = ""
+                buffer = f"{buffer} {line}" if buffer else line
+            # Fim de um parágrafo: fecha o trecho, a menos que ainda esteja curto demais
+            if len(buffer) >= min_chars:
+                chunks.append(Chunk(page=page_num, text=buffer))
+                buffer = ""
+        if buffer:
+            chunks.append(Chunk(page=page_num, text=buffer))
+    return chunks
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 sobre os trechos de um documento.
+    Construído uma vez na ingestão; cada busca custa apenas alguns milissegundos.
+    """
+    def __init__(self, chunks: List[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk.text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((chunk_id, tf))
+
+        self.postings = dict(self.postings)  # dict simples: pode ser serializado com pickle
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(chunks)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    @classmethod
+    def from_pages(cls, pages: Sequence[str], **kwargs) -> "BM25Index":
+        return cls(chunk_pages(pages), **kwargs)
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[Chunk, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / (self.avg_length or 1))
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [(self.chunks[chunk_id], score) for chunk_id, score in best]
@@ -0,0 +1,55 @@
+import math
+from typing import Dict, Optional, Sequence
+
+# Valores críticos da distribuição t de Student (bicaudal, 95%) por graus de liberdade.
+# Acima de 120 graus de liberdade, a aproximação normal (1,96) basta.
+_T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093,
+    20: 2.086, 21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048,
+    29: 2.045, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980,
+}
+
+
+def t_critical_95(degrees_of_freedom: int) -> float:
+    """Valor crítico t (95%); entre as linhas da tabela, usa a linha imediatamente abaixo (conservador)."""
+    if degrees_of_freedom > 120:
+        return 1.96
+    return _T_CRITICAL_95[max(df for df in _T_CRITICAL_95 if df <= degrees_of_freedom)]
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Percentil `q` (0-100) com interpolação linear, sobre valores já ordenados."""
+    if not sorted_values:
+        raise ValueError("Percentil de uma amostra vazia.")
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize_latencies(samples: Sequence[float]) -> Dict[str, Optional[float]]:
+    """
+    Resumo estatístico de uma amostra de latências (ms): média, desvio padrão amostral,
+    percentis e o intervalo de confiança de 95% da média (t de Student).
+    """
+    values = sorted(samples)
+    n = len(values)
+    if n == 0:
+        return {"samples": 0}
+
+    mean = sum(values) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else 0.0
+    margin = t_critical_95(n - 1) * std / math.sqrt(n) if n > 1 else None
+    return {
+        "samples": n,
+        "mean_ms": mean,
+        "std_ms": std,
+        "min_ms": values[0],
+        "max_ms": values[-1],
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "ci95_low_ms": mean - margin if margin is not None else None,
+        "ci95_high_ms": mean + margin if margin is not None else None,
+    }
@@ -0,0 +1,71 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from .metrics import STAGE_DURATION
+
+
+class StageTimings:
+    """
+    Duração acumulada (em ms) de cada etapa de uma operação.
+    Etapas podem ser aninhadas (ex: "ocr" acontece dentro de "ingest"): cada uma mede o próprio intervalo.
+    Threads auxiliares que herdam o contexto (ex: a produtora do pipeline de páginas) somam na mesma coleta.
+    """
+    def __init__(self, model: str = ""):
+        self.model = model
+        self.durations_ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, duration_ms: float) -> None:
+        with self._lock:
+            self.durations_ms[stage] = self.durations_ms.get(stage, 0.0) + duration_ms
+
+    def merge(self, other: "StageTimings", scale: float = 1.0) -> None:
+        """Soma as etapas de outra medição (ex: a parte da ingestão que cabe a uma pergunta)."""
+        for stage, duration_ms in list(other.durations_ms.items()):
+            self.add(stage, duration_ms * scale)
+
+    def scaled(self, scale: float) -> "StageTimings":
+        timings = StageTimings(self.model)
+        timings.merge(self, scale)
+        return timings
+
+    def as_dict(self) -> Dict[str, float]:
+        return {stage: round(duration_ms, 1) for stage, duration_ms in self.durations_ms.items()}
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect_timings(model: Optional[str] = None) -> Iterator[StageTimings]:
+    """
+    Coleta as etapas medidas com `span` dentro do bloco (na mesma thread/contexto).
+    Sem `model`, herda o modelo da coleta externa (usado nos labels das métricas).
+    """
+    parent = _current_timings.get()
+    timings = StageTimings(model if model is not None else (parent.model if parent else ""))
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Mede uma etapa com relógio monotônico. A duração vai para a coleta ativa (se houver)
+    e para o histograma `pdf_ingest_stage_duration_seconds`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(stage, elapsed * 1000)
+        STAGE_DURATION.observe(elapsed, model=timings.model if timings else "", stage=stage)